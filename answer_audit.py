@@ -0,0 +1,235 @@
+"""
+Consistency audit of the answers of every record.
+
+    python answer_audit.py with_human_verification.json
+
+Checks, one issue row per failure:
+
+  hop_answer_unused      a hop answer that does not appear in the question
+                         of the next hop (hops with `details` are replaced
+                         by their details: "Maroon 5" -> "Matt Flynn" ->
+                         "Matt" -> "1")
+  last_hop_answer        the answer of the last hop differs from `answer`
+  support_not_in_context a paragraph_support_title that is not the title
+                         of a paragraph of `context`
+
+Records are audited in a process pool, in chunks. The results are saved
+per dataset version in <cache>/answer-audit/<hash>.parquet, one row per
+record with a digest of its audited fields, so a new version of the file
+only re-audits the records whose fields changed.
+"""
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from dataset_cache import ensure_cache, temp_path
+from dataset_stream import TITLES_COLUMN
+
+AUDIT_DIR = "answer-audit"
+
+AUDIT_FIELDS = ("answer", "question_decomposition", TITLES_COLUMN)
+
+CHECKS = ("hop_answer_unused", "last_hop_answer", "support_not_in_context")
+
+# Records per task sent to a worker
+CHUNK_RECORDS = 2000
+
+# Below this many records to audit, the pool costs more than it saves
+POOL_MIN_RECORDS = 10_000
+
+SPACES_RE = re.compile(r"\s+")
+
+NO_ISSUES = "[]"
+
+
+# ============================================================
+# CHECKS
+# ============================================================
+
+def normalize_answer(value):
+    """Case, surrounding spaces / final period and repeated spaces do not count."""
+    return SPACES_RE.sub(" ", str(value if value is not None else "")).strip().rstrip(".").strip().casefold()
+
+
+def hop_chain(decomposition):
+    """Hops in answer order: a hop with `details` is replaced by its details."""
+    chain = []
+    for hop in decomposition or []:
+        details = hop.get("details")
+        chain.extend(hop_chain(details) if details else [hop])
+    return chain
+
+
+def audit_record(answer, decomposition, titles):
+    """Issues of one record: list of {"check", "hop", "detail"}."""
+    issues = []
+    chain = hop_chain(decomposition)
+    for hop, next_hop in zip(chain, chain[1:]):
+        hop_answer = normalize_answer(hop.get("answer"))
+        if hop_answer and hop_answer not in normalize_answer(next_hop.get("question")):
+            issues.append({
+                "check": "hop_answer_unused",
+                "hop": str(hop.get("sub_id", "")),
+                "detail": f"{hop.get('answer')!r} not in question {next_hop.get('sub_id', '')}",
+            })
+
+    if decomposition:
+        last = decomposition[-1]
+        if normalize_answer(last.get("answer")) != normalize_answer(answer):
+            issues.append({
+                "check": "last_hop_answer",
+                "hop": str(last.get("sub_id", "")),
+                "detail": f"{last.get('answer')!r} != answer {answer!r}",
+            })
+
+    in_context = set(titles or [])
+    stack = list(decomposition or [])
+    while stack:
+        hop = stack.pop(0)
+        title = hop.get("paragraph_support_title")
+        if title and title not in in_context:
+            issues.append({
+                "check": "support_not_in_context",
+                "hop": str(hop.get("sub_id", "")),
+                "detail": repr(title),
+            })
+        stack[:0] = hop.get("details") or []
+    return issues
+
+
+def audit_chunk(rows):
+    """Worker task: rows of (answer, decomposition JSON text, context titles) -> issues as JSON text."""
+    results = []
+    for answer, decomposition, titles in rows:
+        try:
+            decomposition = json.loads(decomposition) if isinstance(decomposition, str) else decomposition
+        except ValueError:
+            results.append(json.dumps([{"check": "invalid_decomposition", "hop": "", "detail": "not JSON"}]))
+            continue
+        issues = audit_record(answer, decomposition if isinstance(decomposition, list) else [], titles)
+        results.append(json.dumps(issues, ensure_ascii=False) if issues else NO_ISSUES)
+    return results
+
+
+def record_digest(answer, decomposition, titles):
+    """64-bit digest of the audited fields of a record (as a signed integer, for Parquet)."""
+    digest = hashlib.blake2b(digest_size=8)
+    digest.update(json.dumps([answer, decomposition, titles], ensure_ascii=False).encode("utf-8"))
+    return int.from_bytes(digest.digest(), "little", signed=True)
+
+
+# ============================================================
+# BATCH AUDIT
+# ============================================================
+
+def audit_rows(rows, workers=None):
+    """Issues (JSON text) of every row, in a process pool when there are enough rows."""
+    if len(rows) < POOL_MIN_RECORDS or workers == 1:
+        return audit_chunk(rows)
+    chunks = [rows[i:i + CHUNK_RECORDS] for i in range(0, len(rows), CHUNK_RECORDS)]
+    # spawn: forking a process that runs threads (Streamlit) is unsafe
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        return [issues for chunk in pool.map(audit_chunk, chunks) for issues in chunk]
+
+
+def _previous_results(audit_dir, current):
+    """File name and digest -> issues of the most recent audit of another dataset version."""
+    names = [name for name in os.listdir(audit_dir) if name.endswith(".parquet") and name != current]
+    if not names:
+        return None, {}
+    name = max(names, key=lambda name: os.path.getmtime(os.path.join(audit_dir, name)))
+    previous = pq.read_table(os.path.join(audit_dir, name), columns=["digest", "issues"]).to_pydict()
+    return name, dict(zip(previous["digest"], previous["issues"]))
+
+
+def run_audit(path, cache_dir=None, workers=None):
+    """
+    Audit table of the current dataset version (one row per record: _id,
+    digest, issues as JSON text), computed on first use. Returns the table
+    and the number of records that were audited (0 when it was saved).
+    """
+    fingerprint, cache_dir, parquet = ensure_cache(path, cache_dir)
+    audit_dir = os.path.join(cache_dir, AUDIT_DIR)
+    os.makedirs(audit_dir, exist_ok=True)
+    name = f"{fingerprint['hash']}.parquet"
+    target = os.path.join(audit_dir, name)
+    if os.path.exists(target):
+        return pq.read_table(target), 0
+
+    available = set(pq.read_schema(parquet).names)
+    columns = ["_id", *(c for c in AUDIT_FIELDS if c in available)]
+    table = pq.read_table(parquet, columns=columns).to_pydict()
+    n_records = len(table["_id"])
+    rows = list(zip(*(table.get(c, [None] * n_records) for c in AUDIT_FIELDS)))
+    digests = [record_digest(*row) for row in rows]
+
+    # Unchanged records keep their issues from the previous version
+    source, previous = _previous_results(audit_dir, name)
+    issues = [previous.get(digest) for digest in digests]
+    changed = [i for i, known in enumerate(issues) if known is None]
+    for i, result in zip(changed, audit_rows([rows[i] for i in changed], workers)):
+        issues[i] = result
+
+    result = pa.table({
+        "_id": pa.array(table["_id"], pa.string()),
+        "digest": pa.array(digests, pa.int64()),
+        "issues": pa.array(issues, pa.string()),
+    })
+    tmp = temp_path(target)
+    pq.write_table(result, tmp)
+    os.replace(tmp, target)
+
+    # Only this version and the one it was derived from are kept
+    for old in os.listdir(audit_dir):
+        if old.endswith(".parquet") and old not in (name, source):
+            try:
+                os.remove(os.path.join(audit_dir, old))
+            except OSError:
+                pass
+    return result, len(changed)
+
+
+def issues_frame(audit):
+    """One row per issue: position, _id, check, hop, detail."""
+    issues = audit.column("issues").to_numpy(zero_copy_only=False)
+    positions = np.flatnonzero(issues != NO_ISSUES)
+    ids = audit.column("_id").take(pa.array(positions)).to_pylist()
+    rows = [
+        {"position": int(position), "_id": _id, **issue}
+        for position, _id, text in zip(positions, ids, issues[positions])
+        for issue in json.loads(text)
+    ]
+    return pd.DataFrame(rows, columns=["position", "_id", "check", "hop", "detail"])
+
+
+def check_counts(issues, n_records):
+    """Number of issues and of flagged records per check."""
+    counts = issues.groupby("check").agg(issues=("position", "size"), records=("position", "nunique"))
+    counts = counts.reindex(sorted(set(CHECKS) | set(counts.index)), fill_value=0).rename_axis("check").reset_index()
+    counts["share"] = (counts["records"] / max(n_records, 1)).round(4)
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", help="dataset JSON file")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: one per CPU)")
+    args = parser.parse_args()
+
+    audit, n_audited = run_audit(args.path, workers=args.workers)
+    issues = issues_frame(audit)
+    print(f"{audit.num_rows:,} records, {n_audited:,} audited (others reused from a previous version)")
+    print(check_counts(issues, audit.num_rows).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
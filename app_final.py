@@ -1,35 +1,26 @@
 import streamlit as st
-import pandas as pd
 import altair as alt
-import json
-from itertools import chain
+
+from chart_data import hops_counts, heatmap_counts, support_counts, enforce_budget
+from dataset_cache import load_dataset, TITLES_COLUMN
+from dataset_stream import DASHBOARD_FIELDS
 
 # ============================================================
 # TRABALHANDO NOS DADOS
 # ============================================================
 
 # --- Carregando o dataset ---
+# A primeira execução converte o JSON em um cache Parquet (.morehopqa_cache/);
+# as seguintes leem o cache, que é refeito quando o JSON muda.
+# Só as colunas usadas nos gráficos são lidas.
 DATASET_FILE = "with_human_verification.json"
 
 try:
-    with open(DATASET_FILE, "r", encoding="utf-8") as f:
-        data = json.load(f)
+    df = load_dataset(DATASET_FILE, columns=[*DASHBOARD_FIELDS, TITLES_COLUMN])
 except Exception as e:
     st.error(f"Erro ao abrir {DATASET_FILE}: {e}")
     st.stop()
 
-if not isinstance(data, list):
-    st.error("Formato do JSON inesperado: esperava-se uma lista de objetos (uma lista de exemplos).")
-    st.stop()
-
-# Monta DataFrame principal (para gráficos de hops, etc.)
-df = pd.DataFrame(data)
-
-
-
-
-
-
 # ============================================================
 # GERANDO A VISUALIZAÇÃO DO DASHBOARD
 # ============================================================
@@ -108,24 +99,22 @@ with col1:
     if "no_of_hops" not in df.columns:
         st.error("Não foi possível encontrar/derivar a coluna 'no_of_hops' no dataset.")
     else:
-        if "answer_type" in df.columns:
-            df_plot = df[["no_of_hops", "answer_type"]].copy()
-        else:
-            df_plot = df[["no_of_hops"]].copy()
+        # Uma linha por (hops, tipo de resposta), e não uma por pergunta
+        df_plot = enforce_budget(hops_counts(df), collapse="no_of_hops")
 
         base = alt.Chart(df_plot).mark_bar(cornerRadiusTopLeft=5, cornerRadiusTopRight=5)
         if "answer_type" in df_plot.columns:
             chart_hops = base.encode(
                 x=alt.X('no_of_hops:O', title='Número de hops'),
-                y=alt.Y('count()', title="Quantidade de respostas"),
+                y=alt.Y('sum(count):Q', title="Quantidade de respostas"),
                 color=alt.Color('answer_type:N', legend=alt.Legend(title="Tipos de Respostas")),
-                tooltip=['no_of_hops', 'answer_type']
+                tooltip=['no_of_hops', 'answer_type', 'count']
             ).properties(title='Distribuição do número de hops', height=500).interactive()
         else:
             chart_hops = base.encode(
                 x=alt.X('no_of_hops:O', title='Número de hops'),
-                y=alt.Y('count()', title="Quantidade de respostas"),
-                tooltip=['no_of_hops']
+                y=alt.Y('sum(count):Q', title="Quantidade de respostas"),
+                tooltip=['no_of_hops', 'count']
             ).properties(title='Distribuição do número de hops', height=500).interactive()
 
         st.altair_chart(chart_hops, use_container_width=True)
@@ -136,7 +125,7 @@ with col2:
     if "reasoning_type" not in df.columns or "answer_type" not in df.columns:
         st.error("As colunas necessárias ('reasoning_type', 'answer_type') não foram encontradas no dataset.")
     else:
-        heatmap_data = df.groupby(['reasoning_type', 'answer_type']).size().reset_index(name='count')
+        heatmap_data = enforce_budget(heatmap_counts(df), collapse="reasoning_type")
 
         heatmap = alt.Chart(heatmap_data).mark_rect().encode(
             x=alt.X('answer_type:N', title='Tipo de Resposta'),
@@ -159,20 +148,10 @@ with col2:
 # LINHA 2: Gráfico - Parágrafos de suporte mais usados
 # ============================================================
 
-flattened_supports = list(chain.from_iterable(
-    [title for title, _ in item.get("context", [])]
-    for item in data
-))
-
-# Conta frequência
-support_counts = (
-    pd.Series(flattened_supports)
-    .value_counts()
-    .reset_index()
-    .rename(columns={"index": "paragraphs", 0: "count"})
-)
+# Conta frequência (os parágrafos menos frequentes além do limite de linhas viram "Other")
+support_data = enforce_budget(support_counts(df[TITLES_COLUMN]), collapse="paragraphs")
 
-chart_support = alt.Chart(support_counts).mark_circle().encode(
+chart_support = alt.Chart(support_data).mark_circle().encode(
     x=alt.X('paragraphs:N', title='Parágrafo de suporte', axis=alt.Axis(labelAngle=-45, labelLimit=300)),
     y=alt.Y('count:Q', title='Frequência'),
     size='count:Q',
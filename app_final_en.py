@@ -1,44 +1,88 @@
+import functools
+import os
+import time
+
 import streamlit as st
-import pandas as pd
-import altair as alt
-import json
-from itertools import chain
+
+from profiling import Profiler, timed, timings_frame
+from warm_up import WarmUp
+
+# Start of this run, for the startup times (see PAGE SHELL)
+SCRIPT_START = time.perf_counter()
 
 # ============================================================
-# DATA CHARGE
+# SETTINGS
 # ============================================================
 
-# --- Loading the dataset ---
 DATASET_FILE = "with_human_verification.json"
 
-try:
-    with open(DATASET_FILE, "r", encoding="utf-8") as f:
-        data = json.load(f)
-except Exception as e:
-    st.error(f"Error opening {DATASET_FILE}: {e}")
-    st.stop()
+# Maximum number of questions listed when a paragraph is selected in tab4
+MAX_DRILLDOWN_ROWS = 1000
 
-if not isinstance(data, list):
-    st.error("Unexpected JSON format: expected a list of objects (list of examples).")
-    st.stop()
+# Output of normalize.py (optional): adds decomp_len / num_paragraphs
+NORMALIZED_DIR = "normalized"
 
-# Create main DataFrame (for hops charts, etc.)
-df = pd.DataFrame(data)
+# Results per page in the search tab
+SEARCH_PAGE_SIZE = 20
 
-# ============================================================
-# SIDEBAR
-# ============================================================
-st.sidebar.title("Navigation")
+# Near-duplicate groups listed in the near-duplicates tab
+MAX_DUPLICATE_GROUPS = 200
 
+# "pandas" (default): charts aggregated from an in-memory DataFrame.
+# "sqlite": charts answered by SQL queries over an indexed SQLite file
+# (sql_backend.py), so the dataset is never held in memory.
+# "live": the counts of Graph 1-3 follow the edits of the file, applying
+# only the changed records (live_ingest.py); the other tabs are rebuilt
+# for the new version when they are opened.
+BACKEND = os.environ.get("MOREHOPQA_BACKEND", "pandas")
+USE_SQL = BACKEND == "sqlite"
+LIVE = BACKEND == "live"
+# Graph 1-3 ask `db` for their counts instead of aggregating a frame
+USE_DB = USE_SQL or LIVE
 
-# Default: intro
-if "page" not in st.session_state:
-    st.session_state["page"] = "Intro"
+# Seconds between two checks of the live counts by the open dashboards
+LIVE_POLL_SECONDS = 2
+
+# Seconds between two checks of the warm-up thread by the intro tab
+WARM_UP_POLL_SECONDS = 1
+
+# The loaders keyed by the dataset version keep the current version only,
+# so a new one (every applied change in live mode) evicts the old indexes;
+# the chart data caches keep this many (version, column, filters) entries
+CHART_CACHE_ENTRIES = 32
+
+
+# --- Stage profiling (profiling.py) ---
+# Wall time of every stage is always recorded (and written to
+# MOREHOPQA_METRICS when set); the debug toggle of the sidebar adds peak
+# memory and chart payload sizes, and shows the table of this rerun.
+# One profiler per session: a fragment rerun starts a new run of it (see
+# panel), instead of adding rows to the run it was drawn in.
+DEBUG_PROFILE = st.session_state.get("debug_profile", False)
+profiler = st.session_state.get("profiler")
+if profiler is None:
+    profiler = st.session_state["profiler"] = Profiler(memory=DEBUG_PROFILE, payload=DEBUG_PROFILE)
+else:
+    profiler.start_run(memory=DEBUG_PROFILE, payload=DEBUG_PROFILE)
 
 
 # ============================================================
-# DASHBOARD VISUALIZATION
+# PAGE SHELL
 # ============================================================
+# Drawn before the data stack is imported and the dataset is loaded, so
+# the first paint waits for neither: page configuration, texts, the tabs
+# and the intro tab (plain text). The first run of a session records the
+# time to first paint (startup/first_paint) and, at the end of the run,
+# the time to interactive (startup/interactive) from the start of the
+# script, in the stage profile and MOREHOPQA_METRICS.
+FIRST_RUN = "startup_recorded" not in st.session_state
+
+
+def record_interactive():
+    if FIRST_RUN:
+        profiler.record("startup/interactive", time.perf_counter() - SCRIPT_START)
+        st.session_state["startup_recorded"] = True
+
 
 # --- Page Configuration ---
 st.set_page_config(layout="wide", page_title="MoreHopQA - Visualizations")
@@ -56,16 +100,40 @@ Columns record everything from the original question and its answer to the decom
 ---
 """)
 
-# ============================================================
-# TABS
-# ============================================================
-tab1, tab2, tab3, tab4 = st.tabs(["Intro", "Graph 1", "Graph 2", "Graph 3"])
-
-
-# ============================================================
-# TAB 1
-# ============================================================
-with tab1:
+# --- Tabs (filled by the panels, see TABS at the end) ---
+# on_change="rerun" makes the tabs lazy: a full rerun only executes the
+# panel of the open tab.
+tabs = st.tabs(
+    ["Intro", "Graph 1", "Graph 2", "Graph 3", "Graph analytics", "Search", "Near duplicates", "Answer audit", "Question graph"],
+    key="tab", on_change="rerun"
+)
+INTRO_OPEN = tabs[0].open
+
+
+# --- Panels: timed fragments (see PANELS) ---
+def panel(name):
+    """Decorator: runs the function as a timed fragment, with its time below it."""
+    def decorator(function):
+        @functools.wraps(function)
+        def run():
+            # After the end of the script run: a fragment rerun, profiled as a run of its own
+            fragment_rerun = profiler.finished
+            if fragment_rerun:
+                profiler.start_run()
+            timings = st.session_state.setdefault("panel_timings", {})
+            with timed(name, timings), profiler.stage(name):
+                function()
+            st.caption(f"{name}: {timings[name]['ms']:.1f} ms (run {timings[name]['runs']})")
+            if fragment_rerun and DEBUG_PROFILE:
+                # The sidebar table is only drawn again by a full rerun
+                st.dataframe(profiler.frame(), hide_index=True)
+        return st.fragment(run)
+    return decorator
+
+
+# --- TAB 1 ---
+@panel("Intro")
+def intro_panel():
 
     st.markdown("""
 
@@ -109,117 +177,762 @@ with tab1:
     ---
     """)
 
+
+if INTRO_OPEN:
+    with tabs[0]:
+        intro_panel()
+if FIRST_RUN:
+    profiler.record("startup/first_paint", time.perf_counter() - SCRIPT_START)
+
+
+# ============================================================
+# WARM-UP
+# ============================================================
+# The data stack and the dataset cache are loaded by a background thread
+# (warm_up.py), started by the first session of the process. Meanwhile
+# the intro tab stays usable and the sidebar shows the progress, then
+# reruns the page; a tab that needs the data waits for the thread.
+
+@st.cache_resource
+def warm_up():
+    """Background loading of the data stack and dataset cache, once per process."""
+    return WarmUp(DATASET_FILE, BACKEND)
+
+
+@st.fragment(run_every=WARM_UP_POLL_SECONDS)
+def warm_up_status(warm):
+    if warm.ready:
+        st.rerun()
+    st.caption(f"Loading the dataset... {warm.elapsed:.0f} s")
+
+
+warm = warm_up()
+if not warm.ready:
+    if INTRO_OPEN:
+        with st.sidebar:
+            warm_up_status(warm)
+        record_interactive()
+        profiler.finish()
+        st.stop()
+    with st.spinner("Loading the dataset..."):
+        warm.wait()
+
+
+# ============================================================
+# DATA CHARGE
+# ============================================================
+
+# --- Data stack (already imported by the warm-up thread) ---
+import altair as alt
+import numpy as np
+
+from answer_audit import run_audit, issues_frame, check_counts
+from chart_data import hops_counts, heatmap_counts, enforce_budget, payload_size, MAX_CHART_ROWS
+from dataset_cache import load_dataset, dataset_fingerprint, ensure_cache
+from dataset_stream import TITLES_COLUMN
+from normalize import normalized_version, load_table
+from question_graph import load_adjacency, question_graph_html, LruCache, MAX_NEIGHBOURS
+from near_duplicates import load_near_duplicates
+from live_ingest import LiveDataset
+from graph_stats import load_graph_stats, component_size_counts, degree_counts, top_paragraphs
+from ranked_counts import RankedCounts
+from reasoning_labels import ReasoningLabels, from_combination_counts
+from search_index import load_search_index
+from shared_store import StoreLease
+from sql_backend import load_sql_backend
+from title_index import load_title_index
+
+
+# --- Loading the dataset ---
+# The first run converts the JSON into a Parquet cache (.morehopqa_cache/);
+# later reruns read the cache, which is rebuilt when the JSON file changes.
+# Only the columns used by the charts are read from it, as a compact frame
+# (compact_frame.py) memory-mapped once per host for every session and
+# process (shared_store.py).
+@st.cache_resource(max_entries=1)
+def sql_backend(version):
+    """SQLite database of the dataset (built next to the Parquet cache)."""
+    return load_sql_backend(DATASET_FILE)
+
+
+@st.cache_resource
+def live_dataset():
+    """Live counts of the dataset file, watched once per process."""
+    live = LiveDataset(DATASET_FILE)
+    live.watch()
+    return live
+
+
+@st.cache_resource(max_entries=1)
+def derived_columns(version):
+    """decomp_len / num_paragraphs from the normalized tables, when they match this dataset version."""
+    if normalized_version(NORMALIZED_DIR) != version:
+        return {}
+    derived = load_table(NORMALIZED_DIR, "questions", columns=["question_id", "decomp_len", "num_paragraphs"])
+    derived = derived.sort_values("question_id")
+    return {column: derived[column].to_numpy() for column in ("decomp_len", "num_paragraphs")}
+
+
+def dataset_lease(version):
+    """
+    This session's reference to the shared store; a new dataset version
+    releases the old store and maps the new one.
+    """
+    lease = st.session_state.get("dataset_lease")
+    if lease is None or lease.version != version:
+        if lease is not None:
+            lease.release()
+        lease = st.session_state["dataset_lease"] = StoreLease(DATASET_FILE)
+    return lease
+
+
+try:
+    with profiler.stage("load"):
+        if LIVE:
+            db = live_dataset()
+            if not db.watching:
+                db.refresh()
+            # A new version for every change applied to the live counts: the
+            # file is read by the ingester only, not hashed again on every rerun
+            DATASET_VERSION = f"live-{db.revision}"
+        else:
+            DATASET_VERSION = dataset_fingerprint(DATASET_FILE)["hash"]
+    with profiler.stage("parse"):
+        # JSON -> Parquet cache, only when the file changed (live: not for Graph 1-3)
+        if not LIVE:
+            ensure_cache(DATASET_FILE)
+    with profiler.stage("frame_build"):
+        if USE_SQL:
+            db = sql_backend(DATASET_VERSION)
+            df = None
+        elif LIVE:
+            df = None
+        else:
+            dataset = dataset_lease(DATASET_VERSION).store.dataset()
+            # assign() does not copy the mapped columns (copy-on-write)
+            df = dataset.frame.assign(**derived_columns(DATASET_VERSION))
+            if "no_of_hops" not in df.columns and "num_hops" in df.columns:
+                df = df.assign(no_of_hops=df["num_hops"])
+except Exception as e:
+    st.error(f"Error opening {DATASET_FILE}: {e}")
+    st.stop()
+
+
+@st.cache_resource(max_entries=1)
+def near_duplicates(version):
+    """MinHash/LSH near-duplicate groups (persisted next to the dataset cache)."""
+    return load_near_duplicates(DATASET_FILE)
+
+
+@st.cache_resource(max_entries=1)
+def answer_audit(version):
+    """
+    Answer consistency issues (answer_audit.py), audited in a process pool
+    on first use; records unchanged since the previous version are reused.
+    """
+    audit, n_audited = run_audit(DATASET_FILE)
+    issues = issues_frame(audit)
+    return issues, check_counts(issues, audit.num_rows), audit.num_rows, n_audited
+
+
+def deduplicated_frame(version, df):
+    """
+    One record per near-duplicate group. Only the groups are cached: the
+    rows are taken from this session's frame on every run, so sessions do
+    not share one mutable slice.
+    """
+    return df.iloc[near_duplicates(version).representatives]
+
+
+@st.cache_resource(max_entries=2)
+def ranked_supports(version, deduplicated, _titles):
+    """Paragraph counts, sorted once per dataset version (and deduplication setting)."""
+    codes = _titles.codes
+    if deduplicated:
+        keep = near_duplicates(version).group == np.arange(len(_titles))
+        codes = codes[np.repeat(keep, np.diff(_titles.offsets))]
+    return RankedCounts.from_codes(codes, _titles.vocabulary)
+
+
+@st.cache_resource(max_entries=1)
+def title_index(version):
+    """Paragraph title -> records index (persisted next to the dataset cache)."""
+    return load_title_index(DATASET_FILE)
+
+
+@st.cache_resource(max_entries=1)
+def question_texts(version):
+    """`_id` and question text, only read when a paragraph is selected."""
+    return load_dataset(DATASET_FILE, columns=["_id", "question"])
+
+
+@st.cache_resource(max_entries=1)
+def graph_stats(version):
+    """Components, degree, PageRank and bridges of the co-occurrence graph."""
+    return load_graph_stats(DATASET_FILE)
+
+
+@st.cache_resource(max_entries=1)
+def adjacency_index(version):
+    """Paragraph co-occurrence adjacency (CSR, persisted next to the dataset cache)."""
+    return load_adjacency(DATASET_FILE)
+
+
+@st.cache_resource(max_entries=1)
+def graph_records(version):
+    """Question, decomposition and context titles of every record, for the question graph."""
+    return load_dataset(DATASET_FILE, columns=["_id", "question", "question_decomposition", TITLES_COLUMN])
+
+
+@st.cache_resource(max_entries=1)
+def graph_renders(version):
+    """Rendered question graphs, least recently used first out."""
+    return LruCache()
+
+
+@st.cache_resource(max_entries=1)
+def search_index(version):
+    """Full-text index (persisted next to the dataset cache)."""
+    return load_search_index(DATASET_FILE)
+
+# ============================================================
+# SIDEBAR
+# ============================================================
+st.sidebar.title("Navigation")
+
+
+# Default: intro
+if "page" not in st.session_state:
+    st.session_state["page"] = "Intro"
+
+# Filters of Graph 1-3: the sidebar filters of the SQL backend, and the
+# near-duplicate filter (both backends; it also keys the chart caches)
+chart_filters = {}
+if USE_SQL:
+    st.sidebar.subheader("Filters")
+    for field in ("answer_type", "reasoning_type"):
+        if field in db.columns:
+            chart_filters[field] = st.sidebar.multiselect(field, db.filter_values(field), key=f"sql_{field}")
+
+# Near-duplicate filter: the charts of Graph 1-3 count one record per group
+# (not in live mode: the groups are computed per version of the file)
+DEDUPLICATE = not LIVE and st.sidebar.toggle(
+    "Hide near-duplicates", key="deduplicate", help="Count one question per near-duplicate group in Graph 1-3"
+)
+if DEDUPLICATE:
+    chart_filters["exclude"] = ["near_duplicates"]
+    if USE_SQL:
+        groups = near_duplicates(DATASET_VERSION)
+        db.exclude("near_duplicates", np.flatnonzero(groups.group != np.arange(len(groups))))
+
+if USE_SQL:
+    st.sidebar.caption(f"{db.count(chart_filters):,} questions selected")
+
+columns = db.columns if USE_DB else set(df.columns)
+# Source of the Graph 1-2 aggregations
+chart_source = db if USE_DB else deduplicated_frame(DATASET_VERSION, df) if DEDUPLICATE else df
+
+
+# --- Live mode: rerun the open dashboard when the counts changed ---
+@st.fragment(run_every=LIVE_POLL_SECONDS)
+def live_status():
+    if not db.watching:
+        db.refresh()
+    if st.session_state.setdefault("live_revision", db.revision) != db.revision:
+        st.session_state["live_revision"] = db.revision
+        st.rerun()
+    delta = db.last_delta
+    st.caption(f"Live: {db.count():,} questions, {len(db.ranked()):,} paragraphs (revision {db.revision})")
+    if delta is not None:
+        st.caption(
+            f"Last change: +{delta.added} / ~{delta.changed} / -{delta.removed} questions in "
+            f"{delta.seconds * 1000:.0f} ms ({'full pass' if delta.full_pass else 'appended'})"
+        )
+    if db.error:
+        st.caption(f"Waiting for a complete file: {db.error}")
+
+
+if LIVE:
+    with st.sidebar:
+        live_status()
+
+
+# ============================================================
+# PANELS
+# ============================================================
+# Every tab is a fragment: a widget inside it reruns that panel only, and
+# only the open tab runs on a full rerun (see TABS below). The chart data
+# is cached per dataset version and panel inputs.
+
+def show_chart(chart, name="chart", **kwargs):
+    """st.altair_chart as a profiled stage (with the spec size in debug mode)."""
+    with profiler.stage(name):
+        if profiler.payload:
+            profiler.add_payload(payload_size(chart))
+        return st.altair_chart(chart, **kwargs)
+
+
+def filters_key(filters):
+    """Hashable form of the SQL filters, for the caches below."""
+    return tuple((field, tuple(values)) for field, values in sorted(filters.items()) if values)
+
+
+@st.cache_resource(max_entries=CHART_CACHE_ENTRIES)
+def hops_chart_data(version, column, filters, _source):
+    counts = _source.hops_counts(dict(filters), column) if USE_DB else hops_counts(_source, column)
+    return enforce_budget(counts, collapse=column)
+
+
+@st.cache_resource(max_entries=CHART_CACHE_ENTRIES)
+def heatmap_chart_data(version, filters, _source):
+    counts = _source.heatmap_counts(dict(filters)) if USE_DB else heatmap_counts(_source)
+    return enforce_budget(counts, collapse="reasoning_type")
+
+
+@st.cache_resource(max_entries=CHART_CACHE_ENTRIES)
+def reasoning_label_data(version, filters, _source):
+    """Label x answer_type and label x label counts, from the one-hot label matrix."""
+    if USE_DB:
+        counts = _source.heatmap_counts(dict(filters))
+        labels, answers = from_combination_counts(counts), counts["answer_type"]
+    else:
+        column = _source["reasoning_type"]
+        labels, answers = ReasoningLabels.from_codes(column.cat.codes, column.cat.categories), _source["answer_type"]
+    return labels.by(answers, "answer_type"), labels.cooccurrence()
+
+
 # ============================================================
 # TAB 2
 # ============================================================
-with tab2:
+@panel("Graph 1")
+def hops_panel():
     st.subheader("CHART: Number of hops")
 
-    if "no_of_hops" not in df.columns and "num_hops" in df.columns:
-        df["no_of_hops"] = df["num_hops"]
-
-    if "no_of_hops" not in df.columns:
+    if "no_of_hops" not in columns:
         st.error("Could not find/derive 'no_of_hops' column in the dataset.")
     else:
-        if "answer_type" in df.columns:
-            df_plot = df[["no_of_hops", "answer_type"]].copy()
-        else:
-            df_plot = df[["no_of_hops"]].copy()
+        # decomp_len is available once normalize.py has been run
+        hop_titles = {"no_of_hops": "Number of hops", "decomp_len": "Decomposition length"}
+        hop_columns = [c for c in hop_titles if c in columns]
+        hop_column = st.radio("Measure", hop_columns, format_func=hop_titles.get, horizontal=True) if len(hop_columns) > 1 else "no_of_hops"
+
+        # One row per (hops, answer type), not one per question
+        with profiler.stage("aggregate"):
+            df_plot = hops_chart_data(DATASET_VERSION, hop_column, filters_key(chart_filters), chart_source)
 
         base = alt.Chart(df_plot).mark_bar(cornerRadiusTopLeft=5, cornerRadiusTopRight=5)
         if "answer_type" in df_plot.columns:
             chart_hops = base.encode(
-                x=alt.X('no_of_hops:O', title='Number of hops'),
-                y=alt.Y('count()', title="Number of answers"),
+                x=alt.X(f'{hop_column}:O', title=hop_titles[hop_column]),
+                y=alt.Y('sum(count):Q', title="Number of answers"),
                 color=alt.Color('answer_type:N', legend=alt.Legend(title="Answer Types")),
-                tooltip=['no_of_hops', 'answer_type']
-            ).properties(title='Distribution of number of hops', height=500).interactive()
+                tooltip=[hop_column, 'answer_type', 'count']
+            ).properties(title=f'Distribution of {hop_titles[hop_column].lower()}', height=500).interactive()
         else:
             chart_hops = base.encode(
-                x=alt.X('no_of_hops:O', title='Number of hops'),
-                y=alt.Y('count()', title="Number of answers"),
-                tooltip=['no_of_hops']
-            ).properties(title='Distribution of number of hops', height=500).interactive()
+                x=alt.X(f'{hop_column}:O', title=hop_titles[hop_column]),
+                y=alt.Y('sum(count):Q', title="Number of answers"),
+                tooltip=[hop_column, 'count']
+            ).properties(title=f'Distribution of {hop_titles[hop_column].lower()}', height=500).interactive()
 
-        st.altair_chart(chart_hops, use_container_width=True)
+        show_chart(chart_hops, use_container_width=True)
 
 
 # ============================================================
 # TAB 3
 # ============================================================
-with tab3:
+@panel("Graph 2")
+def heatmap_panel():
     st.subheader("CHART: Heatmap - Answer Type x Reasoning Type")
 
-    if "reasoning_type" not in df.columns or "answer_type" not in df.columns:
+    if "reasoning_type" not in columns or "answer_type" not in columns:
         st.error("Required columns ('reasoning_type', 'answer_type') not found in the dataset.")
     else:
-        heatmap_data = df.groupby(['reasoning_type', 'answer_type']).size().reset_index(name='count')
+        # "combination": one row per reasoning_type string; "per-label": the
+        # labels of multi-label values ("Commonsense, Arithmetic") counted separately
+        view = st.radio("View", ["combination", "per-label"], horizontal=True, key="heatmap_view")
+
+        with profiler.stage("aggregate"):
+            if view == "combination":
+                heatmap_data = heatmap_chart_data(DATASET_VERSION, filters_key(chart_filters), chart_source)
+            else:
+                heatmap_data, label_pairs = reasoning_label_data(DATASET_VERSION, filters_key(chart_filters), chart_source)
+        y_field = "reasoning_type" if view == "combination" else "reasoning_label"
 
         heatmap = alt.Chart(heatmap_data).mark_rect().encode(
             x=alt.X('answer_type:N', title='Answer Type'),
-            y=alt.Y('reasoning_type:N', title='Reasoning Type'),
+            y=alt.Y(f'{y_field}:N', title='Reasoning Type' if view == "combination" else 'Reasoning Label'),
             color=alt.Color('count:Q', scale=alt.Scale(scheme='greens'), title='Number of Questions'),
-            tooltip=['reasoning_type', 'answer_type', 'count']
+            tooltip=[y_field, 'answer_type', 'count']
         ).properties(
             title='Heatmap: Answer Type x Reasoning Type',
             height=500
         )
 
-        st.altair_chart(heatmap, use_container_width=True)
+        show_chart(heatmap, use_container_width=True)
+
+        if view == "per-label":
+            # Diagonal: questions with the label; elsewhere: questions with both labels
+            chart_pairs = alt.Chart(label_pairs).mark_rect().encode(
+                x=alt.X('label_a:N', title='Reasoning Label'),
+                y=alt.Y('label_b:N', title='Reasoning Label'),
+                color=alt.Color('count:Q', scale=alt.Scale(scheme='blues'), title='Number of Questions'),
+                tooltip=['label_a', 'label_b', 'count']
+            ).properties(title='Reasoning labels appearing together', height=400)
+            show_chart(chart_pairs, "label pairs chart", use_container_width=True)
 
 
 
 # ============================================================
 # TAB 4
 # ============================================================
-with tab4:
+@panel("Graph 3")
+def support_panel():
 
-    flattened_supports = list(chain.from_iterable(
-        [title for title, _ in item.get("context", [])]
-        for item in data
-    ))
+    #Count frequency (cached; reruns only slice the sorted counts)
+    with profiler.stage("aggregate"):
+        if USE_DB:
+            min_count, max_count = db.support_count_range(chart_filters)
+        else:
+            ranked = ranked_supports(DATASET_VERSION, DEDUPLICATE, dataset.titles)
+            min_count, max_count = (int(ranked.counts[-1]), int(ranked.counts[0])) if len(ranked) else (0, 0)
 
-    #Count frequency
-    support_counts = (
-        pd.Series(flattened_supports)
-        .value_counts()
-        .reset_index()
-        .rename(columns={"index": "paragraphs", 0: "count"})
-    )
+    # No context paragraph in the dataset (or in the filtered questions): nothing to rank
+    if max_count == 0:
+        st.info("No supporting paragraphs to show.")
+        return
 
     #Slider
-    min_count, max_count = int(support_counts["count"].min()), int(support_counts["count"].max())
     threshold = st.slider(
         "Filtrar por frequência mínima:",
         min_value=min_count,
-        max_value=max_count,
+        max_value=max(max_count, min_count + 1),
         value=min_count,
         step=1
     )
 
-    #apply filter
-    filtered_supports = support_counts[support_counts["count"] >= threshold]
+    #Paragraphs with count >= threshold are a prefix of the ranking (binary search)
+    if USE_DB:
+        n_visible = db.support_rank_of_threshold(threshold, chart_filters)
+    else:
+        n_visible = ranked.rank_of_threshold(threshold)
+
+    #Pages of ranks
+    col_size, col_page = st.columns(2)
+    page_size = col_size.number_input(
+        "Paragraphs per page", min_value=10, max_value=MAX_CHART_ROWS - 1, value=100, step=10
+    )
+    n_pages = max(1, -(-n_visible // page_size))
+    page = col_page.number_input(f"Page (of {n_pages})", min_value=1, max_value=n_pages, value=1, step=1)
+    start, stop = (page - 1) * page_size, min(page * page_size, n_visible)
+
+    #apply filter (the paragraphs above the threshold ranked after this page are summed into "Other")
+    with profiler.stage("window"):
+        if USE_DB:
+            filtered_supports = db.support_window(threshold, start, stop, n_visible, chart_filters)
+        else:
+            filtered_supports = ranked.window_with_other(start, stop, end=n_visible)
 
-    #Graphic
+    #Graphic (click a paragraph to list the questions that use it)
+    select_paragraph = alt.selection_point(name="paragraph", fields=["paragraphs"])
     chart_support = (
         alt.Chart(filtered_supports)
         .mark_circle()
         .encode(
             x=alt.X(
                 'paragraphs:N',
+                sort=None,
                 title='Supporting Paragraph',
                 axis=alt.Axis(labelAngle=-45, labelLimit=300)
             ),
             y=alt.Y('count:Q', title='Frequency'),
             size='count:Q',
-            tooltip=['paragraphs', 'count']
+            tooltip=['rank', 'paragraphs', 'count']
         )
         .properties(
-            title=f'Most used supporting paragraphs (count ≥ {threshold})',
+            title=f'Most used supporting paragraphs (count ≥ {threshold}, ranks {start + 1}–{stop})',
             height=500
         )
+        .add_params(select_paragraph)
         .interactive()
     )
 
-    st.altair_chart(chart_support, use_container_width=True)
+    event = show_chart(chart_support, use_container_width=True, on_select="rerun", key="support_chart")
+
+    #Drill-down: questions using the selected paragraph
+    selected = [point["paragraphs"] for point in event.selection.get("paragraph", []) if "paragraphs" in point]
+    for paragraph in selected:
+        index = title_index(DATASET_VERSION)
+        in_context = index.positions(paragraph, "context")
+        as_support = index.positions(paragraph, "support")
+
+        st.markdown(
+            f"**{paragraph}**: in the context of {len(in_context)} questions, "
+            f"supporting paragraph of a hop in {len(as_support)}."
+        )
+        if len(in_context):
+            shown = in_context[:MAX_DRILLDOWN_ROWS]
+            questions = question_texts(DATASET_VERSION).iloc[shown].reset_index(drop=True)
+            questions["supporting"] = np.isin(shown, as_support)
+            st.dataframe(questions, use_container_width=True, hide_index=True)
+            if len(in_context) > len(shown):
+                st.caption(f"Showing the first {len(shown)} of {len(in_context)} questions.")
+
+
+# ============================================================
+# TAB 5
+# ============================================================
+@panel("Graph analytics")
+def graph_panel():
+    st.subheader("Paragraph co-occurrence graph")
+
+    with profiler.stage("aggregate"):
+        stats = graph_stats(DATASET_VERSION)
+    n_components = stats["component"].nunique()
+    largest = int(stats.groupby("component").size().max()) if len(stats) else 0
+
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Paragraphs", f"{len(stats):,}")
+    col2.metric("Edges", f"{int(stats['degree'].sum()) // 2:,}")
+    col3.metric("Connected components", f"{n_components:,}")
+    col4.metric("Largest component", f"{largest:,}")
+
+    col_components, col_degree = st.columns(2)
+    with col_components:
+        chart_components = alt.Chart(component_size_counts(stats)).mark_bar().encode(
+            x=alt.X('component_size:N', sort=alt.SortField('bucket'), title='Component size (paragraphs)'),
+            y=alt.Y('count:Q', scale=alt.Scale(type='symlog'), title='Number of components'),
+            tooltip=['component_size', 'count']
+        ).properties(title='Connected component sizes', height=350)
+        show_chart(chart_components, "components chart", use_container_width=True)
+
+    with col_degree:
+        chart_degree = alt.Chart(degree_counts(stats)).mark_bar().encode(
+            x=alt.X('degree:N', sort=alt.SortField('bucket'), title='Degree (co-occurring paragraphs)'),
+            y=alt.Y('count:Q', scale=alt.Scale(type='symlog'), title='Number of paragraphs'),
+            tooltip=['degree', 'count']
+        ).properties(title='Degree distribution', height=350)
+        show_chart(chart_degree, "degree chart", use_container_width=True)
+
+    col_hubs, col_bridges = st.columns(2)
+    with col_hubs:
+        chart_hubs = alt.Chart(top_paragraphs(stats, "pagerank")).mark_bar().encode(
+            x=alt.X('pagerank:Q', title='PageRank'),
+            y=alt.Y('paragraphs:N', sort='-x', title=None, axis=alt.Axis(labelLimit=300)),
+            tooltip=['paragraphs', 'pagerank', 'degree', 'component']
+        ).properties(title='Hub paragraphs', height=450)
+        show_chart(chart_hubs, "hubs chart", use_container_width=True)
+
+    with col_bridges:
+        chart_bridges = alt.Chart(top_paragraphs(stats, "bridge")).mark_bar(color="#f58518").encode(
+            x=alt.X('bridge:Q', title='Other topic clusters reached'),
+            y=alt.Y('paragraphs:N', sort='-x', title=None, axis=alt.Axis(labelLimit=300)),
+            tooltip=['paragraphs', 'bridge', 'degree', 'component']
+        ).properties(title='Bridge paragraphs', height=450)
+        show_chart(chart_bridges, "bridges chart", use_container_width=True)
+
+
+# ============================================================
+# TAB 6
+# ============================================================
+@panel("Search")
+def search_panel():
+    st.subheader("Search questions, decompositions and context")
+
+    with profiler.stage("index"):
+        index = search_index(DATASET_VERSION)
+
+    query = st.text_input(
+        "Query",
+        placeholder='drummer "What Lovers Do" maro*',
+        help='Words must all appear; use "quotes" for phrases and a trailing * for prefixes.'
+    )
+
+    #Filters
+    filters = {}
+    filter_columns = st.columns(len(index.filters) or 1)
+    for column, (field, (_, labels)) in zip(filter_columns, index.filters.items()):
+        choice = column.selectbox(field, ["All", *labels], key=f"search_{field}")
+        if choice != "All":
+            filters[field] = choice
+
+    if query:
+        page = st.session_state.get("search_page", 1)
+        start_time = time.perf_counter()
+        results = index.search(query, filters, offset=(page - 1) * SEARCH_PAGE_SIZE, limit=SEARCH_PAGE_SIZE)
+        elapsed = (time.perf_counter() - start_time) * 1000
+
+        n_pages = max(1, -(-results.total // SEARCH_PAGE_SIZE))
+        if page > n_pages:
+            st.session_state["search_page"] = page = 1
+            results = index.search(query, filters, offset=0, limit=SEARCH_PAGE_SIZE)
+
+        st.caption(f"{results.total} results in {elapsed:.1f} ms")
+        if results.total:
+            rows = question_texts(DATASET_VERSION).iloc[results.positions].reset_index(drop=True)
+            fields = [field for field in index.filters if field in columns]
+            if USE_DB and fields:
+                labels = db.question_fields(results.positions, fields)
+            for field in fields:
+                rows[field] = labels[field].to_numpy() if USE_DB else df[field].iloc[results.positions].to_numpy()
+            rows["score"] = results.scores
+            st.dataframe(rows, use_container_width=True, hide_index=True)
+            st.number_input(f"Result page (of {n_pages})", min_value=1, max_value=n_pages, step=1, key="search_page")
+
+
+# ============================================================
+# TAB 7
+# ============================================================
+@panel("Near duplicates")
+def duplicates_panel():
+    st.subheader("Near-duplicate questions")
+    st.caption(
+        "Templated variants of the same question, grouped by MinHash/LSH over the question text, "
+        "`pattern` and `subquestion_patterns` (estimated Jaccard similarity ≥ 0.5)."
+    )
+
+    with profiler.stage("index"):
+        groups = near_duplicates(DATASET_VERSION)
+    largest, sizes = groups.largest(MAX_DUPLICATE_GROUPS)
+    in_groups = int(groups.sizes[groups.sizes > 1].sum())
+
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Questions", f"{len(groups):,}")
+    col2.metric("Near-duplicate groups", f"{groups.n_groups:,}")
+    col3.metric("Questions hidden by deduplication", f"{in_groups - groups.n_groups:,}")
+
+    size_counts = groups.size_counts()
+    chart_sizes = alt.Chart(
+        alt.Data(values=[{"group_size": size, "count": count} for size, count in size_counts.items()])
+    ).mark_bar().encode(
+        x=alt.X('group_size:O', title='Questions in the group'),
+        y=alt.Y('count:Q', scale=alt.Scale(type='symlog'), title='Number of groups'),
+        tooltip=['group_size:O', 'count:Q']
+    ).properties(title='Near-duplicate group sizes', height=350)
+    show_chart(chart_sizes, "sizes chart", use_container_width=True)
+
+    if not len(largest):
+        st.info("No near-duplicate questions found.")
+        return
+
+    #Largest groups, with the question of their first record
+    texts = question_texts(DATASET_VERSION)
+    table = texts.iloc[largest].reset_index(drop=True)
+    table.insert(0, "questions", sizes)
+    st.dataframe(table, use_container_width=True, hide_index=True)
+    if groups.n_groups > len(largest):
+        st.caption(f"Showing the {len(largest)} largest of {groups.n_groups:,} groups.")
+
+    #Members of one group
+    choice = st.selectbox(
+        "Group", range(len(largest)),
+        format_func=lambda i: f"{texts['_id'].iloc[largest[i]]} ({sizes[i]} questions)"
+    )
+    members = groups.members(largest[choice])[:MAX_DRILLDOWN_ROWS]
+    st.dataframe(texts.iloc[members].reset_index(drop=True), use_container_width=True, hide_index=True)
+
+
+# ============================================================
+# TAB 8
+# ============================================================
+@panel("Answer audit")
+def audit_panel():
+    st.subheader("Answer consistency audit")
+    st.caption(
+        "Hop answers missing from the next hop's question, last-hop answers that differ from `answer`, "
+        "and supporting paragraphs missing from `context`."
+    )
+
+    with profiler.stage("audit"):
+        issues, counts, n_records, n_audited = answer_audit(DATASET_VERSION)
+
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Questions", f"{n_records:,}")
+    col2.metric("Questions with issues", f"{issues['position'].nunique():,}")
+    col3.metric("Audited for this version", f"{n_audited:,}", help="The others were unchanged since the previous version")
+
+    chart_checks = alt.Chart(counts).mark_bar().encode(
+        x=alt.X('records:Q', title='Questions flagged'),
+        y=alt.Y('check:N', title=None, sort='-x'),
+        tooltip=['check', 'records', 'issues', alt.Tooltip('share:Q', format='.2%')]
+    ).properties(title='Flagged questions per check', height=200)
+    show_chart(chart_checks, "checks chart", use_container_width=True)
+
+    check = st.selectbox("Check", ["All", *counts["check"]], key="audit_check")
+    shown = issues if check == "All" else issues[issues["check"] == check]
+    st.dataframe(shown.head(MAX_DRILLDOWN_ROWS), use_container_width=True, hide_index=True)
+    if len(shown) > MAX_DRILLDOWN_ROWS:
+        st.caption(f"Showing the first {MAX_DRILLDOWN_ROWS} of {len(shown):,} issues.")
+
+
+# ============================================================
+# TAB 9
+# ============================================================
+@panel("Question graph")
+def question_graph_panel():
+    st.subheader("Reasoning graph of a question")
+
+    with profiler.stage("index"):
+        records = graph_records(DATASET_VERSION)
+        adjacency = adjacency_index(DATASET_VERSION)
+
+    col_id, col_position, col_neighbours = st.columns(3)
+    question_id = col_id.text_input("Question _id", key="graph_question_id")
+    if question_id:
+        matches = (records["_id"] == question_id).to_numpy().nonzero()[0]
+        if len(matches):
+            st.session_state["graph_question"] = int(matches[0]) + 1
+        else:
+            col_id.caption("No question with this _id.")
+    number = col_position.number_input(
+        f"Question (of {len(records):,})", min_value=1, max_value=max(len(records), 1), value=1, step=1,
+        key="graph_question"
+    )
+    neighbours = col_neighbours.slider("Neighbours per paragraph", 0, 3 * MAX_NEIGHBOURS, MAX_NEIGHBOURS)
+    if not len(records):
+        return
+
+    position = number - 1
+    record = records.iloc[position]
+    renders = graph_renders(DATASET_VERSION)
+    start_time = time.perf_counter()
+    with profiler.stage("render"):
+        html = renders.get((position, neighbours), lambda: question_graph_html(
+            record["question"], record["question_decomposition"], record[TITLES_COLUMN], adjacency, neighbours
+        ))
+    elapsed = (time.perf_counter() - start_time) * 1000
+
+    st.markdown(f"**{record['_id']}**: {record['question']}")
+    st.iframe(html, height=620)
+    st.caption(
+        f"Graph ready in {elapsed:.1f} ms · render cache: {len(renders)} graphs, "
+        f"{renders.bytes / 1024:,.0f} KB, {renders.hits} hits / {renders.misses} misses"
+    )
+
+
+# ============================================================
+# TABS
+# ============================================================
+# The intro tab was drawn with the page shell.
+panels = [hops_panel, heatmap_panel, support_panel, graph_panel, search_panel, duplicates_panel, audit_panel, question_graph_panel]
+
+for tab, render in zip(tabs[1:], panels):
+    if tab.open:
+        with tab:
+            render()
+
+# --- Panel timings (runs stay unchanged for panels an interaction did not touch) ---
+with st.sidebar.expander("Panel timings"):
+    st.dataframe(timings_frame(st.session_state.get("panel_timings", {})), hide_index=True)
+
+# --- Debug: stages of this rerun ---
+if st.sidebar.toggle("Debug: stage profile", key="debug_profile", help="Adds peak memory and chart payload sizes"):
+    st.sidebar.dataframe(profiler.frame(), hide_index=True)
+    if not DEBUG_PROFILE:
+        st.sidebar.caption("Memory and payload columns are filled from the next rerun.")
+
+# --- Startup: time to interactive (first run of the session) ---
+record_interactive()
 
+# --- End of the run: a panel that runs after it is a fragment rerun ---
+profiler.finish()
@@ -0,0 +1,138 @@
+"""
+Cold start of the dashboard: time to first paint and time to interactive.
+
+    python benchmarks/bench_startup.py --records 30000
+    python benchmarks/bench_startup.py --records 30000 --backend sqlite --warm
+    python benchmarks/bench_startup.py --app old_app.py   # e.g. from git show
+
+Every run starts a new Python process (nothing imported yet) in a
+temporary directory holding a copy of a synthetic dataset, so the Parquet
+cache and the backend store are built from scratch (--warm measures a
+second start instead, with the cache of a first one). The app runs in
+Streamlit's AppTest, with MOREHOPQA_METRICS pointing at a temporary file:
+
+  first_paint   page shell and intro tab drawn (startup/first_paint)
+  interactive   end of the first run: the intro tab and the sidebar
+                answer (startup/interactive)
+  data_ready    the warm-up thread loaded the dataset (startup/warm_up)
+  first_chart   Graph 1 drawn, when its tab is opened at data_ready
+
+Times are from the start of the process, medians of --runs runs. An app
+that does not write the startup rows (older versions) reports the end of
+its first run for the first three: it draws nothing before.
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_suite import ROOT, dataset_for  # noqa: E402
+
+APP_FILE = os.path.join(ROOT, "app_final_en.py")
+
+METRICS = ("first_paint", "interactive", "data_ready", "first_chart")
+
+# Shown by the app while the warm-up thread loads the dataset
+LOADING_TEXT = "Loading the dataset"
+
+# Runs in the measured process; prints one JSON line
+DRIVER = """
+import json, os, sys, time
+started, start = time.time(), time.perf_counter()
+from streamlit.testing.v1 import AppTest
+
+def loading(at):
+    return any(LOADING_TEXT in str(element.value) for element in at.caption)
+
+at = AppTest.from_file(sys.argv[1], default_timeout=600)
+at.run()
+result = {"started": started, "first_run": time.perf_counter() - start}
+# Waits for the warm-up row instead of rerunning the app (its reruns would
+# slow the warm-up thread down)
+while loading(at):
+    with open(os.environ["MOREHOPQA_METRICS"], "r", encoding="utf-8") as f:
+        if '"startup/warm_up"' in f.read():
+            at.run()
+            continue
+    time.sleep(0.05)
+result["ready_run"] = time.perf_counter() - start
+at.session_state["tab"] = "Graph 1"
+chart_start = time.perf_counter()
+at.run()
+result["chart_run"] = time.perf_counter() - chart_start
+result["errors"] = [str(e.value) for e in at.exception] + [str(e.value) for e in at.error]
+print(json.dumps(result))
+""".replace("LOADING_TEXT", repr(LOADING_TEXT))
+
+
+def start_once(app, workdir, backend):
+    """One cold process: {metric: seconds since the process started}."""
+    metrics_file = os.path.join(workdir, "metrics.jsonl")
+    if os.path.exists(metrics_file):
+        os.remove(metrics_file)
+    env = dict(os.environ, MOREHOPQA_BACKEND=backend, MOREHOPQA_METRICS=metrics_file)
+    env["PYTHONPATH"] = os.pathsep.join([ROOT, env.get("PYTHONPATH", "")])
+    output = subprocess.run(
+        [sys.executable, "-c", DRIVER, app], cwd=workdir, env=env, capture_output=True, text=True, check=True
+    ).stdout
+    result = json.loads(output.strip().splitlines()[-1])
+    if result["errors"]:
+        raise RuntimeError(f"the app failed: {result['errors']}")
+
+    # Wall clock time of the startup rows (the polling above is coarser)
+    startup = {}
+    if os.path.exists(metrics_file):
+        with open(metrics_file, "r", encoding="utf-8") as f:
+            for line in f:
+                row = json.loads(line)
+                if row["stage"].startswith("startup/"):
+                    startup.setdefault(row["stage"].split("/", 1)[1], row["time"] - result["started"])
+    times = {
+        "first_paint": startup.get("first_paint", result["first_run"]),
+        "interactive": startup.get("interactive", result["first_run"]),
+        "data_ready": startup.get("warm_up", result["ready_run"]),
+    }
+    times["first_chart"] = max(times["data_ready"], times["interactive"]) + result["chart_run"]
+    return times
+
+
+def measure(app, dataset, backend, runs, warm):
+    results = []
+    for _ in range(runs):
+        workdir = tempfile.mkdtemp(prefix="morehopqa-startup-")
+        try:
+            shutil.copy(dataset, os.path.join(workdir, "with_human_verification.json"))
+            if warm:
+                start_once(app, workdir, backend)
+            results.append(start_once(app, workdir, backend))
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+    return {metric: statistics.median(result[metric] for result in results) for metric in METRICS}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--records", type=int, default=30_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--app", default=APP_FILE)
+    parser.add_argument("--backend", choices=["pandas", "sqlite", "live"], default="pandas")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--warm", action="store_true", help="measure a second start, with the cache of the first")
+    args = parser.parse_args()
+
+    dataset = dataset_for(args.records, args.seed)
+    result = measure(os.path.abspath(args.app), dataset, args.backend, args.runs, args.warm)
+    start = "warm" if args.warm else "cold"
+    print(f"{os.path.basename(args.app)}, {args.records:,} records, {args.backend}, {start} start (median of {args.runs})")
+    for metric in METRICS:
+        print(f"  {metric:<12} {result[metric]:8.2f} s")
+
+
+if __name__ == "__main__":
+    main()
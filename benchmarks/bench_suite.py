@@ -0,0 +1,219 @@
+"""
+End-to-end scaling benchmark of the dashboard pipeline on synthetic data.
+
+    python benchmarks/bench_suite.py --sizes 10000 100000 1000000
+    python benchmarks/bench_suite.py --compare 1a2b3c4 HEAD
+
+For each size, a dataset is generated once (benchmarks/data/, see
+synthetic.py) and the following stages are timed on a fresh cache:
+
+  parquet_cache   streaming JSON parse + Parquet cache build
+  json_frame      original path: json.load + pd.DataFrame (small sizes only)
+  frame_build     compact frame (compact_frame.load_compact)
+  store_build     memory-mapped store (shared_store.build_store)
+  store_open      mapping the store into a CompactDataset
+  agg_hops / agg_heatmap / agg_support     chart aggregations
+  spec_hops / spec_heatmap / spec_support  Vega-Lite serialization (+ spec bytes)
+  graph_build     incidence matrix + co-occurrence edges (+ number of edges)
+  near_dups       MinHash/LSH near-duplicate groups (+ number of groups)
+  adjacency       CSR paragraph adjacency index (+ number of entries)
+  question_graph  GRAPH_SAMPLE question graphs rendered (+ page bytes)
+
+Every stage is appended as one JSON line to --results, with the commit it
+ran on, so runs of different commits can be compared with --compare.
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import altair as alt
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from chart_data import enforce_budget, heatmap_counts, hops_counts  # noqa: E402
+from compact_frame import load_compact  # noqa: E402
+from cooccurrence import cooccurrence_edges, load_incidence  # noqa: E402
+from dataset_cache import ensure_cache  # noqa: E402
+from dataset_stream import TITLES_COLUMN  # noqa: E402
+from near_duplicates import load_near_duplicates  # noqa: E402
+from question_graph import load_adjacency, question_graph_html  # noqa: E402
+from ranked_counts import RankedCounts  # noqa: E402
+from shared_store import STORE_COLUMNS, SharedStore, build_store  # noqa: E402
+from synthetic import DATA_VERSION, write_dataset  # noqa: E402
+
+DATA_DIR = os.path.join(ROOT, "benchmarks", "data")
+RESULTS_FILE = os.path.join(ROOT, "benchmarks", "results.jsonl")
+
+# json.load + pd.DataFrame above this size would need tens of GB
+BASELINE_MAX_RECORDS = 1_000_000
+
+PAGE_SIZE = 100
+
+GRAPH_SAMPLE = 200
+
+# Slower by more than this factor in --compare is reported as a regression
+REGRESSION_FACTOR = 1.2
+
+
+def git_revision():
+    """Short hash of HEAD, with a '+' when the working tree has changes."""
+    try:
+        revision = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+        dirty = subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"], cwd=ROOT, capture_output=True, text=True
+        ).stdout.strip()
+        return revision + ("+" if dirty else "")
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def dataset_for(n_records, seed):
+    os.makedirs(DATA_DIR, exist_ok=True)
+    path = os.path.join(DATA_DIR, f"synthetic_{n_records}_seed{seed}_v{DATA_VERSION}.json")
+    if not os.path.exists(path):
+        print(f"generating {n_records:,} records -> {path}")
+        write_dataset(path, n_records, seed)
+    return path
+
+
+class Stages:
+    """Times stages and collects one result row per stage."""
+
+    def __init__(self, records):
+        self.records = records
+        self.rows = []
+
+    def run(self, name, function, **measures):
+        """Runs `function`; `measures` map extra result fields to functions of its value."""
+        start = time.perf_counter()
+        value = function()
+        seconds = time.perf_counter() - start
+        row = {"stage": name, "records": self.records, "seconds": round(seconds, 6)}
+        row.update({field: measure(value) for field, measure in measures.items()})
+        self.rows.append(row)
+        extra = "".join(f"  {field}={row[field]:,}" for field in measures)
+        print(f"{self.records:>10,} {name:<14} {seconds:10.3f} s{extra}")
+        return value
+
+
+def charts(hops, heatmap, support):
+    chart_hops = alt.Chart(hops).mark_bar().encode(
+        x="no_of_hops:O", y="sum(count):Q", color="answer_type:N", tooltip=["no_of_hops", "answer_type", "count"]
+    )
+    chart_heatmap = alt.Chart(heatmap).mark_rect().encode(
+        x="answer_type:N", y="reasoning_type:N", color="count:Q", tooltip=["reasoning_type", "answer_type", "count"]
+    )
+    chart_support = alt.Chart(support).mark_circle().encode(
+        x=alt.X("paragraphs:N", sort=None), y="count:Q", size="count:Q", tooltip=["rank", "paragraphs", "count"]
+    )
+    return chart_hops, chart_heatmap, chart_support
+
+
+def run(n_records, seed, baseline_max):
+    path = dataset_for(n_records, seed)
+    stages = Stages(n_records)
+    cache_dir = tempfile.mkdtemp(prefix="bench-cache-", dir=DATA_DIR)
+    try:
+        _, _, parquet = stages.run("parquet_cache", lambda: ensure_cache(path, cache_dir))
+
+        if n_records <= baseline_max:
+            def json_frame():
+                with open(path, "r", encoding="utf-8") as f:
+                    return pd.DataFrame(json.load(f))
+            stages.run("json_frame", json_frame)
+
+        dataset = stages.run("frame_build", lambda: load_compact(path, STORE_COLUMNS, cache_dir))
+        store_dir = os.path.join(cache_dir, "store")
+        stages.run("store_build", lambda: build_store(parquet, store_dir))
+        store = SharedStore(store_dir)
+        stages.run("store_open", store.dataset)
+        store.close()
+
+        frame, titles = dataset.frame, dataset.titles
+        hops = stages.run("agg_hops", lambda: enforce_budget(hops_counts(frame), collapse="no_of_hops"))
+        heatmap = stages.run("agg_heatmap", lambda: enforce_budget(heatmap_counts(frame), collapse="reasoning_type"))
+
+        def support():
+            ranked = RankedCounts.from_codes(titles.codes, titles.vocabulary)
+            return ranked.window_with_other(0, min(PAGE_SIZE, len(ranked)), end=len(ranked))
+        support = stages.run("agg_support", support)
+
+        for name, chart in zip(("spec_hops", "spec_heatmap", "spec_support"), charts(hops, heatmap, support)):
+            stages.run(name, chart.to_json, bytes=lambda spec: len(spec.encode("utf-8")))
+
+        def graph():
+            incidence, _ = load_incidence(path, cache_dir)
+            return cooccurrence_edges(incidence)
+        stages.run("graph_build", graph, edges=lambda edges: len(edges[0]))
+        stages.run("near_dups", lambda: load_near_duplicates(path, cache_dir), groups=lambda groups: groups.n_groups)
+        adjacency = stages.run("adjacency", lambda: load_adjacency(path, cache_dir), entries=lambda index: len(index.neighbours))
+
+        sample = pd.read_parquet(parquet, columns=["question", "question_decomposition", TITLES_COLUMN]).head(GRAPH_SAMPLE)
+
+        def question_graphs():
+            return [question_graph_html(*row, adjacency) for row in sample.itertuples(index=False)]
+        stages.run("question_graph", question_graphs, bytes=lambda pages: sum(map(len, pages)))
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+    return stages.rows
+
+
+def save(rows, results):
+    meta = {"commit": git_revision(), "date": datetime.now(timezone.utc).isoformat(timespec="seconds")}
+    with open(results, "a", encoding="utf-8") as f:
+        for row in rows:
+            f.write(json.dumps({**meta, **row}) + "\n")
+    print(f"{len(rows)} results appended to {results} (commit {meta['commit']})")
+
+
+def compare(results, old, new):
+    """Latest result of every (records, stage) for two commits, side by side."""
+    rows = pd.read_json(results, lines=True, dtype={"commit": str})
+
+    def latest(revision):
+        revision = git_revision().rstrip("+") if revision == "HEAD" else revision
+        selected = rows[rows["commit"].str.rstrip("+").str.startswith(revision)]
+        if selected.empty:
+            sys.exit(f"no results for commit {revision} in {results}")
+        return selected.sort_values("date").groupby(["records", "stage"]).last()["seconds"]
+
+    table = pd.DataFrame({old: latest(old), new: latest(new)}).dropna()
+    table["ratio"] = (table[new] / table[old]).round(2)
+    table["regression"] = table["ratio"] > REGRESSION_FACTOR
+    pd.set_option("display.width", 120)
+    print(table.to_string())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--results", default=RESULTS_FILE, help="JSON lines file the results are appended to")
+    parser.add_argument("--baseline-max", type=int, default=BASELINE_MAX_RECORDS,
+                        help="largest size for the json.load + pd.DataFrame stage")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="compare two commits instead of running")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(args.results, *args.compare)
+        return
+
+    rows = []
+    for n_records in args.sizes:
+        rows.extend(run(n_records, args.seed, args.baseline_max))
+    save(rows, args.results)
+
+
+if __name__ == "__main__":
+    main()
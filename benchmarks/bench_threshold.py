@@ -0,0 +1,89 @@
+"""
+Per-tick latency of the tab4 frequency slider.
+
+Compares the original path (value_counts over every context entry, then
+a boolean filter) with RankedCounts (counts sorted once, then a binary
+search and a slice per tick) at several numbers of context entries.
+
+    python benchmarks/bench_threshold.py --sizes 10000 1000000 10000000
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ranked_counts import RankedCounts  # noqa: E402
+
+PAGE_SIZE = 100
+
+
+def make_titles(n_entries, seed=0):
+    """Zipf-distributed title codes: few very frequent paragraphs, a long tail."""
+    rng = np.random.default_rng(seed)
+    n_titles = max(10, n_entries // 4)
+    codes = (rng.zipf(1.3, n_entries) - 1) % n_titles
+    vocabulary = np.array([f"Paragraph {i}" for i in range(n_titles)], dtype=object)
+    return codes, vocabulary
+
+
+def per_tick(function, thresholds):
+    start = time.perf_counter()
+    for threshold in thresholds:
+        function(threshold)
+    return (time.perf_counter() - start) / len(thresholds)
+
+
+def run(n_entries, ticks, baseline):
+    codes, vocabulary = make_titles(n_entries)
+
+    start = time.perf_counter()
+    ranked = RankedCounts.from_codes(codes, vocabulary)
+    build = time.perf_counter() - start
+
+    rng = np.random.default_rng(1)
+    thresholds = rng.integers(int(ranked.counts[-1]), int(ranked.counts[0]) + 1, ticks)
+
+    def ranked_tick(threshold):
+        n_visible = ranked.rank_of_threshold(threshold)
+        return ranked.window_with_other(0, PAGE_SIZE, end=n_visible)
+
+    result = {
+        "entries": n_entries,
+        "titles": len(ranked),
+        "build_s": build,
+        "ranked_tick_ms": per_tick(ranked_tick, thresholds) * 1000,
+    }
+
+    if baseline:
+        titles = pd.Series(vocabulary[codes])
+
+        def baseline_tick(threshold):
+            counts = titles.value_counts().rename_axis("paragraphs").reset_index(name="count")
+            return counts[counts["count"] >= threshold]
+
+        result["baseline_tick_ms"] = per_tick(baseline_tick, thresholds[: max(1, ticks // 20)]) * 1000
+
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 1_000_000, 10_000_000])
+    parser.add_argument("--ticks", type=int, default=200, help="slider moves timed per size")
+    parser.add_argument("--no-baseline", action="store_true", help="skip the value_counts baseline")
+    args = parser.parse_args()
+
+    print(f"{'entries':>12} {'titles':>10} {'build (s)':>10} {'tick (ms)':>10} {'baseline tick (ms)':>19}")
+    for n_entries in args.sizes:
+        r = run(n_entries, args.ticks, not args.no_baseline)
+        baseline = f"{r['baseline_tick_ms']:19.3f}" if "baseline_tick_ms" in r else f"{'-':>19}"
+        print(f"{r['entries']:>12} {r['titles']:>10} {r['build_s']:10.3f} {r['ranked_tick_ms']:10.3f} {baseline}")
+
+
+if __name__ == "__main__":
+    main()
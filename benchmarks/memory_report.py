@@ -0,0 +1,45 @@
+"""
+Resident size of the dashboard frame, per column.
+
+"before" is the original load (json.load + pd.DataFrame(data), every field
+as Python objects); "after" is compact_frame.load_compact with the columns
+the dashboard uses (categoricals, titles as interned CSR codes, heavy text
+left in the Parquet cache).
+
+    python benchmarks/memory_report.py with_human_verification.json
+"""
+import argparse
+import json
+import os
+import sys
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from compact_frame import CATEGORY_COLUMNS, column_bytes, load_compact, memory_report  # noqa: E402
+from dataset_stream import DASHBOARD_FIELDS, TITLES_COLUMN  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("dataset", nargs="?", default="with_human_verification.json")
+    args = parser.parse_args()
+
+    with open(args.dataset, "r", encoding="utf-8") as f:
+        before = column_bytes(pd.DataFrame(json.load(f)))
+
+    dataset = load_compact(args.dataset, [*DASHBOARD_FIELDS, *CATEGORY_COLUMNS])
+    after = column_bytes(dataset.frame)
+    if dataset.titles is not None:
+        # The titles replace the nested `context` lists in the hot path
+        after[TITLES_COLUMN] = dataset.titles.nbytes
+        before[TITLES_COLUMN] = 0
+
+    report = memory_report(before, after)
+    pd.set_option("display.width", 120)
+    print(report.to_string(formatters={"before": "{:,}".format, "after": "{:,}".format}))
+
+
+if __name__ == "__main__":
+    main()
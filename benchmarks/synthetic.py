@@ -0,0 +1,190 @@
+"""
+Synthetic MoreHopQA-like dataset of any size.
+
+    python benchmarks/synthetic.py 1000000 --out synthetic_1m.json
+
+Records follow the structure of with_human_verification.json (the example
+of the intro tab): `_id`, question / answer fields, a
+`question_decomposition` whose last hop has nested `details`, `context`
+as [title, [sentences]] pairs, `answer_type`, `reasoning_type`,
+`no_of_hops`, `pattern` and `subquestion_patterns`.
+
+Paragraph titles are drawn from a Zipf distribution, so a few paragraphs
+appear in many contexts and most appear once or twice, as in the real
+data. The file is written record by record: memory stays flat up to
+millions of records.
+"""
+import argparse
+import json
+import re
+
+import numpy as np
+
+# Part of the file names of generated datasets: a new version is generated again
+DATA_VERSION = 2
+
+# Zipf exponent of the paragraph frequencies
+TITLE_SKEW = 1.3
+
+# Distinct paragraph titles per record (roughly: the long tail stays long)
+TITLES_PER_RECORD = 0.6
+
+ANSWER_TYPES = ("number", "person", "date", "place", "other")
+ANSWER_TYPE_WEIGHTS = (0.35, 0.3, 0.15, 0.12, 0.08)
+
+REASONING_TYPES = (
+    "Arithmetic", "Symbolic", "Commonsense, Arithmetic", "Commonsense, Symbolic",
+    "Commonsense, Arithmetic, Symbolic",
+)
+REASONING_TYPE_WEIGHTS = (0.15, 0.15, 0.35, 0.3, 0.05)
+
+# (pattern, subquestion patterns, answer type of the previous answer)
+PATTERNS = (
+    ("How many repeated letters are there in the first name of #Name?",
+     ["What is the first name of #Name?", "How many repeated letters are there in #Ans1?"], "person"),
+    ("What is the year #Date plus 10?",
+     ["What is the year of #Date?", "What is #Ans1 plus 10?"], "date"),
+    ("What is the reverse of the last name of #Name?",
+     ["What is the last name of #Name?", "What is the reverse of #Ans1?"], "person"),
+    ("How many vowels are there in #Place?",
+     ["What are the vowels in #Place?", "How many items are in #Ans1?"], "place"),
+)
+
+# Placeholder of a pattern (#Name, #Date, #Place, #Ans1): replaced by an answer
+TOKEN_RE = re.compile(r"#\w+")
+
+SENTENCES_PER_PARAGRAPH = (1, 6)
+DISTRACTORS = (0, 8)
+
+# Records whose random choices are drawn together
+BLOCK = 4096
+
+
+def fill(pattern, value):
+    """`pattern` with its placeholder replaced by `value`."""
+    return TOKEN_RE.sub(lambda _: value, pattern)
+
+
+class Generator:
+    """Records drawn block by block: the random choices of BLOCK records at a time."""
+
+    def __init__(self, n_records, seed=0):
+        self.rng = np.random.default_rng(seed)
+        self.n_titles = max(100, int(n_records * TITLES_PER_RECORD))
+
+    def _block(self, size):
+        rng = self.rng
+        n_hops = rng.choice((2, 3, 4), size, p=(0.6, 0.3, 0.1))
+        n_distractors = rng.integers(*DISTRACTORS, size, endpoint=True)
+        n_titles = n_hops + n_distractors
+        ranks = (rng.zipf(TITLE_SKEW, int(n_titles.sum())) - 1) % self.n_titles
+        n_paragraphs = int(n_titles.sum())
+        return {
+            "n_hops": n_hops.tolist(),
+            "title_offsets": np.concatenate([[0], np.cumsum(n_titles)]).tolist(),
+            "ranks": ranks.tolist(),
+            "sentences": rng.integers(*SENTENCES_PER_PARAGRAPH, n_paragraphs, endpoint=True).tolist(),
+            "pattern": rng.integers(len(PATTERNS), size=size).tolist(),
+            "answer_type": rng.choice(len(ANSWER_TYPES), size, p=ANSWER_TYPE_WEIGHTS).tolist(),
+            "reasoning_type": rng.choice(len(REASONING_TYPES), size, p=REASONING_TYPE_WEIGHTS).tolist(),
+            "answer": rng.integers(0, 100, size).tolist(),
+            "shuffle": rng.random(n_paragraphs).tolist(),
+        }
+
+    @staticmethod
+    def paragraph(title, n_sentences):
+        return [title, [f"{'' if i == 0 else ' '}{title} sentence {i} with some filler text." for i in range(n_sentences)]]
+
+    def record(self, i, block, j):
+        n_hops = block["n_hops"][j]
+        lo, hi = block["title_offsets"][j], block["title_offsets"][j + 1]
+        titles = list(dict.fromkeys(f"Paragraph {rank}" for rank in block["ranks"][lo:hi]))
+        # The first n_hops distinct titles support the hops, the rest are distractors
+        while len(titles) < n_hops:
+            titles.append(f"Paragraph {self.n_titles + len(titles)}")
+        support = titles[:n_hops]
+
+        pattern, sub_patterns, previous_type = PATTERNS[block["pattern"][j]]
+        # Each hop asks about the answer of the previous one, as answer_audit.py checks
+        hops, answers = [], []
+        for h, title in enumerate(support):
+            answers.append(f"Entity {i}-{h}")
+            subject = f"the entity linked to {title}" + (f" and {answers[h - 1]}" if h else "")
+            hops.append({
+                "sub_id": str(h + 1),
+                "question": f"What is {subject}?",
+                "answer": answers[h],
+                "paragraph_support_title": title,
+            })
+        answer = str(block["answer"][j])
+        previous_question = hops[-1]["question"]
+        cutted_question = subject
+        # The last hop applies the pattern to the previous answer, in two steps
+        intermediate = f"{answers[-1]} part"
+        hops.append({
+            "sub_id": str(n_hops + 1),
+            "question": fill(pattern, answers[-1]),
+            "answer": answer,
+            "paragraph_support_title": "",
+            "details": [
+                {"sub_id": f"{n_hops + 1}_1", "question": fill(sub_patterns[0], answers[-1]),
+                 "answer": intermediate, "paragraph_support_title": ""},
+                {"sub_id": f"{n_hops + 1}_2", "question": fill(sub_patterns[1], intermediate),
+                 "answer": answer, "paragraph_support_title": ""},
+            ],
+        })
+
+        context = [self.paragraph(title, block["sentences"][lo + k]) for k, title in enumerate(titles)]
+        shuffle = block["shuffle"][lo:lo + len(context)]
+        context = [paragraph for _, paragraph in sorted(zip(shuffle, context), key=lambda pair: pair[0])]
+        return {
+            "_id": f"{i // 16:024x}_{i % 16}",
+            "question": fill(pattern, cutted_question),
+            "answer": answer,
+            "previous_question": previous_question,
+            "previous_answer": answers[-1],
+            "question_decomposition": hops,
+            "context": context,
+            "answer_type": ANSWER_TYPES[block["answer_type"][j]],
+            "previous_answer_type": previous_type,
+            "no_of_hops": n_hops,
+            "reasoning_type": REASONING_TYPES[block["reasoning_type"][j]],
+            "pattern": pattern,
+            "subquestion_patterns": sub_patterns,
+            "cutted_question": cutted_question,
+            "ques_on_last_hop": fill(pattern, answers[-1]),
+        }
+
+    def records(self, n_records):
+        for start in range(0, n_records, BLOCK):
+            size = min(BLOCK, n_records - start)
+            block = self._block(size)
+            for j in range(size):
+                yield self.record(start + j, block, j)
+
+
+def write_dataset(path, n_records, seed=0):
+    """Writes `n_records` synthetic records as a JSON list, one record at a time."""
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("[")
+        for i, record in enumerate(Generator(n_records, seed).records(n_records)):
+            if i:
+                f.write(",\n")
+            f.write(json.dumps(record, ensure_ascii=False))
+        f.write("]\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("records", type=int, help="number of records (e.g. 10000 to 10000000)")
+    parser.add_argument("--out", default=None, help="output file (default: synthetic_<records>.json)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    out = args.out or f"synthetic_{args.records}.json"
+    write_dataset(out, args.records, args.seed)
+    print(f"{args.records:,} records written to {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+import os
+from itertools import chain
+
+import pandas as pd
+
+# ============================================================
+# PRE-AGGREGATED CHART DATA
+# ============================================================
+#
+# Altair embeds the DataFrame given to alt.Chart in the Vega-Lite spec
+# sent to the browser. The functions below aggregate in pandas first, so
+# the charts receive counts instead of one row per question, and cap the
+# number of rows of every chart at a configurable budget.
+
+# Maximum number of rows a chart may send to the browser.
+MAX_CHART_ROWS = int(os.environ.get("MOREHOPQA_MAX_CHART_ROWS", "300"))
+
+OTHER_LABEL = "Other"
+
+
+def hops_counts(df, column="no_of_hops"):
+    """Number of questions per (hops column, answer_type)."""
+    keys = [column, "answer_type"] if "answer_type" in df.columns else [column]
+    return df.groupby(keys, observed=True).size().reset_index(name="count")
+
+
+def heatmap_counts(df):
+    """Number of questions per (reasoning_type, answer_type)."""
+    return df.groupby(["reasoning_type", "answer_type"], observed=True).size().reset_index(name="count")
+
+
+def support_counts(titles):
+    """Frequency of each paragraph title; `titles` holds one list of titles per record."""
+    counts = pd.Series(list(chain.from_iterable(titles)), dtype=object).value_counts()
+    return counts.rename_axis("paragraphs").reset_index(name="count")
+
+
+def enforce_budget(frame, collapse, max_rows=MAX_CHART_ROWS, value="count"):
+    """
+    Keeps the chart data under `max_rows` rows.
+
+    The least frequent values of the `collapse` column are merged into a
+    single OTHER_LABEL value (summing `value`), keeping the most frequent
+    ones. Frames already within budget are returned unchanged.
+    """
+    if len(frame) <= max_rows:
+        return frame
+
+    totals = frame.groupby(collapse, observed=True)[value].sum().sort_values(ascending=False)
+    rows_per_value = frame.groupby(collapse, observed=True).size().reindex(totals.index)
+
+    # Room for the OTHER_LABEL rows (at most one per combination of the other keys).
+    other_keys = [c for c in frame.columns if c not in (collapse, value)]
+    other_rows = len(frame[other_keys].drop_duplicates()) if other_keys else 1
+    keep = rows_per_value.index[rows_per_value.cumsum() <= max(max_rows - other_rows, 0)]
+
+    kept = frame[frame[collapse].isin(keep)]
+    rest = frame[~frame[collapse].isin(keep)]
+    if other_keys:
+        rest = rest.groupby(other_keys, observed=True)[value].sum().reset_index()
+    else:
+        rest = pd.DataFrame({value: [rest[value].sum()]})
+    rest[collapse] = f"{OTHER_LABEL} ({len(totals) - len(keep)})"
+
+    kept = kept.astype({collapse: object})
+    rest = rest[frame.columns]
+    # More combinations of the other keys than the budget allows: the
+    # OTHER_LABEL rows are themselves collapsed on the next key.
+    if other_keys and len(kept) + len(rest) > max_rows:
+        rest = enforce_budget(rest, other_keys[0], max_rows - len(kept), value)
+    return pd.concat([kept, rest], ignore_index=True)
+
+
+def payload_size(chart):
+    """Size in bytes of the Vega-Lite spec that is sent to the browser."""
+    return len(chart.to_json().encode("utf-8"))
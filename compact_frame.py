@@ -0,0 +1,180 @@
+import sys
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+from dataset_cache import ensure_cache, load_paragraphs, LazyContext
+from dataset_stream import FIELD_KINDS, TITLES_COLUMN, PARAGRAPHS_COLUMN
+
+# ============================================================
+# COMPACT IN-MEMORY DATASET
+# ============================================================
+#
+# The dashboard only needs a few low-cardinality columns. Instead of one
+# object column per field, the compact load keeps:
+#   - the chart columns, with categoricals for the low-cardinality text
+#     fields (answer_type, previous_answer_type, reasoning_type, pattern);
+#   - the context titles as CSR integer codes into a vocabulary of
+#     interned strings (each distinct title is stored once), taken from
+#     the paragraph ids of the cache, so no title string is compared;
+#   - the heavy text columns (question, context, decomposition, ...) out
+#     of the frame: they are read from the Parquet cache on first use.
+
+CATEGORY_COLUMNS = tuple(field for field, kind in FIELD_KINDS.items() if kind == "category")
+
+
+@dataclass
+class TitleCodes:
+    """Context titles of every record: codes[offsets[i]:offsets[i + 1]] index vocabulary."""
+
+    codes: np.ndarray
+    offsets: np.ndarray
+    vocabulary: np.ndarray
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def row(self, i):
+        return self.vocabulary[self.codes[self.offsets[i]:self.offsets[i + 1]]].tolist()
+
+    @property
+    def nbytes(self):
+        return self.codes.nbytes + self.offsets.nbytes + deep_bytes(self.vocabulary)
+
+
+def read_title_codes(parquet):
+    """TitleCodes of the context of every record of the Parquet cache."""
+    if PARAGRAPHS_COLUMN in pq.read_schema(parquet).names:
+        # Paragraph id -> title id of the paragraph table: integers only
+        paragraphs = pq.read_table(parquet, columns=[PARAGRAPHS_COLUMN]).column(PARAGRAPHS_COLUMN).combine_chunks()
+        offsets = paragraphs.offsets.to_numpy().astype(np.int64)
+        store = load_paragraphs(parquet)
+        codes = store.title_of[paragraphs.flatten().to_numpy()]
+        vocabulary = np.array([sys.intern(str(title)) for title in store.titles], dtype=object)
+        return TitleCodes(codes.astype(np.int32), offsets - offsets[0], vocabulary)
+
+    titles = pq.read_table(parquet, columns=[TITLES_COLUMN]).column(TITLES_COLUMN).combine_chunks()
+    offsets = titles.offsets.to_numpy().astype(np.int64)
+    codes, labels = pd.factorize(titles.flatten().to_numpy(zero_copy_only=False))
+    vocabulary = np.array([sys.intern(str(label)) for label in labels], dtype=object)
+    return TitleCodes(codes.astype(np.int32), offsets - offsets[0], vocabulary)
+
+
+class LazyColumns:
+    """
+    Columns of the Parquet cache that are read on first access only.
+    `context` holds LazyContext objects: paragraph text is only decoded
+    when it is read.
+    """
+
+    def __init__(self, parquet):
+        self.parquet = parquet
+        self.available = set(pq.read_schema(parquet).names)
+        if PARAGRAPHS_COLUMN in self.available:
+            self.available.add("context")
+        self._loaded = {}
+
+    def __contains__(self, column):
+        return column in self.available
+
+    def __getitem__(self, column):
+        if column not in self._loaded:
+            if column not in self.available:
+                raise KeyError(column)
+            if column == "context" and PARAGRAPHS_COLUMN in self.available:
+                store = load_paragraphs(self.parquet)
+                ids = pd.read_parquet(self.parquet, columns=[PARAGRAPHS_COLUMN])[PARAGRAPHS_COLUMN]
+                self._loaded[column] = pd.Series([LazyContext(store, row) for row in ids], dtype=object)
+            else:
+                self._loaded[column] = pd.read_parquet(self.parquet, columns=[column])[column]
+        return self._loaded[column]
+
+    def rows(self, positions, columns):
+        """`columns` at the given row positions, as a new DataFrame."""
+        return pd.DataFrame({column: self[column].iloc[positions].to_numpy() for column in columns})
+
+    def unload(self, column=None):
+        if column is None:
+            self._loaded.clear()
+        else:
+            self._loaded.pop(column, None)
+
+
+@dataclass
+class CompactDataset:
+    frame: pd.DataFrame
+    titles: TitleCodes
+    text: LazyColumns
+
+
+def load_compact(path, columns, cache_dir=None):
+    """
+    Compact dataset: `columns` in a small frame (categoricals where the
+    field is low-cardinality), titles as TitleCodes, every other column
+    available lazily through `.text`.
+    """
+    _, _, parquet = ensure_cache(path, cache_dir)
+    text = LazyColumns(parquet)
+    # The context stays out of the frame (text.context resolves it lazily)
+    columns = [c for c in dict.fromkeys(columns) if c in text and c not in (TITLES_COLUMN, "context")]
+
+    frame = pd.read_parquet(parquet, columns=columns)
+    for column in columns:
+        if column in CATEGORY_COLUMNS:
+            frame[column] = frame[column].astype("category")
+    titles = read_title_codes(parquet) if TITLES_COLUMN in text else None
+    return CompactDataset(frame, titles, text)
+
+
+# ============================================================
+# MEMORY REPORT
+# ============================================================
+
+def deep_bytes(value, seen=None):
+    """
+    Approximate resident size of a Python value, following lists, tuples,
+    dicts and NumPy object arrays; shared objects are counted once.
+    """
+    seen = set() if seen is None else seen
+    if id(value) in seen:
+        return 0
+    seen.add(id(value))
+    if isinstance(value, np.ndarray):
+        size = sys.getsizeof(value) if value.base is None else sys.getsizeof(value) + value.nbytes
+        if value.dtype == object:
+            size += sum(deep_bytes(item, seen) for item in value.ravel())
+        return size
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(deep_bytes(k, seen) + deep_bytes(v, seen) for k, v in value.items())
+    elif isinstance(value, (list, tuple)):
+        size += sum(deep_bytes(item, seen) for item in value)
+    return size
+
+
+def column_bytes(frame):
+    """Bytes per column of a DataFrame, following nested objects (see deep_bytes)."""
+    sizes = {}
+    seen = set()
+    for column in frame.columns:
+        series = frame[column]
+        if series.dtype == object:
+            sizes[column] = int(series.memory_usage(deep=False, index=False)) + sum(
+                deep_bytes(value, seen) for value in series
+            )
+        else:
+            sizes[column] = int(series.memory_usage(deep=True, index=False))
+    return pd.Series(sizes, dtype=np.int64)
+
+
+def memory_report(before, after):
+    """
+    Bytes per column of two frames (`after` may hold extra pseudo-columns,
+    e.g. the TitleCodes arrays), with a TOTAL row.
+    """
+    report = pd.DataFrame({"before": before, "after": after}).fillna(0).astype(np.int64)
+    report.loc["TOTAL"] = report.sum()
+    report["ratio"] = (report["before"] / report["after"].where(report["after"] > 0)).round(1)
+    return report
@@ -0,0 +1,344 @@
+"""
+Paragraph co-occurrence graphs (paragrafos_grafo*.html).
+
+Two paragraph titles are linked when they appear together in the
+`context` of a question. The graphs are derived from the sparse
+question x title incidence matrix A with a single product, A.T @ A,
+whose off-diagonal entries count the questions shared by each pair:
+
+  - paragrafos_grafo.html: within-question graph, one edge per pair
+    that co-occurs in some question (width 1)
+  - paragrafos_grafo_inter_pergunta.html: cross-question graph, edges
+    weighted by the number of questions the pair shares
+
+Both graphs have a node for every paragraph title: a title that shares
+no question with another one (or only below --min-weight) is drawn as an
+isolated node, so the graphs count every paragraph.
+
+Node positions are computed offline (graph_layout) and written into the
+pages with physics disabled. Graphs with more than MAX_INLINE_NODES
+nodes are exported with levels of detail: the page shows one super-node
+per community and loads the real nodes tile by tile from
+<name>_files/tiles/ as the user zooms in.
+
+    python cooccurrence.py with_human_verification.json --out-dir .
+"""
+import argparse
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+from scipy import sparse
+
+from dataset_cache import ensure_cache
+from dataset_stream import TITLES_COLUMN
+from graph_layout import layout, tile_grid, assign_tiles, super_graph, WORLD_SIZE
+
+WITHIN_FILE = "paragrafos_grafo.html"
+CROSS_FILE = "paragrafos_grafo_inter_pergunta.html"
+
+NODE_COLOR = "#97c2fc"
+CLUSTER_COLOR = "#fb7e81"
+
+# Above this many nodes the export switches to levels of detail
+MAX_INLINE_NODES = 3000
+
+# Super-nodes / super-edges shown when zoomed out
+MAX_OVERVIEW_NODES = 1500
+MAX_OVERVIEW_EDGES = 5000
+
+
+# ============================================================
+# SPARSE MATRICES
+# ============================================================
+
+def load_incidence(path, cache_dir=None):
+    """
+    Question x title incidence matrix (CSR, 1 where the title is in the
+    question's context) and the title of each column.
+    """
+    _, _, parquet = ensure_cache(path, cache_dir)
+    titles = pq.read_table(parquet, columns=[TITLES_COLUMN]).column(TITLES_COLUMN).combine_chunks()
+    offsets = titles.offsets.to_numpy()
+    codes, labels = pd.factorize(titles.flatten().to_numpy(zero_copy_only=False))
+    return incidence_matrix(codes, offsets - offsets[0], len(labels)), np.asarray(labels, dtype=object)
+
+
+def incidence_matrix(codes, offsets, n_titles):
+    """Builds the incidence matrix from CSR title codes (row offsets + codes)."""
+    n_questions = len(offsets) - 1
+    data = np.ones(len(codes), dtype=np.int32)
+    # Copies: sum_duplicates() sorts the indices in place
+    matrix = sparse.csr_matrix((data, np.array(codes), np.array(offsets)), shape=(n_questions, n_titles))
+    matrix.sum_duplicates()
+    # A title listed twice in the same context counts once
+    matrix.data[:] = 1
+    return matrix
+
+
+def cooccurrence(incidence):
+    """Title x title matrix: number of questions in which both titles appear."""
+    return (incidence.T @ incidence).tocsr()
+
+
+def cooccurrence_edges(incidence, min_weight=1):
+    """Upper-triangle edges (source, target, weight) of the co-occurrence matrix."""
+    upper = sparse.triu(cooccurrence(incidence), k=1).tocoo()
+    keep = upper.data >= min_weight
+    return upper.row[keep], upper.col[keep], upper.data[keep]
+
+
+# ============================================================
+# HTML EXPORT (vis-network, same layout as the pyvis output)
+# ============================================================
+
+HTML_TEMPLATE = """<html>
+    <head>
+        <meta charset="utf-8">
+        <link rel="stylesheet" href="https://cdnjs.cloudflare.com/ajax/libs/vis-network/9.1.2/dist/dist/vis-network.min.css" crossorigin="anonymous" referrerpolicy="no-referrer" />
+        <script src="https://cdnjs.cloudflare.com/ajax/libs/vis-network/9.1.2/dist/vis-network.min.js" crossorigin="anonymous" referrerpolicy="no-referrer"></script>
+        <style type="text/css">
+             #mynetwork {
+                 width: 100%;
+                 height: 600px;
+                 background-color: #ffffff;
+                 border: 1px solid lightgray;
+                 position: relative;
+                 float: left;
+             }
+        </style>
+    </head>
+    <body>
+        <div id="mynetwork"></div>
+        <script type="text/javascript">
+            var nodes = new vis.DataSet(__NODES__);
+            var edges = new vis.DataSet(__EDGES__);
+            var options = __OPTIONS__;
+            var container = document.getElementById('mynetwork');
+            var network = new vis.Network(container, {nodes: nodes, edges: edges}, options);
+__LOD__
+        </script>
+    </body>
+</html>
+"""
+
+# Zoomed out: super-nodes. Zoomed in (viewport narrower than DETAIL_TILES
+# tiles): the super-nodes are replaced by the nodes of the visible tiles,
+# loaded with <script> tags so the page also works from file://.
+LOD_SCRIPT = """
+            var LOD = __LOD_CONFIG__;
+            var overviewNodes = nodes.get(), overviewEdges = edges.get();
+            var detail = false, loaded = {};
+            var available = new Set(LOD.tiles);
+
+            window.loadTile = function (key, tile) {
+                if (!detail) { return; }
+                loaded[key] = true;
+                nodes.update(tile.nodes);
+                edges.update(tile.edges);
+            };
+
+            function visibleTiles() {
+                var scale = network.getScale(), center = network.getViewPosition();
+                var halfWidth = container.clientWidth / scale / 2, halfHeight = container.clientHeight / scale / 2;
+                var cell = LOD.world / LOD.grid, keys = [];
+                var clamp = function (v) { return Math.min(LOD.grid - 1, Math.max(0, Math.floor(v / cell))); };
+                for (var x = clamp(center.x - halfWidth); x <= clamp(center.x + halfWidth); x++) {
+                    for (var y = clamp(center.y - halfHeight); y <= clamp(center.y + halfHeight); y++) {
+                        keys.push(x + "_" + y);
+                    }
+                }
+                return keys;
+            }
+
+            function refresh() {
+                var cell = LOD.world / LOD.grid;
+                var zoomedIn = container.clientWidth / network.getScale() <= LOD.detailTiles * cell;
+                if (zoomedIn && !detail) {
+                    detail = true;
+                    nodes.clear();
+                    edges.clear();
+                }
+                if (!zoomedIn && detail) {
+                    detail = false;
+                    loaded = {};
+                    nodes.clear();
+                    edges.clear();
+                    nodes.add(overviewNodes);
+                    edges.add(overviewEdges);
+                }
+                if (detail) {
+                    visibleTiles().forEach(function (key) {
+                        if (loaded[key] || !available.has(key)) { return; }
+                        loaded[key] = "loading";
+                        var script = document.createElement("script");
+                        script.src = LOD.files + "/tiles/" + key + ".js";
+                        document.body.appendChild(script);
+                    });
+                }
+            }
+
+            network.on("zoom", refresh);
+            network.on("dragEnd", refresh);
+"""
+
+# Number of tiles across the viewport below which real nodes are shown
+DETAIL_TILES = 3
+
+DEFAULT_OPTIONS = {
+    "configure": {"enabled": False},
+    "edges": {"color": {"inherit": True}, "smooth": {"enabled": False}},
+    "interaction": {"dragNodes": True, "hideEdgesOnDrag": True, "hideNodesOnDrag": False},
+    # Positions come from graph_layout
+    "physics": {"enabled": False},
+}
+
+
+def _json(value):
+    # Keeps "</script>" inside labels from closing the script tag
+    return json.dumps(value).replace("</", "<\\/")
+
+
+def graph_html(nodes, edges, options=None, lod=None):
+    """vis-network page; nodes/edges are lists of vis.js dicts."""
+    return (
+        HTML_TEMPLATE
+        .replace("__NODES__", _json(nodes))
+        .replace("__EDGES__", _json(edges))
+        .replace("__OPTIONS__", json.dumps(options or DEFAULT_OPTIONS, indent=4))
+        .replace("__LOD__", LOD_SCRIPT.replace("__LOD_CONFIG__", _json(lod)) if lod else "")
+    )
+
+
+def write_graph_html(target, nodes, edges, options=None, lod=None):
+    with open(target, "w", encoding="utf-8") as f:
+        f.write(graph_html(nodes, edges, options, lod))
+
+
+def _node(i, labels, positions, node_size):
+    return {
+        "color": NODE_COLOR, "id": int(i), "label": labels[i], "shape": "dot", "size": node_size,
+        "x": round(float(positions[i, 0]), 1), "y": round(float(positions[i, 1]), 1),
+    }
+
+
+def _edge(s, t, w, weighted):
+    return {"id": f"{s}-{t}", "from": int(s), "to": int(t), "width": int(w) if weighted else 1}
+
+
+def graph_elements(labels, positions, sources, targets, weights, node_size, weighted, members=None):
+    """vis.js nodes/edges (with fixed positions) for `members` (default: every node, isolated ones included)."""
+    if members is None:
+        members = np.arange(len(labels))
+    nodes = [_node(i, labels, positions, node_size) for i in members]
+    edges = [_edge(s, t, w, weighted) for s, t, w in zip(sources, targets, weights)]
+    return nodes, edges
+
+
+def overview_elements(labels, positions, communities, sources, targets, weights, node_size):
+    """Super-nodes of the largest communities and the heaviest edges between them."""
+    degree = np.bincount(np.concatenate([sources, targets]), weights=np.concatenate([weights, weights]), minlength=len(labels))
+    centroids, sizes, representative, (a, b, w) = super_graph(positions, communities, sources, targets, weights, degree)
+
+    shown = np.arange(min(len(sizes), MAX_OVERVIEW_NODES))
+    nodes = [
+        {
+            "color": CLUSTER_COLOR if sizes[c] > 1 else NODE_COLOR,
+            "id": f"c{c}",
+            "label": labels[representative[c]] + (f" (+{sizes[c] - 1})" if sizes[c] > 1 else ""),
+            "shape": "dot",
+            "size": node_size + 3 * float(np.log2(sizes[c])),
+            "x": round(float(centroids[c, 0]), 1),
+            "y": round(float(centroids[c, 1]), 1),
+        }
+        for c in shown
+    ]
+
+    keep = (a < len(shown)) & (b < len(shown))
+    a, b, w = a[keep], b[keep], w[keep]
+    top = np.argsort(-w, kind="stable")[:MAX_OVERVIEW_EDGES]
+    edges = [{"id": f"c{a[i]}-c{b[i]}", "from": f"c{a[i]}", "to": f"c{b[i]}", "width": 1 + float(np.log2(w[i]))} for i in top]
+    return nodes, edges
+
+
+def write_lod_site(target, labels, positions, communities, sources, targets, weights, node_size, weighted):
+    """Writes the overview page plus one script per detail tile in <name>_files/tiles/."""
+    files = os.path.splitext(os.path.basename(target))[0] + "_files"
+    tiles_dir = os.path.join(os.path.dirname(target), files, "tiles")
+    os.makedirs(tiles_dir, exist_ok=True)
+    for name in os.listdir(tiles_dir):
+        os.remove(os.path.join(tiles_dir, name))
+
+    members = np.arange(len(labels))
+    grid = tile_grid(len(members))
+    tiles = assign_tiles(positions, grid)
+    tile_of = tiles[:, 0] * grid + tiles[:, 1]
+
+    # Every edge goes to the tiles of both endpoints
+    edge_tiles = np.concatenate([tile_of[sources], tile_of[targets]])
+    edge_ids = np.concatenate([np.arange(len(sources))] * 2)
+    edge_order = np.argsort(edge_tiles, kind="stable")
+    edge_bounds = np.searchsorted(edge_tiles[edge_order], np.arange(grid * grid + 1))
+
+    node_order = members[np.argsort(tile_of[members], kind="stable")]
+    node_bounds = np.searchsorted(tile_of[node_order], np.arange(grid * grid + 1))
+
+    keys = []
+    for tile in range(grid * grid):
+        tile_nodes = node_order[node_bounds[tile]:node_bounds[tile + 1]]
+        if not len(tile_nodes):
+            continue
+        tile_edges = np.unique(edge_ids[edge_order[edge_bounds[tile]:edge_bounds[tile + 1]]])
+        key = f"{tile // grid}_{tile % grid}"
+        keys.append(key)
+        payload = {
+            "nodes": [_node(i, labels, positions, node_size) for i in tile_nodes],
+            "edges": [_edge(sources[e], targets[e], weights[e], weighted) for e in tile_edges],
+        }
+        with open(os.path.join(tiles_dir, f"{key}.js"), "w", encoding="utf-8") as f:
+            f.write(f"loadTile({_json(key)}, {_json(payload)});\n")
+
+    nodes, edges = overview_elements(labels, positions, communities, sources, targets, weights, node_size)
+    lod = {"files": files, "grid": grid, "world": WORLD_SIZE, "detailTiles": DETAIL_TILES, "tiles": keys}
+    write_graph_html(target, nodes, edges, lod=lod)
+
+
+def write_graph(target, labels, positions, communities, sources, targets, weights, node_size, weighted):
+    if len(labels) <= MAX_INLINE_NODES:
+        write_graph_html(target, *graph_elements(labels, positions, sources, targets, weights, node_size, weighted))
+    else:
+        write_lod_site(target, labels, positions, communities, sources, targets, weights, node_size, weighted)
+
+
+def export_graphs(path, out_dir=".", min_weight=1, cache_dir=None):
+    """Writes the within-question and cross-question graphs; returns their paths."""
+    incidence, labels = load_incidence(path, cache_dir)
+    return write_graphs(out_dir, labels, *cooccurrence_edges(incidence, min_weight))
+
+
+def write_graphs(out_dir, labels, sources, targets, weights):
+    """Both graphs of the given edges (laid out again)."""
+    positions, communities = layout(len(labels), sources, targets, weights)
+
+    within = os.path.join(out_dir, WITHIN_FILE)
+    cross = os.path.join(out_dir, CROSS_FILE)
+    write_graph(within, labels, positions, communities, sources, targets, weights, node_size=10, weighted=False)
+    write_graph(cross, labels, positions, communities, sources, targets, weights, node_size=5, weighted=True)
+    return within, cross
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("dataset", nargs="?", default="with_human_verification.json")
+    parser.add_argument("--out-dir", default=".")
+    parser.add_argument("--min-weight", type=int, default=1, help="drop pairs shared by fewer questions")
+    args = parser.parse_args()
+
+    for target in export_graphs(args.dataset, args.out_dir, args.min_weight):
+        print(f"wrote {target}")
+
+
+if __name__ == "__main__":
+    main()
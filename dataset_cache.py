@@ -0,0 +1,409 @@
+import hashlib
+import json
+import os
+import re
+import threading
+from array import array
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from dataset_stream import iter_batches, TITLES_COLUMN, PARAGRAPHS_COLUMN
+
+# ============================================================
+# PERSISTENT COLUMNAR CACHE FOR THE DATASET
+# ============================================================
+#
+# The first call converts the JSON file into a Parquet file inside
+# CACHE_DIR_NAME (next to the dataset). Later calls read that file
+# directly. A cache entry is identified by the path, size, mtime and
+# content hash of the source file, so editing the JSON rebuilds it.
+#
+# `context` is not stored per record: every distinct paragraph (title +
+# sentences) is stored once in a content-addressed paragraph table next
+# to the Parquet file (see PARAGRAPH STORE), and records keep the integer
+# ids of their paragraphs (PARAGRAPHS_COLUMN).
+
+CACHE_DIR_NAME = ".morehopqa_cache"
+CACHE_VERSION = 3
+MANIFEST_FILE = "manifest.json"
+PARAGRAPHS_SUFFIX = "paragraphs.npz"
+
+# Nested fields that Parquet cannot store as-is (mixed lists such as
+# [title, [sentences]]) are kept as JSON text.
+NESTED_COLUMNS = ("question_decomposition", "context", "subquestion_patterns", "supporting_facts")
+
+# Records per Parquet row group while building the cache; the JSON file
+# is streamed, so only one batch is held in memory at a time.
+ROW_GROUP_ROWS = 50_000
+
+# Sessions (and the warm-up thread of the app) are threads of one process:
+# the manifest is updated and a cache built by one of them at a time
+_manifest_lock = threading.Lock()
+_build_lock = threading.Lock()
+
+
+def _cache_dir(path, cache_dir=None):
+    if cache_dir is None:
+        cache_dir = os.path.join(os.path.dirname(os.path.abspath(path)), CACHE_DIR_NAME)
+    os.makedirs(cache_dir, exist_ok=True)
+    return cache_dir
+
+
+def temp_path(target):
+    """Name of `target` while it is written, unique per process and thread; os.replace() publishes it."""
+    return f"{target}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+
+def file_hash(path, chunk_size=1 << 20):
+    """Content hash of the file (BLAKE2b, 128 bits)."""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _read_manifest(cache_dir):
+    try:
+        with open(os.path.join(cache_dir, MANIFEST_FILE), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_manifest(cache_dir, manifest):
+    target = os.path.join(cache_dir, MANIFEST_FILE)
+    tmp = temp_path(target)
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp, target)
+
+
+def dataset_fingerprint(path, cache_dir=None):
+    """
+    Returns a dict with path, size, mtime_ns and content hash of the dataset.
+
+    The content hash is only recomputed when size or mtime differ from the
+    last recorded values, so an unchanged file costs a single stat() call.
+    """
+    path = os.path.abspath(path)
+    cache_dir = _cache_dir(path, cache_dir)
+    stat = os.stat(path)
+
+    entry = _read_manifest(cache_dir).get(path)
+    if entry and entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns:
+        return entry
+
+    entry = {
+        "path": path,
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "hash": file_hash(path),
+    }
+    with _manifest_lock:
+        manifest = _read_manifest(cache_dir)
+        manifest[path] = entry
+        _write_manifest(cache_dir, manifest)
+    return entry
+
+
+def cache_path(fingerprint, cache_dir, suffix=f"v{CACHE_VERSION}.parquet"):
+    """
+    Path of a file derived from one version of the dataset.
+
+    Every file is prefixed with the content hash, so files derived from
+    older versions are recognised (and removed) together with the cache.
+    """
+    return os.path.join(cache_dir, f"{fingerprint['hash']}-{suffix}")
+
+
+def _widen(writer, tmp, schema):
+    """
+    Rewrites the row groups already in `tmp` with the columns of `schema`
+    (nulls in the columns they lack); returns the writer of the new file.
+    """
+    writer.close()
+    previous = temp_path(f"{tmp}.narrow")
+    os.replace(tmp, previous)
+    writer = pq.ParquetWriter(tmp, schema)
+    try:
+        parquet = pq.ParquetFile(previous)
+        for i in range(parquet.num_row_groups):
+            table = parquet.read_row_group(i)
+            columns = [
+                table.column(field.name) if field.name in table.column_names else pa.nulls(table.num_rows, field.type)
+                for field in schema
+            ]
+            writer.write_table(pa.table(columns, schema=schema))
+    except BaseException:
+        writer.close()
+        raise
+    finally:
+        os.remove(previous)
+    return writer
+
+
+def build_cache(path, target, batch_size=ROW_GROUP_ROWS):
+    """Streams the JSON file into a Parquet file and its paragraph table (written atomically)."""
+    tmp = temp_path(target)
+    paragraphs = ParagraphTable()
+    writer = None
+    try:
+        for batch in iter_batches(path, batch_size, paragraphs=paragraphs):
+            table = batch.to_arrow()
+            if writer is None:
+                writer = pq.ParquetWriter(tmp, table.schema)
+            elif len(table.schema) > len(writer.schema):
+                # A field first seen in this batch: the earlier row groups get it as nulls
+                writer = _widen(writer, tmp, table.schema)
+            writer.write_table(table.cast(writer.schema))
+    finally:
+        if writer is not None:
+            writer.close()
+    # The Parquet file is renamed last: its presence means the cache is complete
+    paragraphs.save(paragraphs_path(target))
+    os.replace(tmp, target)
+
+
+def pack_strings(strings):
+    """List of strings -> (UTF-8 blob, offsets), so np.savez needs no pickle."""
+    encoded = [s.encode("utf-8") for s in strings]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(b) for b in encoded], out=offsets[1:])
+    return np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets
+
+
+def unpack_strings(blob, offsets):
+    data = blob.tobytes()
+    return [data[offsets[i]:offsets[i + 1]].decode("utf-8") for i in range(len(offsets) - 1)]
+
+
+def decode_nested(df, columns=NESTED_COLUMNS):
+    """Turns the JSON text columns back into Python lists/dicts."""
+    for column in columns:
+        if column in df.columns:
+            df[column] = [json.loads(value) if isinstance(value, str) else value for value in df[column]]
+    return df
+
+
+def ensure_cache(path, cache_dir=None):
+    """Builds the Parquet cache if needed; returns (fingerprint, cache_dir, parquet path)."""
+    cache_dir = _cache_dir(path, cache_dir)
+    fingerprint = dataset_fingerprint(path, cache_dir)
+    target = cache_path(fingerprint, cache_dir)
+
+    if not os.path.exists(target):
+        with _build_lock:
+            # Another thread may have built it while this one waited
+            if not os.path.exists(target):
+                build_cache(path, target)
+                _remove_stale(cache_dir)
+
+    return fingerprint, cache_dir, target
+
+
+def load_dataset(path, columns=None, cache_dir=None, nested=False, paragraphs="text"):
+    """
+    Loads the dataset as a DataFrame, going through the Parquet cache.
+
+    - columns: optional list of columns to read (Parquet reads only those).
+    - nested: if True, nested columns come back as Python objects instead of JSON text.
+    - paragraphs: how `context` is loaded:
+        "text"  rebuilt from the paragraph table (JSON text, or lists with nested=True)
+        "lazy"  LazyContext objects, resolved when they are read
+        "ids"   not rebuilt: PARAGRAPHS_COLUMN holds the paragraph ids
+    """
+    _, _, target = ensure_cache(path, cache_dir)
+
+    available = set(pq.read_schema(target).names)
+    if columns is not None:
+        wanted = [c for c in columns if c in available or (c == "context" and PARAGRAPHS_COLUMN in available)]
+        columns = [PARAGRAPHS_COLUMN if c == "context" else c for c in wanted]
+    df = pd.read_parquet(target, columns=columns)
+
+    if PARAGRAPHS_COLUMN in df.columns and paragraphs != "ids":
+        store = load_paragraphs(target)
+        ids = df.pop(PARAGRAPHS_COLUMN)
+        if paragraphs == "lazy":
+            context = [LazyContext(store, row) for row in ids]
+        else:
+            context = [store.context(row) if nested else store.context_json(row) for row in ids]
+        df.insert(min(len(df.columns), _context_position(target, columns)), "context", context)
+
+    if nested:
+        df = decode_nested(df)
+    return df
+
+
+def _context_position(parquet, columns):
+    names = columns if columns is not None else pq.read_schema(parquet).names
+    return list(names).index(PARAGRAPHS_COLUMN)
+
+
+# ============================================================
+# PARAGRAPH STORE
+# ============================================================
+#
+# Templated variants of a question copy the same paragraphs verbatim into
+# their `context`. Each distinct paragraph is stored once, keyed by a
+# hash of its title and sentences:
+#
+#   <hash>-paragraphs.npz   digests        (n, 16) BLAKE2b of title + sentences
+#                           title_of       title id of each paragraph
+#                           titles_*       distinct titles (packed strings)
+#                           sentences_*    sentences of each paragraph (JSON text, packed)
+#
+# The sentences stay one UTF-8 blob in memory; a paragraph is decoded
+# only when it is read.
+
+def paragraphs_path(parquet):
+    """Paragraph table next to a Parquet cache file."""
+    directory, name = os.path.split(parquet)
+    return os.path.join(directory, f"{name.split('-', 1)[0]}-{PARAGRAPHS_SUFFIX}")
+
+
+def paragraph_key(title, sentences):
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update("\x1f".join([title, *map(str, sentences)]).encode("utf-8"))
+    return digest.digest()
+
+
+class ParagraphTable:
+    """Interns paragraphs while the cache is built: (title, sentences) -> paragraph id."""
+
+    def __init__(self):
+        self.ids = {}
+        self.digests = []
+        self.titles = {}
+        self.title_of = array("i")
+        self.sentences = []
+
+    def intern(self, title, sentences):
+        title = "" if title is None else str(title)
+        sentences = sentences if isinstance(sentences, list) else [sentences]
+        # Within one build the tuple is a cheaper key; the digest is taken once per paragraph
+        key = (title, *map(str, sentences))
+        paragraph_id = self.ids.get(key)
+        if paragraph_id is None:
+            paragraph_id = self.ids[key] = len(self.ids)
+            self.digests.append(paragraph_key(title, sentences))
+            self.title_of.append(self.titles.setdefault(title, len(self.titles)))
+            self.sentences.append(json.dumps(sentences, ensure_ascii=False))
+        return paragraph_id
+
+    def save(self, target):
+        arrays = {
+            "digests": np.frombuffer(b"".join(self.digests), dtype=np.uint8).reshape(-1, 16),
+            "title_of": np.frombuffer(self.title_of, dtype=np.int32),
+        }
+        arrays["titles_blob"], arrays["titles_offsets"] = pack_strings(list(self.titles))
+        arrays["sentences_blob"], arrays["sentences_offsets"] = pack_strings(self.sentences)
+        tmp = temp_path(target)
+        with open(tmp, "wb") as f:
+            np.savez_compressed(f, **arrays)
+        os.replace(tmp, target)
+
+
+class ParagraphStore:
+    """Read side of the paragraph table."""
+
+    def __init__(self, digests, title_of, titles, sentences_blob, sentences_offsets):
+        self.digests = digests
+        self.title_of = title_of
+        self.titles = titles
+        self._blob = sentences_blob
+        self._offsets = sentences_offsets
+
+    @classmethod
+    def load(cls, target):
+        with np.load(target) as arrays:
+            titles = np.array(unpack_strings(arrays["titles_blob"], arrays["titles_offsets"]), dtype=object)
+            return cls(
+                arrays["digests"], arrays["title_of"], titles,
+                arrays["sentences_blob"].tobytes(), arrays["sentences_offsets"],
+            )
+
+    def __len__(self):
+        return len(self.title_of)
+
+    def title(self, paragraph_id):
+        return self.titles[self.title_of[paragraph_id]]
+
+    def _sentences_json(self, paragraph_id):
+        return self._blob[self._offsets[paragraph_id]:self._offsets[paragraph_id + 1]].decode("utf-8")
+
+    def sentences(self, paragraph_id):
+        return json.loads(self._sentences_json(paragraph_id))
+
+    def paragraph(self, paragraph_id):
+        """[title, sentences], as in the `context` of the JSON file."""
+        return [self.title(paragraph_id), self.sentences(paragraph_id)]
+
+    def context(self, ids):
+        return [self.paragraph(i) for i in ids]
+
+    def context_json(self, ids):
+        """The `context` as JSON text, as stored before paragraphs were interned."""
+        return "[" + ", ".join(
+            f"[{json.dumps(self.title(i), ensure_ascii=False)}, {self._sentences_json(i)}]" for i in ids
+        ) + "]"
+
+    @property
+    def nbytes(self):
+        return self.digests.nbytes + self.title_of.nbytes + len(self._blob) + self._offsets.nbytes
+
+
+class LazyContext:
+    """The `context` of one record, as paragraph ids resolved on access."""
+
+    __slots__ = ("store", "ids")
+
+    def __init__(self, store, ids):
+        self.store = store
+        self.ids = ids
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self.store.paragraph(j) for j in self.ids[i]]
+        return self.store.paragraph(self.ids[i])
+
+    def __iter__(self):
+        return (self.store.paragraph(i) for i in self.ids)
+
+    def __repr__(self):
+        return f"LazyContext({len(self.ids)} paragraphs)"
+
+
+_paragraph_stores = {}
+
+
+def load_paragraphs(parquet):
+    """Paragraph store of a Parquet cache file (loaded once per process)."""
+    target = paragraphs_path(parquet)
+    store = _paragraph_stores.get(target)
+    if store is None:
+        # Stores of removed cache versions are dropped
+        for old in [old for old in _paragraph_stores if not os.path.exists(old)]:
+            del _paragraph_stores[old]
+        store = _paragraph_stores[target] = ParagraphStore.load(target)
+    return store
+
+
+def _remove_stale(cache_dir):
+    """Removes files derived from older versions of the dataset (or of the cache format)."""
+    known = {entry["hash"] for entry in _read_manifest(cache_dir).values()}
+    current = f"-v{CACHE_VERSION}.parquet"
+    for name in os.listdir(cache_dir):
+        old_format = name.endswith(".parquet") and re.search(r"-v\d+\.parquet$", name) and not name.endswith(current)
+        if name == MANIFEST_FILE or name.endswith(".tmp") or (name.split("-", 1)[0] in known and not old_format):
+            continue
+        try:
+            os.remove(os.path.join(cache_dir, name))
+        except OSError:
+            pass
@@ -0,0 +1,357 @@
+import json
+import os
+from array import array
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+# ============================================================
+# STREAMING, FIELD-PROJECTING JSON INGESTION
+# ============================================================
+#
+# The dataset is a single JSON list of records. Instead of json.load,
+# the file is read in chunks and decoded one record at a time; only the
+# requested fields are kept, in pre-sized column buffers. Peak memory
+# follows the projected columns, not the size of the raw document.
+
+CHUNK_SIZE = 1 << 20
+
+# Derived column with the paragraph titles of each record's context.
+TITLES_COLUMN = "context_titles"
+
+# Replaces `context` when paragraphs are interned (see ParagraphBuffer):
+# the ids of the record's paragraphs in the paragraph table.
+PARAGRAPHS_COLUMN = "context_paragraphs"
+
+# Fields the dashboard charts actually use.
+DASHBOARD_FIELDS = ("_id", "no_of_hops", "num_hops", "answer_type", "reasoning_type")
+
+# How each field is stored. Anything not listed is kept as text
+# (lists and dicts are stored as JSON text).
+FIELD_KINDS = {
+    "no_of_hops": "int",
+    "num_hops": "int",
+    "answer_type": "category",
+    "previous_answer_type": "category",
+    "reasoning_type": "category",
+    "pattern": "category",
+}
+
+FORMAT_ERROR = "Unexpected JSON format: expected a list of objects (list of examples)."
+
+
+# ============================================================
+# INCREMENTAL PARSER
+# ============================================================
+
+def _iter_spans(path, chunk_size=CHUNK_SIZE):
+    """Yields (record, number of characters it took in the file)."""
+    decoder = json.JSONDecoder()
+    whitespace = " \t\n\r"
+
+    with open(path, "r", encoding="utf-8") as f:
+        buf = f.read(chunk_size)
+        pos = 0
+        eof = not buf
+        started = False
+
+        while True:
+            while pos < len(buf) and buf[pos] in whitespace:
+                pos += 1
+
+            if pos == len(buf):
+                if eof:
+                    raise ValueError(FORMAT_ERROR)
+                more = f.read(chunk_size)
+                buf, pos, eof = more, 0, not more
+                continue
+
+            char = buf[pos]
+            if not started:
+                if char != "[":
+                    raise ValueError(FORMAT_ERROR)
+                started = True
+                pos += 1
+                continue
+            if char == "]":
+                return
+            if char == ",":
+                pos += 1
+                continue
+
+            try:
+                record, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                # Record cut by the chunk boundary: read more (at least as
+                # much as is already buffered, so big records stay linear).
+                more = f.read(max(chunk_size, len(buf) - pos))
+                buf, pos, eof = buf[pos:] + more, 0, not more
+                continue
+
+            if not isinstance(record, dict):
+                raise ValueError(FORMAT_ERROR)
+            yield record, end - pos
+            pos = end
+
+
+def iter_records(path, chunk_size=CHUNK_SIZE):
+    """Walks the top-level list of the file, one record at a time."""
+    for record, _ in _iter_spans(path, chunk_size):
+        yield record
+
+
+# ============================================================
+# COLUMN BUFFERS
+# ============================================================
+
+class ColumnBuffer:
+    """Pre-sized buffer for one projected field (grows by 1.5x if needed)."""
+
+    def __init__(self, kind, capacity):
+        self.kind = kind
+        self.size = 0
+        if kind == "int":
+            self.values = np.zeros(capacity, dtype=np.int64)
+            self.valid = np.zeros(capacity, dtype=bool)
+        elif kind == "category":
+            self.values = np.full(capacity, -1, dtype=np.int32)
+            self.vocab = {}
+        else:
+            self.values = np.empty(capacity, dtype=object)
+
+    def _grow(self, capacity):
+        extra = capacity - len(self.values)
+        if self.kind == "int":
+            self.values = np.concatenate([self.values, np.zeros(extra, dtype=np.int64)])
+            self.valid = np.concatenate([self.valid, np.zeros(extra, dtype=bool)])
+        elif self.kind == "category":
+            self.values = np.concatenate([self.values, np.full(extra, -1, dtype=np.int32)])
+        else:
+            self.values = np.concatenate([self.values, np.empty(extra, dtype=object)])
+
+    def reserve(self, rows):
+        if rows > len(self.values):
+            self._grow(max(rows, int(len(self.values) * 1.5) + 16))
+
+    def append(self, value):
+        i = self.size
+        self.reserve(i + 1)
+        if value is not None:
+            if self.kind == "int":
+                self.values[i] = int(value)
+                self.valid[i] = True
+            elif self.kind == "category":
+                self.values[i] = self.vocab.setdefault(str(value), len(self.vocab))
+            elif isinstance(value, (list, dict)):
+                self.values[i] = json.dumps(value, ensure_ascii=False)
+            else:
+                self.values[i] = str(value)
+        self.size = i + 1
+
+    def pad(self, rows):
+        """Fills missing values up to `rows` (field absent in earlier records)."""
+        self.reserve(rows)
+        self.size = rows
+
+    def categories(self):
+        return list(self.vocab)
+
+    def to_pandas(self):
+        n = self.size
+        if self.kind == "int":
+            if self.valid[:n].all():
+                return pd.Series(self.values[:n])
+            return pd.Series(pd.array(self.values[:n], dtype="Int64")).mask(~self.valid[:n])
+        if self.kind == "category":
+            return pd.Series(pd.Categorical.from_codes(self.values[:n], self.categories()))
+        return pd.Series(self.values[:n])
+
+    def to_arrow(self):
+        n = self.size
+        if self.kind == "int":
+            return pa.array(self.values[:n], type=pa.int64(), mask=~self.valid[:n])
+        if self.kind == "category":
+            codes = self.values[:n]
+            indices = pa.array(codes, type=pa.int32(), mask=codes < 0)
+            dictionary = pa.array(self.categories(), type=pa.string())
+            return pa.DictionaryArray.from_arrays(indices, dictionary).cast(pa.string())
+        return pa.array(self.values[:n], type=pa.string())
+
+
+class TitleBuffer:
+    """Context titles of every record as CSR arrays: codes + row offsets."""
+
+    def __init__(self, capacity):
+        self.codes = np.zeros(capacity * 2, dtype=np.int32)
+        self.offsets = np.zeros(capacity + 1, dtype=np.int64)
+        self.vocab = {}
+        self.rows = 0
+
+    def append(self, context):
+        titles = [item[0] for item in (context or []) if item]
+        start = self.offsets[self.rows]
+        end = start + len(titles)
+        if end > len(self.codes):
+            self.codes = np.concatenate([self.codes, np.zeros(max(end, len(self.codes) // 2), dtype=np.int32)])
+        if self.rows + 2 > len(self.offsets):
+            self.offsets = np.concatenate([self.offsets, np.zeros(len(self.offsets) // 2 + 2, dtype=np.int64)])
+        for j, title in enumerate(titles):
+            self.codes[start + j] = self.vocab.setdefault(title, len(self.vocab))
+        self.rows += 1
+        self.offsets[self.rows] = end
+
+    def titles(self):
+        return np.array(list(self.vocab), dtype=object)
+
+    def to_lists(self):
+        names = self.titles()
+        codes, offsets = self.codes[: self.offsets[self.rows]], self.offsets[: self.rows + 1]
+        return [list(names[codes[offsets[i]:offsets[i + 1]]]) for i in range(self.rows)]
+
+    def to_arrow(self):
+        end = self.offsets[self.rows]
+        values = pa.DictionaryArray.from_arrays(
+            pa.array(self.codes[:end], type=pa.int32()),
+            pa.array(list(self.vocab), type=pa.string()),
+        ).cast(pa.string())
+        return pa.ListArray.from_arrays(pa.array(self.offsets[: self.rows + 1].astype(np.int32)), values)
+
+
+class ParagraphBuffer:
+    """
+    Context paragraphs of every record as CSR arrays of paragraph ids.
+    `table` interns the paragraphs (table.intern(title, sentences) -> id)
+    and is shared by the batches, so the ids are global.
+    """
+
+    def __init__(self, table):
+        self.table = table
+        self.ids = array("i")
+        self.offsets = array("i", [0])
+
+    def append(self, context):
+        intern = self.table.intern
+        for item in context or []:
+            if item:
+                self.ids.append(intern(item[0], item[1] if len(item) > 1 else []))
+        self.offsets.append(len(self.ids))
+
+    def pad(self, rows):
+        """Empty contexts up to `rows` (field absent in earlier records)."""
+        self.offsets.extend([len(self.ids)] * (rows - len(self.offsets) + 1))
+
+    def to_pandas(self):
+        return pd.Series(self.to_arrow().to_pylist())
+
+    def to_arrow(self):
+        return pa.ListArray.from_arrays(
+            pa.array(np.frombuffer(self.offsets, dtype=np.int32)), pa.array(np.frombuffer(self.ids, dtype=np.int32))
+        )
+
+
+class ProjectedColumns:
+    """
+    Projected fields of the dataset, filled record by record. With a
+    paragraph table, `context` is stored as paragraph ids (PARAGRAPHS_COLUMN,
+    at the position of `context`) instead of JSON text.
+    """
+
+    def __init__(self, fields=None, capacity=1024, titles=True, paragraphs=None, extend=False):
+        # extend: `fields` are the first columns, later fields are added as they appear
+        self.fixed = fields is not None and not extend
+        self.capacity = capacity
+        self.rows = 0
+        self.buffers = {}
+        self.paragraph_table = paragraphs
+        for field in fields or ():
+            self._add_field(field)
+        self.titles = TitleBuffer(capacity) if titles else None
+
+    def _add_field(self, field):
+        if field == "context" and self.paragraph_table is not None:
+            buffer = ParagraphBuffer(self.paragraph_table)
+        else:
+            buffer = ColumnBuffer(FIELD_KINDS.get(field, "text"), self.capacity)
+        buffer.pad(self.rows)
+        self.buffers[field] = buffer
+        return buffer
+
+    @property
+    def fields(self):
+        return list(self.buffers)
+
+    @staticmethod
+    def _column_name(field, buffer):
+        return PARAGRAPHS_COLUMN if isinstance(buffer, ParagraphBuffer) else field
+
+    def append(self, record):
+        if not self.fixed:
+            for field in record:
+                if field not in self.buffers:
+                    self._add_field(field)
+        for field, buffer in self.buffers.items():
+            buffer.append(record.get(field))
+        if self.titles is not None:
+            self.titles.append(record.get("context"))
+        self.rows += 1
+
+    def to_frame(self):
+        df = pd.DataFrame({self._column_name(field, buffer): buffer.to_pandas() for field, buffer in self.buffers.items()})
+        if self.titles is not None:
+            df[TITLES_COLUMN] = self.titles.to_lists()
+        return df
+
+    def to_arrow(self):
+        columns = {self._column_name(field, buffer): buffer.to_arrow() for field, buffer in self.buffers.items()}
+        if self.titles is not None:
+            columns[TITLES_COLUMN] = self.titles.to_arrow()
+        return pa.table(columns)
+
+
+# ============================================================
+# READERS
+# ============================================================
+
+def _estimate_rows(path, first_span):
+    return max(1, int(os.path.getsize(path) / max(first_span, 1) * 1.1))
+
+
+def read_projected(path, fields=DASHBOARD_FIELDS, titles=True, chunk_size=CHUNK_SIZE):
+    """
+    Reads only `fields` (plus the context titles) from the JSON file.
+
+    Buffers are pre-sized from the file size and the size of the first
+    record, so they are rarely resized while streaming.
+    """
+    columns = None
+    for record, span in _iter_spans(path, chunk_size):
+        if columns is None:
+            columns = ProjectedColumns(fields, capacity=_estimate_rows(path, span), titles=titles)
+        columns.append(record)
+    return columns if columns is not None else ProjectedColumns(fields, capacity=0, titles=titles)
+
+
+def iter_batches(path, batch_size, fields=None, chunk_size=CHUNK_SIZE, paragraphs=None):
+    """
+    Streams the file as ProjectedColumns batches of `batch_size` records.
+
+    With fields=None the fields are discovered as they appear: every
+    batch starts with the columns of the batch before it, in the same
+    order, and adds the fields first seen in its records after them (the
+    earlier batches lack these). `paragraphs`: a paragraph table shared
+    by the batches (see ParagraphBuffer).
+    """
+    discover = fields is None
+    batch = ProjectedColumns(fields, capacity=batch_size, paragraphs=paragraphs)
+    for record in iter_records(path, chunk_size):
+        batch.append(record)
+        if batch.rows == batch_size:
+            yield batch
+            batch = ProjectedColumns(
+                batch.fields if discover else fields, capacity=batch_size, paragraphs=paragraphs, extend=discover
+            )
+    if batch.rows or not batch.fields:
+        yield batch
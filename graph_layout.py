@@ -0,0 +1,193 @@
+import numpy as np
+from scipy import sparse
+from scipy.sparse.linalg import eigsh
+
+# ============================================================
+# OFFLINE LAYOUT AND LEVEL OF DETAIL FOR THE PARAGRAPH GRAPHS
+# ============================================================
+#
+# The browser no longer runs physics: positions are computed here and
+# written into the page.
+#   1. communities: weighted label propagation over the edge list
+#   2. each community is laid out on its own (circle, force-directed or
+#      spectral, depending on its size) and scaled by sqrt(size)
+#   3. communities are packed on shelves, largest first
+# For big graphs the export is split in levels of detail: one super-node
+# per community when zoomed out, and the real nodes in square tiles of
+# the plane, loaded only for the tiles in the viewport.
+
+LP_ITERATIONS = 20
+CIRCLE_MAX_NODES = 8
+FORCE_MAX_NODES = 300
+FORCE_ITERATIONS = 60
+
+# Size of the plane, in vis.js canvas units
+WORLD_SIZE = 10_000.0
+
+# Average number of nodes per detail tile
+NODES_PER_TILE = 400
+
+
+def _symmetric(n, sources, targets, weights):
+    matrix = sparse.coo_matrix((weights, (sources, targets)), shape=(n, n))
+    return (matrix + matrix.T).tocsr()
+
+
+def communities(n, sources, targets, weights, iterations=LP_ITERATIONS, seed=0):
+    """
+    Label propagation: every node takes the label with the largest total
+    edge weight among its neighbours. Only a random half of the nodes is
+    updated per round, which avoids two nodes swapping labels forever.
+    Returns one community number per node (0 = largest community).
+    """
+    rng = np.random.default_rng(seed)
+    labels = np.arange(n, dtype=np.int64)
+    src = np.concatenate([sources, targets]).astype(np.int64)
+    dst = np.concatenate([targets, sources]).astype(np.int64)
+    w = np.concatenate([weights, weights]).astype(np.float64)
+
+    for _ in range(iterations):
+        keys, inverse = np.unique(src * n + labels[dst], return_inverse=True)
+        totals = np.bincount(inverse, weights=w)
+        key_src, key_label = keys // n, keys % n
+        # Per node, the heaviest label (ties: the smallest label)
+        order = np.lexsort((key_label, -totals, key_src))
+        first = np.ones(len(order), dtype=bool)
+        first[1:] = key_src[order][1:] != key_src[order][:-1]
+        best_src, best_label = key_src[order][first], key_label[order][first]
+
+        update = rng.random(len(best_src)) < 0.5
+        changed = labels[best_src[update]] != best_label[update]
+        labels[best_src[update]] = best_label[update]
+        if not changed.any() and update.all():
+            break
+
+    _, inverse, sizes = np.unique(labels, return_inverse=True, return_counts=True)
+    # Renumber by decreasing size
+    rank = np.empty(len(sizes), dtype=np.int64)
+    rank[np.argsort(-sizes, kind="stable")] = np.arange(len(sizes))
+    return rank[inverse]
+
+
+def _force_layout(adjacency, iterations=FORCE_ITERATIONS, seed=0):
+    """Fruchterman-Reingold on a small dense graph; positions in [-1, 1]."""
+    n = adjacency.shape[0]
+    rng = np.random.default_rng(seed)
+    pos = rng.uniform(-1, 1, (n, 2))
+    dense = adjacency.toarray() > 0
+    k = np.sqrt(4.0 / n)
+    temperature = 0.1
+    for _ in range(iterations):
+        delta = pos[:, None, :] - pos[None, :, :]
+        distance = np.maximum(np.linalg.norm(delta, axis=-1), 1e-3)
+        force = k * k / distance - dense * distance * distance / k
+        displacement = (delta * (force / distance)[:, :, None]).sum(axis=1)
+        length = np.maximum(np.linalg.norm(displacement, axis=1), 1e-9)
+        pos += displacement / length[:, None] * np.minimum(length, temperature)[:, None]
+        temperature *= 0.95
+    return _normalize(pos)
+
+
+def _spectral_layout(adjacency, seed=0):
+    """Two smallest non-trivial eigenvectors of the normalized Laplacian."""
+    n = adjacency.shape[0]
+    try:
+        laplacian = sparse.csgraph.laplacian(adjacency.astype(np.float64), normed=True)
+        _, vectors = eigsh(laplacian, k=3, sigma=-1e-3, which="LM", v0=np.full(n, 1.0 / np.sqrt(n)))
+        pos = vectors[:, 1:3]
+    except Exception:
+        pos = np.random.default_rng(seed).uniform(-1, 1, (n, 2))
+    return _normalize(pos)
+
+
+def _normalize(pos):
+    pos = pos - pos.mean(axis=0)
+    scale = np.abs(pos).max()
+    return pos / scale if scale > 0 else pos
+
+
+def layout(n, sources, targets, weights, seed=0):
+    """
+    Positions (n x 2, in [0, WORLD_SIZE]) and community of every node.
+    Nodes without edges form single-node communities.
+    """
+    labels = communities(n, sources, targets, weights, seed=seed)
+    sizes = np.bincount(labels)
+    adjacency = _symmetric(n, sources, targets, weights)
+
+    order = np.argsort(labels, kind="stable")
+    bounds = np.concatenate([[0], np.cumsum(sizes)])
+    local = np.zeros((n, 2))
+
+    # Small communities: nodes on a circle (vectorized)
+    rank = np.arange(n) - bounds[labels[order]]
+    small = sizes[labels[order]] <= CIRCLE_MAX_NODES
+    angle = 2 * np.pi * rank[small] / sizes[labels[order][small]]
+    single = sizes[labels[order][small]] == 1
+    local[order[small]] = np.where(single[:, None], 0.0, np.c_[np.cos(angle), np.sin(angle)])
+
+    # Larger communities: force-directed or spectral layout of their subgraph
+    for community in np.flatnonzero(sizes > CIRCLE_MAX_NODES):
+        members = order[bounds[community]:bounds[community + 1]]
+        sub = adjacency[members][:, members]
+        if len(members) <= FORCE_MAX_NODES:
+            local[members] = _force_layout(sub, seed=seed)
+        else:
+            local[members] = _spectral_layout(sub, seed=seed)
+
+    # Shelf packing of the communities, largest first (labels are sorted by size)
+    radius = np.sqrt(sizes) + 1.0
+    row_width = np.sqrt((4 * radius ** 2).sum())
+    centers = np.zeros((len(sizes), 2))
+    x = y = shelf = 0.0
+    for community, r in enumerate(radius):
+        if x + 2 * r > row_width and x > 0:
+            x, y, shelf = 0.0, y + shelf, 0.0
+        centers[community] = (x + r, y + r)
+        x += 2 * r
+        shelf = max(shelf, 2 * r)
+
+    positions = centers[labels] + local * radius[labels][:, None] * 0.9
+    extent = max(positions.max(), 1.0) if n else 1.0
+    return positions / extent * WORLD_SIZE, labels
+
+
+# ============================================================
+# LEVELS OF DETAIL
+# ============================================================
+
+def tile_grid(n_nodes):
+    """Tiles per side of the plane for the detail level."""
+    return max(1, int(np.ceil(np.sqrt(n_nodes / NODES_PER_TILE))))
+
+
+def assign_tiles(positions, grid):
+    """Tile (column, row) of every node."""
+    cell = WORLD_SIZE / grid
+    return np.minimum((positions // cell).astype(np.int64), grid - 1)
+
+
+def super_graph(positions, labels, sources, targets, weights, degree):
+    """
+    One super-node per community (centroid, member count and the label of
+    its best connected member) and the summed edges between communities.
+    """
+    n_communities = labels.max() + 1 if len(labels) else 0
+    sizes = np.bincount(labels, minlength=n_communities)
+    centroids = np.c_[
+        np.bincount(labels, weights=positions[:, 0], minlength=n_communities),
+        np.bincount(labels, weights=positions[:, 1], minlength=n_communities),
+    ] / np.maximum(sizes, 1)[:, None]
+
+    # Representative member: highest weighted degree in the community
+    order = np.lexsort((-degree, labels))
+    first = np.ones(len(order), dtype=bool)
+    first[1:] = labels[order][1:] != labels[order][:-1]
+    representative = order[first]
+
+    a, b = labels[sources], labels[targets]
+    keep = a != b
+    lo, hi = np.minimum(a[keep], b[keep]), np.maximum(a[keep], b[keep])
+    keys, inverse = np.unique(lo * n_communities + hi, return_inverse=True)
+    edge_weights = np.bincount(inverse, weights=weights[keep]) if len(keys) else np.zeros(0)
+    return centroids, sizes, representative, (keys // max(n_communities, 1), keys % max(n_communities, 1), edge_weights)
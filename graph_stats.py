@@ -0,0 +1,151 @@
+import os
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from cooccurrence import load_incidence, cooccurrence_edges
+from dataset_cache import ensure_cache, cache_path, temp_path
+from graph_layout import communities
+
+# ============================================================
+# GRAPH ANALYTICS OVER PARAGRAPH CO-OCCURRENCE
+# ============================================================
+#
+# Per paragraph title of the co-occurrence graph:
+#   - component: connected component (vectorized union-find)
+#   - degree / weighted_degree: distinct neighbours / shared questions
+#   - pagerank: sparse power iteration
+#   - community: topic cluster (label propagation, as in graph_layout)
+#   - bridge: number of other communities among its neighbours; high
+#     values mark paragraphs linking otherwise separate clusters
+# Computed once per dataset version and saved next to the Parquet cache.
+
+STATS_SUFFIX = "graph-stats.parquet"
+
+PAGERANK_DAMPING = 0.85
+PAGERANK_ITERATIONS = 50
+PAGERANK_TOLERANCE = 1e-8
+
+
+def union_find(n, a, b):
+    """
+    Root of every element after merging the pairs (a[i], b[i]).
+
+    Vectorized union-find: every round hooks the larger root of each pair
+    onto the smaller one, then compresses paths by pointer jumping. It
+    needs O(log n) rounds of array operations instead of a Python loop
+    over the pairs.
+    """
+    parent = np.arange(n, dtype=np.int64)
+    a, b = np.asarray(a, dtype=np.int64), np.asarray(b, dtype=np.int64)
+    while True:
+        ra, rb = parent[a], parent[b]
+        differ = ra != rb
+        if not differ.any():
+            return parent
+        np.minimum.at(parent, np.maximum(ra[differ], rb[differ]), np.minimum(ra[differ], rb[differ]))
+        while True:
+            grand = parent[parent]
+            if np.array_equal(grand, parent):
+                break
+            parent = grand
+
+
+def pagerank(adjacency, damping=PAGERANK_DAMPING, iterations=PAGERANK_ITERATIONS, tol=PAGERANK_TOLERANCE):
+    """PageRank of a symmetric weighted adjacency matrix (CSR)."""
+    n = adjacency.shape[0]
+    if n == 0:
+        return np.zeros(0)
+    out_weight = np.asarray(adjacency.sum(axis=1)).ravel()
+    dangling = out_weight == 0
+    inverse = np.where(dangling, 0.0, 1.0 / np.where(dangling, 1.0, out_weight))
+    transition = sparse.diags(inverse) @ adjacency
+
+    rank = np.full(n, 1.0 / n)
+    for _ in range(iterations):
+        new = damping * (transition.T @ rank + rank[dangling].sum() / n) + (1 - damping) / n
+        if np.abs(new - rank).sum() < tol:
+            return new
+        rank = new
+    return rank
+
+
+def bridge_scores(labels, sources, targets):
+    """Number of distinct communities, other than its own, among each node's neighbours."""
+    src = np.concatenate([sources, targets]).astype(np.int64)
+    dst = np.concatenate([targets, sources]).astype(np.int64)
+    other = labels[src] != labels[dst]
+    n_labels = int(labels.max()) + 1 if len(labels) else 1
+    pairs = np.unique(src[other] * n_labels + labels[dst][other])
+    return np.bincount(pairs // n_labels, minlength=len(labels))
+
+
+def compute_graph_stats(labels, sources, targets, weights):
+    """One row per paragraph title with the measures described above."""
+    n = len(labels)
+    matrix = sparse.coo_matrix((weights.astype(np.float64), (sources, targets)), shape=(n, n))
+    adjacency = (matrix + matrix.T).tocsr()
+
+    roots = union_find(n, sources, targets)
+    _, component = np.unique(roots, return_inverse=True)
+    community = communities(n, sources, targets, weights)
+
+    return pd.DataFrame({
+        "paragraphs": labels,
+        "component": component,
+        "degree": np.diff(adjacency.indptr),
+        "weighted_degree": np.asarray(adjacency.sum(axis=1)).ravel().astype(np.int64),
+        "pagerank": pagerank(adjacency),
+        "community": community,
+        "bridge": bridge_scores(community, sources, targets),
+    })
+
+
+def load_graph_stats(path, cache_dir=None):
+    """Graph measures of the current dataset version, computed on first use."""
+    fingerprint, cache_dir, _ = ensure_cache(path, cache_dir)
+    target = cache_path(fingerprint, cache_dir, STATS_SUFFIX)
+    if os.path.exists(target):
+        return pd.read_parquet(target)
+
+    incidence, labels = load_incidence(path, cache_dir)
+    stats = compute_graph_stats(labels, *cooccurrence_edges(incidence))
+    tmp = temp_path(target)
+    stats.to_parquet(tmp, index=False)
+    os.replace(tmp, target)
+    return stats
+
+
+# ============================================================
+# SUMMARIES FOR THE CHARTS
+# ============================================================
+
+def log_binned(values, name):
+    """
+    Counts of `values` in powers-of-two buckets (1, 2-3, 4-7, ...), so the
+    distribution charts stay small however many distinct values there are.
+    """
+    values = np.asarray(values, dtype=np.int64)
+    values = values[values > 0]
+    buckets = np.left_shift(1, np.floor(np.log2(values)).astype(np.int64)) if len(values) else values
+    counts = pd.Series(buckets).value_counts().sort_index()
+    return pd.DataFrame({
+        name: [f"{b}" if b == 1 else f"{b}–{2 * b - 1}" for b in counts.index],
+        "bucket": counts.index,
+        "count": counts.to_numpy(),
+    })
+
+
+def component_size_counts(stats):
+    """Number of components per size bucket."""
+    return log_binned(stats.groupby("component").size(), "component_size")
+
+
+def degree_counts(stats):
+    """Number of paragraphs per degree bucket (paragraphs with at least one edge)."""
+    return log_binned(stats["degree"], "degree")
+
+
+def top_paragraphs(stats, column, k=20):
+    return stats.nlargest(k, column)[["paragraphs", column, "degree", "component"]]
@@ -0,0 +1,473 @@
+"""
+Incremental re-aggregation of a dataset file that keeps being edited.
+
+    python live_ingest.py with_human_verification.json [--graphs OUT_DIR]
+
+Human verification edits and appends records of the JSON file while the
+dashboard is open. A LiveDataset keeps, per `_id`, what each record adds
+to the counts (hops, answer_type, reasoning_type, context titles) and
+the counts themselves:
+
+  combinations  (no_of_hops, answer_type, reasoning_type) -> questions;
+                Graph 1 and Graph 2 are sums over it
+  title counts  paragraph title -> questions (Graph 3)
+  pairs         co-occurring title pairs -> questions (the paragraph
+                graphs): a sparse matrix of the first snapshot plus a
+                dict of the changes since, folded in when it grows
+
+When the file changes, only the records whose keys changed are
+subtracted and added again. Appends are found without decoding the
+rest of the file: the bytes read last time (up to the end of the last
+record) are hashed again (BLAKE2b, no JSON parsing), and if they still
+have the digest kept from the last read, only the new tail is parsed.
+Any other edit, including one that keeps the file length, is a full
+pass over the records that compares their keys, so the counts still
+move by the delta only.
+
+The file is watched with watchdog when it is installed (a change is
+applied DEBOUNCE_SECONDS after the last event, as editors write in
+several steps); otherwise refresh() has to be called by the reader. A
+file that does not parse (half written) leaves the counts as they were
+until the next change.
+"""
+import argparse
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass
+from itertools import combinations
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+from scipy import sparse
+
+from compact_frame import read_title_codes
+from cooccurrence import cooccurrence, incidence_matrix, write_graphs
+from dataset_cache import ensure_cache
+from dataset_stream import FORMAT_ERROR, iter_records
+from ranked_counts import RankedCounts
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:  # no watcher: the reader calls refresh()
+    FileSystemEventHandler, Observer = object, None
+
+# Editors save in several writes: wait for the events to settle
+DEBOUNCE_SECONDS = 0.5
+
+# Pair changes kept in the dict before they are folded into the matrix
+FOLD_PAIRS = 200_000
+
+# Trailing bytes read to find the end of the last record
+TAIL_BYTES = 4096
+
+WHITESPACE = b" \t\n\r"
+
+SCALAR_FIELDS = ("no_of_hops", "answer_type", "reasoning_type")
+
+LIVE_COLUMNS = {"_id", *SCALAR_FIELDS}
+
+
+@dataclass
+class Delta:
+    """Records added / changed / removed by one refresh."""
+
+    added: int = 0
+    changed: int = 0
+    removed: int = 0
+    full_pass: bool = False
+    seconds: float = 0.0
+
+
+class _FileEvents(FileSystemEventHandler):
+    def __init__(self, live):
+        self.live = live
+
+    def on_any_event(self, event):
+        paths = (getattr(event, "src_path", None), getattr(event, "dest_path", None))
+        if any(isinstance(p, str) and os.path.abspath(p) == self.live.path for p in paths):
+            self.live.changed()
+
+
+class LiveDataset:
+    """Chart counts of a dataset file, kept up to date with its edits (see the top of the module)."""
+
+    def __init__(self, path, cache_dir=None):
+        self.path = os.path.abspath(path)
+        self.lock = threading.RLock()
+        self.revision = 0
+        self.last_delta = None
+        self.error = None
+        # File as last read: (size, mtime_ns), end of the last record and
+        # digest of the bytes before it
+        self.stat, self.end, self.prefix = None, 0, None
+        self._observer = None
+        self._timer = None
+        self._ranked = None
+        self._seed(cache_dir)
+
+    # --- state ---
+
+    def _reset(self):
+        self.records = {}  # _id -> (no_of_hops, answer_type, reasoning_type, title ids)
+        self.order = []  # _id of every record, in file order
+        self.combinations = Counter()
+        self.vocabulary = []
+        self.title_ids = {}
+        self.title_counts = np.zeros(1024, dtype=np.int64)
+        self.pairs = sparse.coo_matrix((0, 0), dtype=np.int64)
+        self.pair_delta = {}
+
+    def _seed(self, cache_dir):
+        """First snapshot: the Parquet cache when it matches the file, else the file itself."""
+        self._reset()
+        fingerprint, _, parquet = ensure_cache(self.path, cache_dir)
+        stat = self._stat()
+        if stat != (fingerprint["size"], fingerprint["mtime_ns"]):
+            self._apply_full(*self._read_all())
+            self._mark(stat)
+            return
+
+        available = set(pq.read_schema(parquet).names)
+        hops_column = "no_of_hops" if "no_of_hops" in available else "num_hops"
+        columns = [c for c in ("_id", hops_column, "answer_type", "reasoning_type") if c in available]
+        table = pq.read_table(parquet, columns=columns).to_pydict()
+        n_records = len(table["_id"])
+        hops, answers, reasoning = (table.get(c, [None] * n_records) for c in (hops_column, "answer_type", "reasoning_type"))
+
+        titles = read_title_codes(parquet)
+        self.vocabulary = titles.vocabulary.tolist()
+        self.title_ids = {title: i for i, title in enumerate(self.vocabulary)}
+        self.title_counts = np.bincount(titles.codes, minlength=len(self.vocabulary)).astype(np.int64)
+        incidence = incidence_matrix(titles.codes, titles.offsets, len(self.vocabulary))
+        self.pairs = sparse.triu(cooccurrence(incidence), k=1).tocoo().astype(np.int64)
+
+        codes, offsets = titles.codes.tolist(), titles.offsets.tolist()
+        self.order = table["_id"]
+        for i, _id in enumerate(self.order):
+            self.records[_id] = (hops[i], answers[i], reasoning[i], tuple(codes[offsets[i]:offsets[i + 1]]))
+        self.combinations = Counter(zip(hops, answers, reasoning))
+        self._mark(stat)
+
+    def _stat(self):
+        stat = os.stat(self.path)
+        return stat.st_size, stat.st_mtime_ns
+
+    def _title_id(self, title):
+        title_id = self.title_ids.get(title)
+        if title_id is None:
+            title_id = self.title_ids[title] = len(self.vocabulary)
+            self.vocabulary.append(title)
+            if title_id >= len(self.title_counts):
+                grow = max(len(self.title_counts), 1024)
+                self.title_counts = np.concatenate([self.title_counts, np.zeros(grow, dtype=np.int64)])
+        return title_id
+
+    def record_keys(self, record):
+        """What a record adds to the counts: (no_of_hops, answer_type, reasoning_type, title ids)."""
+        hops = record.get("no_of_hops", record.get("num_hops"))
+        titles = tuple(self._title_id(item[0]) for item in (record.get("context") or []) if item)
+        return hops, record.get("answer_type"), record.get("reasoning_type"), titles
+
+    def _count(self, keys, sign):
+        hops, answer, reasoning, titles = keys
+        combination = (hops, answer, reasoning)
+        self.combinations[combination] += sign
+        if not self.combinations[combination]:
+            del self.combinations[combination]
+        for title_id in titles:
+            self.title_counts[title_id] += sign
+        for pair in combinations(sorted(set(titles)), 2):
+            weight = self.pair_delta.get(pair, 0) + sign
+            if weight:
+                self.pair_delta[pair] = weight
+            else:
+                del self.pair_delta[pair]
+
+    def _replace(self, _id, keys, delta):
+        old = self.records.get(_id)
+        if old == keys:
+            return
+        if old is None:
+            delta.added += 1
+        else:
+            delta.changed += 1
+            self._count(old, -1)
+        self._count(keys, 1)
+        self.records[_id] = keys
+
+    # --- reading the file ---
+
+    def _record_end(self):
+        """Byte offset just after the last record (before the closing bracket)."""
+        with open(self.path, "rb") as f:
+            size = f.seek(0, os.SEEK_END)
+            f.seek(max(size - TAIL_BYTES, 0))
+            tail = f.read()
+        body = tail.rstrip(WHITESPACE)
+        if not body.endswith(b"]"):
+            raise ValueError(FORMAT_ERROR)
+        return size - len(tail) + len(body[:-1].rstrip(WHITESPACE))
+
+    def _hash_range(self, f, stop, hasher):
+        """Feeds bytes [f.tell(), stop) of the open file to `hasher`, in chunks."""
+        length = stop - f.tell()
+        while length > 0:
+            chunk = f.read(min(length, 1 << 20))
+            if not chunk:
+                break
+            hasher.update(chunk)
+            length -= len(chunk)
+        return hasher
+
+    def _mark(self, stat, hasher=None, appended=None):
+        """
+        Remembers the file as read; an append to it is then parsed from
+        `end`. `hasher`: the BLAKE2b state of the bytes before the previous
+        `end`, moved forward with the `appended` bytes instead of reading
+        the file again (else the bytes before `end` are hashed once, after
+        a full pass).
+        """
+        self.stat = stat
+        end = self._record_end()
+        if hasher is not None and end - self.end <= len(appended):
+            hasher.update(appended[:end - self.end])
+        else:
+            with open(self.path, "rb") as f:
+                hasher = self._hash_range(f, end, hashlib.blake2b(digest_size=16))
+        self.end, self.prefix = end, hasher.digest()
+        if self._stat() != stat:
+            # Written again while it was read: the next refresh reads it all
+            self.prefix = None
+
+    def _read_appended(self, size):
+        """
+        (records appended since the last read, BLAKE2b state of the bytes
+        before the previous end, bytes after it), or None when the bytes
+        before the previous end changed: the file changed otherwise.
+        """
+        if self.prefix is None or size <= self.end:
+            return None
+        with open(self.path, "rb") as f:
+            hasher = self._hash_range(f, self.end, hashlib.blake2b(digest_size=16))
+            if hasher.digest() != self.prefix:
+                return None
+            tail = f.read()
+        text = tail.decode("utf-8")
+        decoder = json.JSONDecoder()
+        records, pos = [], 0
+        while True:
+            while pos < len(text) and text[pos] in " \t\n\r,":
+                pos += 1
+            if pos == len(text):
+                raise ValueError(FORMAT_ERROR)
+            if text[pos] == "]":
+                return records, hasher, tail
+            record, pos = decoder.raw_decode(text, pos)
+            if not isinstance(record, dict):
+                raise ValueError(FORMAT_ERROR)
+            records.append(record)
+
+    def _read_all(self):
+        """(_id -> keys, _id order) of every record of the file."""
+        records, order = {}, []
+        for record in iter_records(self.path):
+            _id = record.get("_id")
+            records[_id] = self.record_keys(record)
+            order.append(_id)
+        return records, order
+
+    def _apply_full(self, records, order):
+        delta = Delta(full_pass=True)
+        for _id in set(self.records) - set(records):
+            self._count(self.records.pop(_id), -1)
+            delta.removed += 1
+        for _id, keys in records.items():
+            self._replace(_id, keys, delta)
+        self.order = order
+        return delta
+
+    # --- updates ---
+
+    def refresh(self):
+        """Applies the edits of the file since the last call; returns the Delta, None when unchanged."""
+        with self.lock:
+            try:
+                stat = self._stat()
+                if stat == self.stat:
+                    return None
+                start = time.perf_counter()
+                appended = self._read_appended(stat[0])
+                if appended is None:
+                    delta = self._apply_full(*self._read_all())
+                    self._mark(stat)
+                else:
+                    records, hasher, tail = appended
+                    delta = Delta()
+                    for record in records:
+                        _id = record.get("_id")
+                        if _id not in self.records:
+                            self.order.append(_id)
+                        self._replace(_id, self.record_keys(record), delta)
+                    self._mark(stat, hasher, tail)
+            except (OSError, ValueError) as e:
+                # Half-written file: keep the counts, try again on the next change
+                self.error = str(e)
+                return None
+
+            self.error = None
+            if len(self.pair_delta) > FOLD_PAIRS:
+                self._fold_pairs()
+            delta.seconds = time.perf_counter() - start
+            self.last_delta = delta
+            self.revision += 1
+            return delta
+
+    def changed(self):
+        """Called on every file event: refreshes once the events stop for DEBOUNCE_SECONDS."""
+        with self.lock:
+            if self._timer is not None:
+                self._timer.cancel()
+            self._timer = threading.Timer(DEBOUNCE_SECONDS, self.refresh)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def watch(self):
+        """Starts watching the file (watchdog); False when watchdog is not installed."""
+        if Observer is None:
+            return False
+        if self._observer is None:
+            self._observer = Observer()
+            self._observer.daemon = True
+            self._observer.schedule(_FileEvents(self), os.path.dirname(self.path), recursive=False)
+            self._observer.start()
+        return True
+
+    @property
+    def watching(self):
+        return self._observer is not None
+
+    def close(self):
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join()
+            self._observer = None
+        if self._timer is not None:
+            self._timer.cancel()
+
+    # --- pairs ---
+
+    def _pair_matrix(self):
+        n_titles = len(self.vocabulary)
+        rows, columns, weights = [self.pairs.row], [self.pairs.col], [self.pairs.data]
+        if self.pair_delta:
+            keys = np.fromiter((i for pair in self.pair_delta for i in pair), dtype=np.int64).reshape(-1, 2)
+            rows.append(keys[:, 0])
+            columns.append(keys[:, 1])
+            weights.append(np.fromiter(self.pair_delta.values(), dtype=np.int64))
+        matrix = sparse.coo_matrix(
+            (np.concatenate(weights), (np.concatenate(rows), np.concatenate(columns))), shape=(n_titles, n_titles)
+        ).tocsr()
+        matrix.eliminate_zeros()
+        return matrix.tocoo()
+
+    def _fold_pairs(self):
+        self.pairs = self._pair_matrix()
+        self.pair_delta = {}
+
+    def cooccurrence_edges(self, min_weight=1):
+        """(sources, targets, weights, labels) of the current co-occurrence graph, as cooccurrence_edges()."""
+        with self.lock:
+            pairs = self._pair_matrix()
+            labels = np.asarray(self.vocabulary, dtype=object)
+        keep = pairs.data >= min_weight
+        return pairs.row[keep], pairs.col[keep], pairs.data[keep], labels
+
+    # --- chart counts (same methods as sql_backend.SqlBackend; filters are not supported) ---
+
+    @property
+    def columns(self):
+        return LIVE_COLUMNS
+
+    def count(self, filters=None):
+        return len(self.records)
+
+    def _combination_frame(self):
+        with self.lock:
+            items = list(self.combinations.items())
+        return pd.DataFrame([(*key, count) for key, count in items], columns=[*SCALAR_FIELDS, "count"])
+
+    def hops_counts(self, filters=None, column="no_of_hops"):
+        frame = self._combination_frame()
+        return frame.groupby([column, "answer_type"])["count"].sum().reset_index()
+
+    def heatmap_counts(self, filters=None):
+        frame = self._combination_frame()
+        return frame.groupby(["reasoning_type", "answer_type"])["count"].sum().reset_index()
+
+    def ranked(self):
+        """RankedCounts of the titles, sorted again at most once per revision."""
+        with self.lock:
+            if self._ranked is None or self._ranked[0] != self.revision:
+                counts = self.title_counts[:len(self.vocabulary)]
+                used = np.flatnonzero(counts > 0)
+                self._ranked = (self.revision, RankedCounts(np.asarray(self.vocabulary, dtype=object)[used], counts[used]))
+            return self._ranked[1]
+
+    def support_count_range(self, filters=None):
+        ranked = self.ranked()
+        return (int(ranked.counts[-1]), int(ranked.counts[0])) if len(ranked) else (0, 0)
+
+    def support_rank_of_threshold(self, threshold, filters=None):
+        return self.ranked().rank_of_threshold(threshold)
+
+    def support_window(self, threshold, start, stop, end, filters=None):
+        return self.ranked().window_with_other(start, stop, end=end)
+
+    def question_fields(self, positions, columns):
+        """`columns` (of SCALAR_FIELDS) of the records at `positions` in the file, in that order."""
+        missing = (None,) * len(SCALAR_FIELDS)
+        with self.lock:
+            # The search index may be of a newer version than the live counts
+            keys = [self.records[self.order[p]] if p < len(self.order) else missing for p in positions]
+        return pd.DataFrame({column: [k[SCALAR_FIELDS.index(column)] for k in keys] for column in columns})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", help="dataset JSON file")
+    parser.add_argument("--graphs", metavar="OUT_DIR", help="rewrite the paragraph graphs there after every change")
+    args = parser.parse_args()
+
+    live = LiveDataset(args.path)
+    print(f"{len(live.records):,} records, {len(live.combinations)} combinations, {len(live.ranked()):,} paragraphs")
+    if not live.watch():
+        print("watchdog is not installed: polling every second")
+    revision = live.revision
+    try:
+        while True:
+            time.sleep(1)
+            if not live.watching:
+                live.refresh()
+            if live.revision == revision:
+                continue
+            revision, delta = live.revision, live.last_delta
+            print(
+                f"revision {revision}: +{delta.added} ~{delta.changed} -{delta.removed} records "
+                f"({'full pass' if delta.full_pass else 'appended'}, {delta.seconds * 1000:.1f} ms)"
+            )
+            if args.graphs:
+                sources, targets, weights, labels = live.cooccurrence_edges()
+                for target in write_graphs(args.graphs, labels, sources, targets, weights):
+                    print(f"wrote {target}")
+    except KeyboardInterrupt:
+        live.close()
+
+
+if __name__ == "__main__":
+    main()
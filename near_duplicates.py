@@ -0,0 +1,241 @@
+import json
+import os
+import re
+
+import numpy as np
+import pyarrow.parquet as pq
+from scipy import sparse
+from scipy.sparse.csgraph import connected_components
+
+from dataset_cache import ensure_cache, cache_path, temp_path
+
+# ============================================================
+# NEAR-DUPLICATE QUESTIONS (MINHASH + LSH)
+# ============================================================
+#
+# Many records are templated variants of one base question (same `_id`
+# prefix, same previous_question, another pattern on top). Every record
+# becomes a set of shingles:
+#   - word 3-grams of `question` (single words for very short questions)
+#   - `pattern` and each of `subquestion_patterns` as one feature each
+# and a MinHash signature of NUM_PERM values, whose agreement between two
+# records estimates the Jaccard similarity of their sets.
+#
+# LSH: the signature is cut into BANDS bands of ROWS values; records with
+# an identical band land in the same bucket, and each bucket member is
+# compared with the first record of the bucket only (its signature
+# agreement must reach THRESHOLD). Groups are the connected components of
+# the accepted pairs, so the cost is linear in the number of records, not
+# quadratic. The group of every record (the position of its first member)
+# is saved next to the Parquet cache, once per dataset version.
+
+GROUPS_SUFFIX = "near-duplicates.npz"
+
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+
+# Estimated Jaccard similarity above which two records are near-duplicates
+THRESHOLD = 0.5
+
+# Candidate pairs whose signatures are compared at once
+VERIFY_BATCH = 100_000
+
+# Hashes are computed modulo this (Mersenne) prime, so a * x fits in 64 bits
+PRIME = np.uint64((1 << 31) - 1)
+MIX = np.uint64(1_000_003)
+
+TOKEN_RE = re.compile(r"\w+")
+
+TEXT_FIELDS = ("question", "pattern", "subquestion_patterns")
+
+
+def _permutations(seed=0):
+    rng = np.random.default_rng(seed)
+    a = rng.integers(1, int(PRIME), NUM_PERM, dtype=np.uint64)
+    b = rng.integers(0, int(PRIME), NUM_PERM, dtype=np.uint64)
+    return a, b
+
+
+def _mix(*values):
+    key = np.zeros(len(values[0]), dtype=np.uint64)
+    for value in values:
+        key = key * MIX + value.astype(np.uint64)  # wraps around modulo 2**64
+    return key
+
+
+class Shingler:
+    """Turns records into shingle ids; the word vocabulary is kept between batches."""
+
+    def __init__(self):
+        self.words = {}
+        self.features = {}
+
+    def batch(self, records):
+        """(shingle values, indptr) of a list of records, in CSR form."""
+        words = self.words
+        tokens, token_indptr, features, feature_indptr = [], [0], [], [0]
+        for record in records:
+            tokens.extend(words.setdefault(token, len(words)) for token in TOKEN_RE.findall((record.get("question") or "").lower()))
+            token_indptr.append(len(tokens))
+            patterns = record.get("subquestion_patterns") or []
+            if isinstance(patterns, str):
+                patterns = json.loads(patterns)
+            for feature in [record.get("pattern"), *patterns]:
+                if feature:
+                    features.append(self.features.setdefault(str(feature), len(self.features)))
+            feature_indptr.append(len(features))
+
+        tokens = np.asarray(tokens, dtype=np.int64)
+        token_indptr = np.asarray(token_indptr, dtype=np.int64)
+        lengths = np.diff(token_indptr)
+        doc = np.repeat(np.arange(len(lengths)), lengths)
+
+        # Word 3-grams inside a question; questions of 1-2 words keep their words
+        start = np.arange(max(len(tokens) - 2, 0))
+        starts = start[doc[start] == doc[start + 2]] if len(start) else start
+        short = np.flatnonzero(lengths[doc] < 3) if len(doc) else doc
+        grams = _mix(tokens[starts], tokens[starts + 1], tokens[starts + 2])
+        singles = _mix(tokens[short], np.ones(len(short), dtype=np.int64))
+
+        feature_ids = np.asarray(features, dtype=np.int64)
+        feature_doc = np.repeat(np.arange(len(lengths)), np.diff(feature_indptr))
+        # The trailing 2 keeps features apart from words with the same id
+        feature_values = _mix(feature_ids, np.full(len(feature_ids), 2, dtype=np.int64))
+
+        shingle_doc = np.concatenate([doc[starts], doc[short], feature_doc])
+        values = np.concatenate([grams, singles, feature_values]) % PRIME
+        order = np.argsort(shingle_doc, kind="stable")
+        indptr = np.concatenate([[0], np.cumsum(np.bincount(shingle_doc, minlength=len(lengths)))])
+        return values[order], indptr
+
+
+def minhash(values, indptr, permutations):
+    """NUM_PERM x documents signature matrix (uint32); documents without shingles get PRIME."""
+    a, b = permutations
+    n_docs = len(indptr) - 1
+    signatures = np.full((len(a), n_docs), PRIME, dtype=np.uint32)
+    filled = np.flatnonzero(np.diff(indptr) > 0)
+    if not len(filled):
+        return signatures
+    for i in range(len(a)):
+        hashed = (a[i] * values + b[i]) % PRIME
+        signatures[i, filled] = np.minimum.reduceat(hashed, indptr[filled])
+    return signatures
+
+
+class NearDuplicates:
+    """
+    group[i]: position of the first record of record i's group (i itself
+    for records without near-duplicates).
+    """
+
+    def __init__(self, group):
+        self.group = group
+        self.sizes = np.bincount(group, minlength=len(group))
+
+    @classmethod
+    def from_signatures(cls, signatures, threshold=THRESHOLD):
+        n_docs = signatures.shape[1]
+        has_shingles = signatures[0] != PRIME
+        heads, members = [], []
+        for band in range(BANDS):
+            rows = signatures[band * ROWS:(band + 1) * ROWS]
+            keys = _mix(*rows)[has_shingles]
+            positions = np.flatnonzero(has_shingles)
+            order = np.argsort(keys, kind="stable")
+            keys, positions = keys[order], positions[order]
+            # Bucket of each record -> first (smallest) position of the bucket
+            new_bucket = np.concatenate([[True], keys[1:] != keys[:-1]]) if len(keys) else keys.astype(bool)
+            head = positions[np.flatnonzero(new_bucket)[np.cumsum(new_bucket) - 1]]
+            pair = head != positions
+            heads.append(head[pair])
+            members.append(positions[pair])
+        # A pair found by several bands is verified once
+        pairs = np.unique(np.concatenate(heads) * n_docs + np.concatenate(members))
+        heads, members = pairs // n_docs, pairs % n_docs
+
+        # Candidates are verified on the whole signature, not one band
+        accepted = np.zeros(len(pairs), dtype=bool)
+        for start in range(0, len(pairs), VERIFY_BATCH):
+            chunk = slice(start, start + VERIFY_BATCH)
+            agreement = (signatures[:, heads[chunk]] == signatures[:, members[chunk]]).mean(axis=0)
+            accepted[chunk] = agreement >= threshold
+        graph = sparse.coo_matrix(
+            (np.ones(int(accepted.sum()), dtype=np.int8), (heads[accepted], members[accepted])), shape=(n_docs, n_docs)
+        )
+        _, labels = connected_components(graph, directed=False)
+        first = np.full(labels.max() + 1 if n_docs else 0, n_docs, dtype=np.int64)
+        np.minimum.at(first, labels, np.arange(n_docs))
+        return cls(first[labels])
+
+    def __len__(self):
+        return len(self.group)
+
+    @property
+    def representatives(self):
+        """Positions of one record per group (the first one)."""
+        return np.flatnonzero(self.group == np.arange(len(self.group)))
+
+    @property
+    def n_groups(self):
+        """Groups with more than one record."""
+        return int((self.sizes > 1).sum())
+
+    def members(self, group):
+        return np.flatnonzero(self.group == group)
+
+    def largest(self, n=None):
+        """Groups with more than one record, largest first: (first position, size) arrays."""
+        groups = np.flatnonzero(self.sizes > 1)
+        groups = groups[np.argsort(-self.sizes[groups], kind="stable")][:n]
+        return groups, self.sizes[groups]
+
+    def size_counts(self):
+        """{group size: number of groups}, for groups of 2 records or more."""
+        sizes, counts = np.unique(self.sizes[self.sizes > 1], return_counts=True)
+        return dict(zip(sizes.tolist(), counts.tolist()))
+
+    def save(self, target):
+        tmp = temp_path(target)
+        with open(tmp, "wb") as f:
+            np.savez(f, group=self.group)
+        os.replace(tmp, target)
+
+    @classmethod
+    def load(cls, target):
+        with np.load(target) as arrays:
+            return cls(arrays["group"])
+
+
+def find_near_duplicates(records, threshold=THRESHOLD, batch_size=50_000, seed=0):
+    """Near-duplicate groups of an iterable of records (dicts with the TEXT_FIELDS)."""
+    shingler, permutations = Shingler(), _permutations(seed)
+    signatures, batch = [], []
+    for record in records:
+        batch.append(record)
+        if len(batch) == batch_size:
+            signatures.append(minhash(*shingler.batch(batch), permutations))
+            batch = []
+    if batch or not signatures:
+        signatures.append(minhash(*shingler.batch(batch), permutations))
+    return NearDuplicates.from_signatures(np.concatenate(signatures, axis=1), threshold)
+
+
+def load_near_duplicates(path, cache_dir=None):
+    """Near-duplicate groups of the current dataset version, computed on first use."""
+    fingerprint, cache_dir, parquet = ensure_cache(path, cache_dir)
+    target = cache_path(fingerprint, cache_dir, GROUPS_SUFFIX)
+    if os.path.exists(target):
+        return NearDuplicates.load(target)
+
+    available = set(pq.read_schema(parquet).names)
+    columns = [c for c in TEXT_FIELDS if c in available]
+
+    def records():
+        for batch in pq.ParquetFile(parquet).iter_batches(columns=columns):
+            yield from batch.to_pylist()
+
+    groups = find_near_duplicates(records())
+    groups.save(target)
+    return groups
@@ -0,0 +1,256 @@
+"""
+Flattens the dataset into normalized Parquet tables.
+
+    python normalize.py with_human_verification.json --out-dir normalized --workers 8
+
+The JSON file is streamed and split in shards of --shard-size records;
+a process pool flattens the shards into five tables linked by integer
+keys:
+
+  questions   question_id, scalar fields, decomp_len, num_paragraphs
+  hops        hop_id, question_id, top-level question_decomposition entries
+  sub_hops    sub_hop_id, hop_id, parent_sub_hop_id, nested `details`
+  paragraphs  paragraph_id, question_id, context title
+  sentences   sentence_id, paragraph_id, question_id, context sentence
+
+question_id is the position of the record in the file. The other ids are
+dense across the whole output: each worker numbers its rows from 0 and
+the parent process shifts them by the rows already written. Tables are
+written as <out-dir>/<table>/part-NNNNN.parquet, plus a manifest with the
+fingerprint of the source file.
+"""
+import argparse
+import json
+import os
+import shutil
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from dataset_cache import dataset_fingerprint
+from dataset_stream import iter_records
+
+SHARD_SIZE = 20_000
+MANIFEST_FILE = "manifest.json"
+
+TABLES = ("questions", "hops", "sub_hops", "paragraphs", "sentences")
+
+QUESTION_FIELDS = (
+    "_id", "question", "answer", "previous_question", "previous_answer", "answer_type",
+    "previous_answer_type", "no_of_hops", "reasoning_type", "pattern", "cutted_question", "ques_on_last_hop",
+)
+
+_INT = pa.int64()
+_STR = pa.string()
+
+SCHEMAS = {
+    "questions": pa.schema(
+        [("question_id", _INT)]
+        + [(field, _INT if field == "no_of_hops" else _STR) for field in QUESTION_FIELDS]
+        + [("subquestion_patterns", _STR), ("decomp_len", _INT), ("num_paragraphs", _INT)]
+    ),
+    "hops": pa.schema([
+        ("hop_id", _INT), ("question_id", _INT), ("hop_index", _INT), ("n_details", _INT),
+        ("sub_id", _STR), ("question", _STR), ("answer", _STR), ("paragraph_support_title", _STR),
+    ]),
+    "sub_hops": pa.schema([
+        ("sub_hop_id", _INT), ("hop_id", _INT), ("parent_sub_hop_id", _INT), ("question_id", _INT),
+        ("depth", _INT), ("sub_index", _INT),
+        ("sub_id", _STR), ("question", _STR), ("answer", _STR), ("paragraph_support_title", _STR),
+    ]),
+    "paragraphs": pa.schema([
+        ("paragraph_id", _INT), ("question_id", _INT), ("paragraph_index", _INT), ("title", _STR), ("n_sentences", _INT),
+    ]),
+    "sentences": pa.schema([
+        ("sentence_id", _INT), ("paragraph_id", _INT), ("question_id", _INT), ("sentence_index", _INT), ("text", _STR),
+    ]),
+}
+
+# Id columns shifted by the parent process: {table: {column: table the ids belong to}}
+ID_COLUMNS = {
+    "hops": {"hop_id": "hops"},
+    "sub_hops": {"sub_hop_id": "sub_hops", "hop_id": "hops", "parent_sub_hop_id": "sub_hops"},
+    "paragraphs": {"paragraph_id": "paragraphs"},
+    "sentences": {"sentence_id": "sentences", "paragraph_id": "paragraphs"},
+}
+
+
+# ============================================================
+# WORKER: ONE SHARD -> ROWS OF EVERY TABLE
+# ============================================================
+
+def _text(value):
+    return None if value is None else str(value)
+
+
+def _int(value):
+    """As the "int" columns of the dataset cache (dataset_stream.FIELD_KINDS)."""
+    return None if value is None else int(value)
+
+
+def _paragraphs(context):
+    """(title, sentences) of every context item; empty items are skipped, as in the dataset cache."""
+    return [(item[0], (item[1] if len(item) > 1 else None) or []) for item in context or [] if item]
+
+
+def _hop_fields(hop):
+    return {
+        "sub_id": _text(hop.get("sub_id")),
+        "question": _text(hop.get("question")),
+        "answer": _text(hop.get("answer")),
+        "paragraph_support_title": hop.get("paragraph_support_title") or None,
+    }
+
+
+def flatten_shard(start, records):
+    """Rows of every table for `records`, whose first question_id is `start`."""
+    rows = {table: [] for table in TABLES}
+
+    for offset, record in enumerate(records):
+        question_id = start + offset
+        decomposition = record.get("question_decomposition") or []
+        context = _paragraphs(record.get("context"))
+
+        question = {"question_id": question_id}
+        question.update({field: _text(record.get(field)) for field in QUESTION_FIELDS})
+        question["no_of_hops"] = _int(record.get("no_of_hops"))
+        question["subquestion_patterns"] = json.dumps(record.get("subquestion_patterns"), ensure_ascii=False)
+        question["decomp_len"] = len(decomposition)
+        question["num_paragraphs"] = len(context)
+        rows["questions"].append(question)
+
+        for hop_index, hop in enumerate(decomposition):
+            hop_id = len(rows["hops"])
+            details = hop.get("details") or []
+            rows["hops"].append({
+                "hop_id": hop_id, "question_id": question_id, "hop_index": hop_index,
+                "n_details": len(details), **_hop_fields(hop),
+            })
+            # Nested details, depth first (details may have details of their own)
+            stack = [(detail, -1, 1, i) for i, detail in reversed(list(enumerate(details)))]
+            while stack:
+                sub_hop, parent, depth, sub_index = stack.pop()
+                sub_hop_id = len(rows["sub_hops"])
+                rows["sub_hops"].append({
+                    "sub_hop_id": sub_hop_id, "hop_id": hop_id, "parent_sub_hop_id": parent,
+                    "question_id": question_id, "depth": depth, "sub_index": sub_index, **_hop_fields(sub_hop),
+                })
+                children = sub_hop.get("details") or []
+                stack.extend((child, sub_hop_id, depth + 1, i) for i, child in reversed(list(enumerate(children))))
+
+        for paragraph_index, (title, sentences) in enumerate(context):
+            paragraph_id = len(rows["paragraphs"])
+            rows["paragraphs"].append({
+                "paragraph_id": paragraph_id, "question_id": question_id,
+                "paragraph_index": paragraph_index, "title": title, "n_sentences": len(sentences),
+            })
+            for sentence_index, text in enumerate(sentences):
+                rows["sentences"].append({
+                    "sentence_id": len(rows["sentences"]), "paragraph_id": paragraph_id,
+                    "question_id": question_id, "sentence_index": sentence_index, "text": text,
+                })
+
+    return {
+        table: pd.DataFrame(table_rows, columns=SCHEMAS[table].names)
+        for table, table_rows in rows.items()
+    }
+
+
+# ============================================================
+# PARENT: SHARDING, ID OFFSETS, PARQUET OUTPUT
+# ============================================================
+
+def iter_shards(path, shard_size):
+    shard, start = [], 0
+    for record in iter_records(path):
+        shard.append(record)
+        if len(shard) == shard_size:
+            yield start, shard
+            start += len(shard)
+            shard = []
+    if shard:
+        yield start, shard
+
+
+def _shift_ids(frames, offsets):
+    for table, columns in ID_COLUMNS.items():
+        frame = frames[table]
+        for column, owner in columns.items():
+            if column in frame.columns:
+                values = frame[column]
+                frame[column] = values.where(values < 0, values + offsets[owner])
+
+
+def normalize(path, out_dir, workers=None, shard_size=SHARD_SIZE):
+    """Writes the normalized tables of `path` into `out_dir`; returns row counts."""
+    for table in TABLES:
+        shutil.rmtree(os.path.join(out_dir, table), ignore_errors=True)
+        os.makedirs(os.path.join(out_dir, table))
+
+    counts = dict.fromkeys(TABLES, 0)
+    workers = workers or os.cpu_count() or 1
+
+    def write(part, frames):
+        _shift_ids(frames, counts)
+        for table, frame in frames.items():
+            pq.write_table(
+                pa.Table.from_pandas(frame, schema=SCHEMAS[table], preserve_index=False),
+                os.path.join(out_dir, table, f"part-{part:05d}.parquet"),
+            )
+            counts[table] += len(frame)
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # At most 2 shards per worker in flight, so memory stays bounded
+        pending = deque()
+        part = 0
+        for start, shard in iter_shards(path, shard_size):
+            pending.append(pool.submit(flatten_shard, start, shard))
+            if len(pending) >= 2 * workers:
+                write(part, pending.popleft().result())
+                part += 1
+        while pending:
+            write(part, pending.popleft().result())
+            part += 1
+
+    fingerprint = dataset_fingerprint(path)
+    with open(os.path.join(out_dir, MANIFEST_FILE), "w", encoding="utf-8") as f:
+        json.dump({"source": fingerprint, "rows": counts}, f, indent=2)
+    return counts
+
+
+# ============================================================
+# LOADING
+# ============================================================
+
+def normalized_version(out_dir):
+    """Content hash of the dataset the tables were built from (None if missing)."""
+    try:
+        with open(os.path.join(out_dir, MANIFEST_FILE), "r", encoding="utf-8") as f:
+            return json.load(f)["source"]["hash"]
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def load_table(out_dir, table, columns=None):
+    """Reads one normalized table (all its parts) as a DataFrame."""
+    return pd.read_parquet(os.path.join(out_dir, table), columns=columns)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("dataset", nargs="?", default="with_human_verification.json")
+    parser.add_argument("--out-dir", default="normalized")
+    parser.add_argument("--workers", type=int, default=None, help="processes (default: number of CPUs)")
+    parser.add_argument("--shard-size", type=int, default=SHARD_SIZE, help="records per shard")
+    args = parser.parse_args()
+
+    counts = normalize(args.dataset, args.out_dir, args.workers, args.shard_size)
+    for table, n in counts.items():
+        print(f"{table:>10}: {n:,} rows")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+import json
+import os
+import threading
+import time
+import tracemalloc
+import weakref
+from contextlib import contextmanager
+
+# ============================================================
+# PANEL TIMINGS
+# ============================================================
+#
+# Every dashboard panel runs inside timed(name, timings). `timings` is a
+# dict kept in the session state: {panel: {"runs": n, "ms": last time}},
+# so a panel that did not run on an interaction keeps its run count.
+
+
+@contextmanager
+def timed(name, timings):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        entry = timings.setdefault(name, {"runs": 0, "ms": 0.0})
+        entry["runs"] += 1
+        entry["ms"] = (time.perf_counter() - start) * 1000
+
+
+def timings_frame(timings):
+    """One row per panel: number of executions and duration of the last one."""
+    import pandas as pd  # not at the top: the app imports this module before its data stack
+
+    return pd.DataFrame(
+        [{"panel": name, "runs": entry["runs"], "last ms": round(entry["ms"], 1)} for name, entry in timings.items()],
+        columns=["panel", "runs", "last ms"],
+    )
+
+
+# ============================================================
+# STAGE PROFILER
+# ============================================================
+#
+# A Profiler records a row per stage of one run at a time (start_run():
+# a rerun, or a fragment rerun after the end of the previous run):
+#   stage         nested names joined by "/" (e.g. "Graph 3/aggregate")
+#   seconds       wall time
+#   peak_bytes    peak Python allocations above the start of the stage
+#                 (tracemalloc; only when memory=True, as tracing slows
+#                 the whole process down)
+#   payload_bytes size of the chart specs sent by the stage (payload=True)
+# Rows are appended to the metrics file as soon as the stage ends, so
+# fragment reruns are recorded too.
+
+# MOREHOPQA_METRICS=metrics.jsonl appends JSON lines; a .prom file is
+# rewritten with the latest value of every stage (Prometheus text format).
+METRICS_FILE = os.environ.get("MOREHOPQA_METRICS")
+METRIC_PREFIX = "morehopqa_stage"
+
+# Tracing is process-wide: it runs while a profiler that asked for memory
+# is alive (one per profiled session), and only a run that does not ask
+# for memory, once no such profiler is left, stops it.
+_tracers = weakref.WeakSet()
+_tracing_lock = threading.Lock()
+_tracing_started = False
+
+
+class Profiler:
+    def __init__(self, memory=False, payload=False, metrics_file=METRICS_FILE, run_id=None):
+        self.memory = memory
+        self.payload = payload
+        self.metrics_file = metrics_file
+        self.start_run(run_id=run_id)
+
+    def start_run(self, memory=None, payload=None, run_id=None):
+        """Starts the rows of a new run; `memory` / `payload` stay as they were when None."""
+        self.memory = self.memory if memory is None else memory
+        self.payload = self.payload if payload is None else payload
+        self.run_id = run_id or f"{time.time():.6f}"
+        self.rows = []
+        self._stack = []  # [name, start current bytes, highest peak of the closed children]
+        self.finished = False
+
+        global _tracing_started
+        with _tracing_lock:
+            if self.memory:
+                _tracers.add(self)
+                if not tracemalloc.is_tracing():
+                    tracemalloc.start()
+                    _tracing_started = True
+            else:
+                _tracers.discard(self)
+                if _tracing_started and not _tracers:
+                    tracemalloc.stop()
+                    _tracing_started = False
+
+    def finish(self):
+        """End of the run: stages recorded after it belong to a new run (see start_run)."""
+        self.finished = True
+
+    @contextmanager
+    def stage(self, name):
+        name = f"{self._stack[-1][0]}/{name}" if self._stack else name
+        row = {"stage": name, "seconds": 0.0, "peak_bytes": None, "payload_bytes": None}
+        tracing = self.memory and tracemalloc.is_tracing()
+        if tracing:
+            current, peak = tracemalloc.get_traced_memory()
+            if self._stack:
+                # The enclosing stage keeps the peak reached before the reset
+                self._stack[-1][2] = max(self._stack[-1][2], peak)
+            tracemalloc.reset_peak()
+        self._stack.append([name, current if tracing else 0, 0, row])
+        start = time.perf_counter()
+        try:
+            yield row
+        finally:
+            row["seconds"] = time.perf_counter() - start
+            _, start_bytes, children_peak, _ = self._stack.pop()
+            if tracing:
+                peak = max(tracemalloc.get_traced_memory()[1], children_peak)
+                row["peak_bytes"] = max(peak - start_bytes, 0)
+                if self._stack:
+                    self._stack[-1][2] = max(self._stack[-1][2], peak)
+            self.rows.append(row)
+            write_metrics([row], self.metrics_file, self.run_id)
+
+    def add_payload(self, size):
+        """Adds `size` bytes to the payload of the innermost open stage."""
+        if self._stack:
+            row = self._stack[-1][3]
+            row["payload_bytes"] = (row["payload_bytes"] or 0) + size
+
+    def record(self, name, seconds):
+        """Adds a stage timed elsewhere (e.g. the startup of the app)."""
+        row = {"stage": name, "seconds": seconds, "peak_bytes": None, "payload_bytes": None}
+        self.rows.append(row)
+        write_metrics([row], self.metrics_file, self.run_id)
+
+    def frame(self):
+        import pandas as pd
+
+        frame = pd.DataFrame(self.rows, columns=["stage", "seconds", "peak_bytes", "payload_bytes"])
+        frame["ms"] = (frame["seconds"] * 1000).round(1)
+        frame["peak KB"] = (frame["peak_bytes"] / 1024).round(1)
+        frame["payload KB"] = (frame["payload_bytes"] / 1024).round(1)
+        return frame[["stage", "ms", "peak KB", "payload KB"]]
+
+
+# ============================================================
+# METRICS FILE
+# ============================================================
+
+_latest = {}
+_metrics_lock = threading.Lock()
+
+
+def prometheus_text(latest):
+    """Latest value of every stage as Prometheus gauges."""
+    lines = []
+    for metric, field, help_text in (
+        ("seconds", "seconds", "Wall time of the last run of the stage."),
+        ("peak_bytes", "peak_bytes", "Peak Python allocations of the last profiled run."),
+        ("payload_bytes", "payload_bytes", "Chart spec bytes sent by the last profiled run."),
+        ("runs_total", "runs", "Number of runs of the stage."),
+    ):
+        name = f"{METRIC_PREFIX}_{metric}"
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {'counter' if metric == 'runs_total' else 'gauge'}")
+        for stage, row in sorted(latest.items()):
+            if row.get(field) is not None:
+                label = stage.replace("\\", "\\\\").replace('"', '\\"')
+                lines.append(f'{name}{{stage="{label}"}} {row[field]}')
+    return "\n".join(lines) + "\n"
+
+
+def write_metrics(rows, path, run_id=None):
+    """Appends `rows` to a JSON lines file, or updates a Prometheus .prom file."""
+    if not path:
+        return
+    with _metrics_lock:
+        if path.endswith(".prom"):
+            for row in rows:
+                entry = _latest.setdefault(row["stage"], {"runs": 0})
+                entry["runs"] += 1
+                entry.update({k: v for k, v in row.items() if v is not None})
+            tmp = f"{path}.{os.getpid()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(prometheus_text(_latest))
+            os.replace(tmp, path)
+        else:
+            with open(path, "a", encoding="utf-8") as f:
+                for row in rows:
+                    f.write(json.dumps({"time": round(time.time(), 3), "run": run_id, **row}) + "\n")
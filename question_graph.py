@@ -0,0 +1,218 @@
+import json
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from compact_frame import read_title_codes
+from cooccurrence import CLUSTER_COLOR, NODE_COLOR, graph_html, incidence_matrix
+from dataset_cache import ensure_cache, cache_path, pack_strings, unpack_strings, temp_path
+
+# ============================================================
+# PER-QUESTION REASONING GRAPH
+# ============================================================
+#
+# One question drawn as a small vis-network graph:
+#   - the hop chain of `question_decomposition` (hops with `details` are
+#     followed by their detail hops), each hop linked to the next by the
+#     answer it produces, and to its paragraph_support_title;
+#   - the `context` paragraphs of the question;
+#   - their one-hop neighbourhood in the paragraph co-occurrence graph
+#     (at most MAX_NEIGHBOURS per paragraph, the most shared first).
+#
+# The neighbourhood comes from an adjacency index saved next to the
+# Parquet cache (CSR: indptr + neighbour ids + weights, each row sorted
+# by weight), so a question reads a few array slices instead of the whole
+# graph. Rendered pages are kept in an LRU cache bounded in bytes.
+
+ADJACENCY_SUFFIX = "adjacency.npz"
+
+MAX_NEIGHBOURS = 8
+
+# Total size of the rendered pages kept in memory
+RENDER_CACHE_BYTES = 32 << 20
+
+QUESTION_COLOR = CLUSTER_COLOR
+HOP_COLOR = "#ffa807"
+DETAIL_COLOR = "#ffd36b"
+NEIGHBOUR_COLOR = "#dddddd"
+
+GRAPH_OPTIONS = {
+    "configure": {"enabled": False},
+    "edges": {"smooth": {"enabled": False}, "font": {"size": 10, "align": "middle"}},
+    "interaction": {"dragNodes": True, "hover": True},
+    # Small graphs: a short stabilization, then the layout stays still
+    "physics": {"enabled": True, "solver": "forceAtlas2Based", "stabilization": {"iterations": 150}},
+}
+
+
+# ============================================================
+# ADJACENCY INDEX
+# ============================================================
+
+class AdjacencyIndex:
+    """Paragraph co-occurrence graph in CSR form, rows sorted by decreasing weight."""
+
+    def __init__(self, titles, indptr, neighbours, weights):
+        self.titles = np.asarray(titles, dtype=object)
+        self.indptr = indptr
+        self.neighbours = neighbours
+        self.weights = weights
+        self._codes = {title: i for i, title in enumerate(self.titles)}
+
+    @classmethod
+    def build(cls, title_codes):
+        """From the TitleCodes of the dataset: weight = number of questions sharing both titles."""
+        incidence = incidence_matrix(title_codes.codes, title_codes.offsets, len(title_codes.vocabulary))
+        graph = (incidence.T @ incidence).tocoo()
+        off_diagonal = graph.row != graph.col
+        rows, columns, weights = graph.row[off_diagonal], graph.col[off_diagonal], graph.data[off_diagonal]
+        order = np.lexsort((columns, -weights, rows))
+        indptr = np.zeros(len(title_codes.vocabulary) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=len(title_codes.vocabulary)), out=indptr[1:])
+        return cls(title_codes.vocabulary, indptr, columns[order].astype(np.int32), weights[order].astype(np.int32))
+
+    def code(self, title):
+        return self._codes.get(title)
+
+    def neighbourhood(self, title_id, limit=MAX_NEIGHBOURS):
+        """(neighbour ids, weights) of a paragraph, the most shared first."""
+        start = self.indptr[title_id]
+        stop = min(self.indptr[title_id + 1], start + limit)
+        return self.neighbours[start:stop], self.weights[start:stop]
+
+    def degree(self, title_id):
+        return int(self.indptr[title_id + 1] - self.indptr[title_id])
+
+    def save(self, target):
+        arrays = {"indptr": self.indptr, "neighbours": self.neighbours, "weights": self.weights}
+        arrays["titles_blob"], arrays["titles_offsets"] = pack_strings(self.titles.tolist())
+        tmp = temp_path(target)
+        with open(tmp, "wb") as f:
+            np.savez(f, **arrays)
+        os.replace(tmp, target)
+
+    @classmethod
+    def load(cls, target):
+        with np.load(target) as arrays:
+            titles = unpack_strings(arrays["titles_blob"], arrays["titles_offsets"])
+            return cls(titles, arrays["indptr"], arrays["neighbours"], arrays["weights"])
+
+
+def load_adjacency(path, cache_dir=None):
+    """Adjacency index of the current dataset version, built on first use."""
+    fingerprint, cache_dir, parquet = ensure_cache(path, cache_dir)
+    target = cache_path(fingerprint, cache_dir, ADJACENCY_SUFFIX)
+    if os.path.exists(target):
+        return AdjacencyIndex.load(target)
+    index = AdjacencyIndex.build(read_title_codes(parquet))
+    index.save(target)
+    return index
+
+
+# ============================================================
+# SUBGRAPH
+# ============================================================
+
+def _hop_label(hop):
+    question = hop.get("question") or ""
+    return f"{hop.get('sub_id', '')}: {question if len(question) <= 60 else question[:57] + '...'}"
+
+
+def question_elements(question, decomposition, context_titles, adjacency, max_neighbours=MAX_NEIGHBOURS):
+    """vis.js nodes and edges of one question (see the top of the module)."""
+    nodes, edges = {}, []
+
+    def paragraph(title, color=NODE_COLOR):
+        node_id = f"p:{title}"
+        if node_id not in nodes:
+            nodes[node_id] = {"id": node_id, "label": title, "shape": "dot", "size": 10, "color": color}
+        return node_id
+
+    nodes["q"] = {
+        "id": "q", "label": "Question", "title": question or "", "shape": "star", "size": 20, "color": QUESTION_COLOR,
+    }
+
+    # Hop chain: each hop leads to the next with its answer; details hang below their hop
+    def chain(hops, previous, color, dashes):
+        for hop in hops:
+            node_id = f"h:{hop.get('sub_id', len(nodes))}"
+            nodes[node_id] = {
+                "id": node_id, "label": _hop_label(hop), "title": f"Answer: {hop.get('answer', '')}",
+                "shape": "box", "color": color,
+            }
+            edge = {"from": previous[0], "to": node_id, "arrows": "to", "dashes": dashes}
+            if previous[1] is not None:
+                edge["label"] = str(previous[1])
+            edges.append(edge)
+            support = hop.get("paragraph_support_title")
+            if support:
+                edges.append({"from": node_id, "to": paragraph(support), "color": HOP_COLOR, "dashes": True})
+            details = hop.get("details") or []
+            if details:
+                chain(details, (node_id, None), DETAIL_COLOR, True)
+            previous = (node_id, hop.get("answer"))
+        return previous
+
+    chain(decomposition or [], ("q", None), HOP_COLOR, False)
+
+    # Context paragraphs and their co-occurrence neighbours
+    for title in dict.fromkeys([] if context_titles is None else context_titles):
+        node_id = paragraph(title)
+        edges.append({"from": "q", "to": node_id, "color": {"color": NODE_COLOR, "opacity": 0.4}})
+        code = adjacency.code(title)
+        if code is None:
+            continue
+        for neighbour, weight in zip(*adjacency.neighbourhood(code, max_neighbours)):
+            neighbour_id = paragraph(adjacency.titles[neighbour], NEIGHBOUR_COLOR)
+            edges.append({
+                "from": node_id, "to": neighbour_id, "width": 1 + float(np.log2(weight)),
+                "title": f"{weight} questions", "color": {"color": NEIGHBOUR_COLOR},
+            })
+    return list(nodes.values()), edges
+
+
+def question_graph_html(question, decomposition, context_titles, adjacency, max_neighbours=MAX_NEIGHBOURS):
+    if isinstance(decomposition, str):
+        decomposition = json.loads(decomposition)
+    nodes, edges = question_elements(question, decomposition, context_titles, adjacency, max_neighbours)
+    return graph_html(nodes, edges, GRAPH_OPTIONS)
+
+
+# ============================================================
+# RENDER CACHE
+# ============================================================
+
+class LruCache:
+    """Least recently used values, bounded by the total size of the values (len of str)."""
+
+    def __init__(self, max_bytes=RENDER_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._values = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, compute):
+        """Cached value of `key`, computed (and cached) on a miss."""
+        with self._lock:
+            value = self._values.get(key)
+            if value is not None:
+                self._values.move_to_end(key)
+                self.hits += 1
+                return value
+            self.misses += 1
+        value = compute()
+        with self._lock:
+            if key not in self._values:
+                self._values[key] = value
+                self.bytes += len(value)
+                while self.bytes > self.max_bytes and len(self._values) > 1:
+                    _, evicted = self._values.popitem(last=False)
+                    self.bytes -= len(evicted)
+        return value
+
+    def __len__(self):
+        return len(self._values)
@@ -0,0 +1,96 @@
+from itertools import chain
+
+import numpy as np
+import pandas as pd
+
+from chart_data import OTHER_LABEL
+
+# ============================================================
+# RANKED FREQUENCIES (TOP-K / PAGES / "OTHER" BUCKET)
+# ============================================================
+#
+# The title counts are sorted once, when the structure is built. After
+# that, a top-K list, a page of ranks ("ranks 500-600") or the total of
+# the long tail are plain slices of the sorted arrays plus a lookup in
+# the cumulative sum, so each request costs O(K). A minimum-count
+# threshold becomes a binary search for the last rank that passes it.
+
+
+class RankedCounts:
+    """Labels sorted by decreasing count, with cumulative sums."""
+
+    def __init__(self, labels, counts):
+        counts = np.asarray(counts, dtype=np.int64)
+        order = np.argsort(-counts, kind="stable")
+        self.labels = np.asarray(labels, dtype=object)[order]
+        self.counts = counts[order]
+        # Ascending copy for np.searchsorted
+        self._negated = -self.counts
+        # cumulative[i] = sum of the counts of ranks [0, i)
+        self.cumulative = np.concatenate([[0], np.cumsum(self.counts)])
+
+    @classmethod
+    def from_codes(cls, codes, vocabulary):
+        """Builds from integer codes (e.g. the CSR title codes of dataset_stream)."""
+        counts = np.bincount(np.asarray(codes), minlength=len(vocabulary))
+        return cls(vocabulary, counts)
+
+    @classmethod
+    def from_lists(cls, lists):
+        """Builds from one list of labels per record (e.g. the context_titles column)."""
+        codes, vocabulary = pd.factorize(pd.Series(list(chain.from_iterable(lists)), dtype=object))
+        return cls.from_codes(codes, vocabulary)
+
+    def __len__(self):
+        return len(self.counts)
+
+    @property
+    def total(self):
+        return int(self.cumulative[-1])
+
+    def _clip(self, start, stop):
+        start = min(max(int(start), 0), len(self))
+        stop = min(max(int(stop), start), len(self))
+        return start, stop
+
+    def rank_of_threshold(self, threshold):
+        """Number of labels with count >= threshold, in O(log n)."""
+        return int(np.searchsorted(self._negated, -threshold, side="right"))
+
+    def count_between(self, start, stop):
+        """Sum of the counts of ranks [start, stop), in O(1)."""
+        start, stop = self._clip(start, stop)
+        return int(self.cumulative[stop] - self.cumulative[start])
+
+    def window(self, start, stop):
+        """Ranks [start, stop) as a DataFrame (rank, paragraphs, count)."""
+        start, stop = self._clip(start, stop)
+        return pd.DataFrame({
+            "rank": np.arange(start + 1, stop + 1),
+            "paragraphs": self.labels[start:stop],
+            "count": self.counts[start:stop],
+        })
+
+    def top(self, k):
+        return self.window(0, k)
+
+    def at_least(self, threshold):
+        """All labels with count >= threshold (a prefix of the ranking)."""
+        return self.window(0, self.rank_of_threshold(threshold))
+
+    def window_with_other(self, start, stop, end=None):
+        """
+        Ranks [start, stop) plus one OTHER_LABEL row with the total of the
+        ranks [stop, end) that were left out (end defaults to the last rank).
+        """
+        start, stop = self._clip(start, stop)
+        end = len(self) if end is None else max(min(int(end), len(self)), stop)
+        frame = self.window(start, stop)
+        if end > stop:
+            other = pd.DataFrame({
+                "rank": [stop + 1],
+                "paragraphs": [f"{OTHER_LABEL} ({end - stop})"],
+                "count": [self.count_between(stop, end)],
+            })
+            frame = pd.concat([frame, other], ignore_index=True)
+        return frame
@@ -0,0 +1,107 @@
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+# ============================================================
+# MULTI-LABEL REASONING TYPES
+# ============================================================
+#
+# reasoning_type holds comma-joined labels ("Commonsense, Arithmetic").
+# Each distinct combination is split once; the records get a sparse
+# one-hot matrix A (records x labels) by indexing the combination matrix
+# with the category codes, and a bitset (one bit per label) for filters.
+# Per-label counts are then matrix products:
+#   label x answer_type = A.T @ W @ B   (B: one-hot of the answer types)
+#   label x label       = A.T @ W @ A   (diagonal: questions with the label)
+# W holds the record weights: 1 per record, or the number of questions
+# when the rows are already aggregated (e.g. counts from the SQL backend).
+
+LABEL_SEPARATOR = ","
+
+
+def split_labels(value):
+    """'Commonsense, Arithmetic' -> ['Commonsense', 'Arithmetic']."""
+    if value is None:
+        return []
+    return [label.strip() for label in str(value).split(LABEL_SEPARATOR) if label.strip()]
+
+
+def one_hot(codes, n_columns, dtype=np.int64):
+    """Sparse rows x n_columns matrix with a 1 at each code (rows with code -1 stay empty)."""
+    codes = np.asarray(codes, dtype=np.int64)
+    rows = np.flatnonzero(codes >= 0)
+    data = np.ones(len(rows), dtype=dtype)
+    return sparse.csr_matrix((data, (rows, codes[rows])), shape=(len(codes), n_columns))
+
+
+class ReasoningLabels:
+    """Records x labels one-hot matrix of a reasoning_type column."""
+
+    def __init__(self, matrix, labels, weights=None):
+        self.matrix = matrix.tocsr()
+        self.labels = list(labels)
+        self.weights = np.ones(matrix.shape[0], dtype=np.int64) if weights is None else np.asarray(weights)
+
+    @classmethod
+    def from_codes(cls, codes, combinations, weights=None):
+        """
+        From category codes into `combinations` (the distinct reasoning_type
+        strings, e.g. the categories of the column); each string is split once.
+        """
+        split = [split_labels(combination) for combination in combinations]
+        labels = sorted({label for parts in split for label in parts})
+        position = {label: i for i, label in enumerate(labels)}
+        rows = np.repeat(np.arange(len(split)), [len(parts) for parts in split])
+        columns = np.array([position[label] for parts in split for label in parts], dtype=np.int64)
+        per_combination = sparse.csr_matrix(
+            (np.ones(len(columns), dtype=np.int64), (rows, columns)), shape=(len(split), len(labels))
+        )
+        per_combination.data[:] = 1  # a label repeated in one string counts once
+
+        # Records x labels: the combination rows, selected by the codes
+        return cls(one_hot(codes, len(split)) @ per_combination, labels, weights)
+
+    @property
+    def bits(self):
+        """One integer per record, bit i set when the record has label i (up to 64 labels)."""
+        if len(self.labels) > 64:
+            raise ValueError("bitset limited to 64 labels")
+        powers = np.left_shift(np.uint64(1), np.arange(len(self.labels), dtype=np.uint64))
+        return (self.matrix.astype(np.uint64) @ powers).astype(np.uint64)
+
+    def _weighted(self, matrix):
+        return sparse.csr_matrix(matrix.multiply(self.weights.reshape(-1, 1)))
+
+    def totals(self):
+        """Number of questions per label."""
+        return pd.DataFrame({
+            "reasoning_label": self.labels,
+            "count": np.asarray(self.matrix.T @ self.weights).ravel(),
+        })
+
+    def by(self, values, name):
+        """Long frame (reasoning_label, name, count) of label x value counts (one value per record)."""
+        codes, categories = pd.factorize(values)
+        counts = (self.matrix.T @ self._weighted(one_hot(codes, len(categories)))).toarray()
+        label_index, category_index = np.nonzero(counts)
+        return pd.DataFrame({
+            "reasoning_label": np.asarray(self.labels, dtype=object)[label_index],
+            name: np.asarray(categories, dtype=object)[category_index],
+            "count": counts[label_index, category_index],
+        })
+
+    def cooccurrence(self):
+        """Long frame (label_a, label_b, count): questions having both labels."""
+        counts = (self.matrix.T @ self._weighted(self.matrix)).toarray()
+        a, b = np.nonzero(counts)
+        labels = np.asarray(self.labels, dtype=object)
+        return pd.DataFrame({"label_a": labels[a], "label_b": labels[b], "count": counts[a, b]})
+
+
+def from_combination_counts(counts, column="reasoning_type"):
+    """
+    ReasoningLabels over already aggregated rows (one row per combination
+    and other keys, weighted by `count`), e.g. heatmap_counts() output.
+    """
+    codes, combinations = pd.factorize(counts[column].astype(object))
+    return ReasoningLabels.from_codes(codes, list(combinations), weights=counts["count"].to_numpy())
@@ -0,0 +1,329 @@
+import bisect
+from array import array
+import json
+import os
+import re
+
+import numpy as np
+import pyarrow.parquet as pq
+
+from dataset_cache import ensure_cache, cache_path, pack_strings, unpack_strings, load_paragraphs, LazyContext, temp_path
+from dataset_stream import PARAGRAPHS_COLUMN
+
+# ============================================================
+# FULL-TEXT SEARCH (BM25 INVERTED INDEX)
+# ============================================================
+#
+# Every record is one document made of its question, previous_question,
+# decomposition questions (nested `details` included), cutted_question
+# and context sentences. The index holds:
+#   - the sorted vocabulary (prefix queries are a bisect on it)
+#   - postings in CSR form: term -> document positions + term frequency
+#   - the token ids of every document (forward index), to check phrases
+#   - answer_type / reasoning_type codes, to filter results
+# It is built once per dataset version and saved next to the Parquet
+# cache. A query intersects postings and scores only the candidates.
+
+INDEX_SUFFIX = "search-index.npz"
+
+TEXT_FIELDS = ("question", "previous_question", "question_decomposition", "cutted_question", "context")
+FILTER_FIELDS = ("answer_type", "reasoning_type")
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+# Prefix queries use at most this many expansions (the most frequent ones)
+MAX_PREFIX_TERMS = 50
+
+# Separates fields in the forward index, so phrases never span two fields
+FIELD_GAP = -1
+
+TOKEN_RE = re.compile(r"\w+")
+QUERY_RE = re.compile(r'"([^"]*)"|(\S+)')
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(text.lower()) if text else []
+
+
+def _decomposition_questions(decomposition):
+    stack = list(decomposition or [])
+    questions = []
+    while stack:
+        hop = stack.pop(0)
+        questions.append(hop.get("question") or "")
+        stack[:0] = hop.get("details") or []
+    return questions
+
+
+def record_texts(record):
+    """Text of each searchable field of a record (nested fields already decoded)."""
+    texts = []
+    for field in TEXT_FIELDS:
+        value = record.get(field)
+        if field == "question_decomposition":
+            texts.extend(_decomposition_questions(value))
+        elif field == "context":
+            texts.extend(sentence for _, sentences in (value or []) for sentence in sentences)
+        elif value:
+            texts.append(str(value))
+    return texts
+
+
+class SearchResults:
+    def __init__(self, positions, scores, total):
+        self.positions = positions
+        self.scores = scores
+        self.total = total
+
+
+class SearchIndex:
+
+    def __init__(self, terms, postings_indptr, postings_docs, postings_tf, forward_indptr, forward_tokens, filters):
+        self.terms = terms
+        self._term_ids = {term: i for i, term in enumerate(terms)}
+        self.postings_indptr = postings_indptr
+        self.postings_docs = postings_docs
+        self.postings_tf = postings_tf
+        self.forward_indptr = forward_indptr
+        self.forward_tokens = forward_tokens
+        # {field: (codes per document, labels)}
+        self.filters = filters
+
+        self.n_docs = len(forward_indptr) - 1
+        lengths = np.diff(forward_indptr).astype(np.float32)
+        self.doc_len = lengths
+        self.avg_len = float(lengths.mean()) if self.n_docs else 0.0
+        df = np.diff(postings_indptr)
+        self.idf = np.log(1 + (self.n_docs - df + 0.5) / (df + 0.5)).astype(np.float32)
+
+    # --------------------------------------------------------
+    # Build / persist
+    # --------------------------------------------------------
+    @classmethod
+    def build(cls, records, filter_values):
+        """
+        - records: iterable of dicts with the TEXT_FIELDS (nested fields decoded)
+        - filter_values: {field: list of values per record} for FILTER_FIELDS
+        """
+        vocabulary = {}
+        forward = array("i")
+        forward_indptr = array("q", [0])
+        for record in records:
+            for text in record_texts(record):
+                forward.extend(vocabulary.setdefault(token, len(vocabulary)) for token in tokenize(text))
+                forward.append(FIELD_GAP)
+            forward_indptr.append(len(forward))
+
+        forward_tokens = np.frombuffer(forward, dtype=np.int32)
+        forward_indptr = np.frombuffer(forward_indptr, dtype=np.int64)
+
+        # Renumber terms in sorted order, so prefixes are contiguous ranges
+        terms = sorted(vocabulary)
+        remap = np.empty(len(vocabulary) + 1, dtype=np.int32)
+        remap[[vocabulary[t] for t in terms]] = np.arange(len(terms), dtype=np.int32)
+        remap[-1] = FIELD_GAP
+        forward_tokens = remap[forward_tokens]
+
+        # (term, doc) pairs -> postings with term frequencies
+        docs = np.repeat(np.arange(len(forward_indptr) - 1, dtype=np.int64), np.diff(forward_indptr))
+        keep = forward_tokens != FIELD_GAP
+        n_docs = max(len(forward_indptr) - 1, 1)
+        pairs, tf = np.unique(forward_tokens[keep].astype(np.int64) * n_docs + docs[keep], return_counts=True)
+        postings_indptr = np.zeros(len(terms) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(pairs // n_docs, minlength=len(terms)), out=postings_indptr[1:])
+
+        filters = {}
+        for field, values in filter_values.items():
+            labels = sorted({str(v) for v in values if v is not None})
+            lookup = {label: i for i, label in enumerate(labels)}
+            codes = np.array([lookup.get(str(v), -1) if v is not None else -1 for v in values], dtype=np.int32)
+            filters[field] = (codes, labels)
+
+        return cls(
+            terms,
+            postings_indptr,
+            (pairs % n_docs).astype(np.int32),
+            np.minimum(tf, np.iinfo(np.uint16).max).astype(np.uint16),
+            forward_indptr,
+            forward_tokens,
+            filters,
+        )
+
+    def save(self, target):
+        arrays = {
+            "postings_indptr": self.postings_indptr,
+            "postings_docs": self.postings_docs,
+            "postings_tf": self.postings_tf,
+            "forward_indptr": self.forward_indptr,
+            "forward_tokens": self.forward_tokens,
+        }
+        arrays["terms_blob"], arrays["terms_offsets"] = pack_strings(self.terms)
+        for field, (codes, labels) in self.filters.items():
+            arrays[f"filter_{field}_codes"] = codes
+            arrays[f"filter_{field}_blob"], arrays[f"filter_{field}_offsets"] = pack_strings(labels)
+        tmp = temp_path(target)
+        with open(tmp, "wb") as f:
+            np.savez(f, **arrays)
+        os.replace(tmp, target)
+
+    @classmethod
+    def load(cls, target):
+        with np.load(target) as arrays:
+            filters = {}
+            for key in arrays.files:
+                if key.startswith("filter_") and key.endswith("_codes"):
+                    field = key[len("filter_"):-len("_codes")]
+                    labels = unpack_strings(arrays[f"filter_{field}_blob"], arrays[f"filter_{field}_offsets"])
+                    filters[field] = (arrays[key], labels)
+            return cls(
+                unpack_strings(arrays["terms_blob"], arrays["terms_offsets"]),
+                arrays["postings_indptr"],
+                arrays["postings_docs"],
+                arrays["postings_tf"],
+                arrays["forward_indptr"],
+                arrays["forward_tokens"],
+                filters,
+            )
+
+    # --------------------------------------------------------
+    # Queries
+    # --------------------------------------------------------
+    def _postings(self, term_id):
+        start, end = self.postings_indptr[term_id], self.postings_indptr[term_id + 1]
+        return self.postings_docs[start:end], self.postings_tf[start:end]
+
+    def _prefix_ids(self, prefix):
+        start = bisect.bisect_left(self.terms, prefix)
+        end = bisect.bisect_left(self.terms, prefix + "\U0010ffff", lo=start)
+        ids = np.arange(start, end)
+        if len(ids) > MAX_PREFIX_TERMS:
+            df = np.diff(self.postings_indptr)[ids]
+            ids = ids[np.argsort(-df, kind="stable")[:MAX_PREFIX_TERMS]]
+        return ids
+
+    def _with_phrase(self, candidates, phrase_ids):
+        """Candidates whose token sequence contains the phrase (vectorized)."""
+        starts = self.forward_indptr[candidates]
+        lengths = self.forward_indptr[candidates + 1] - starts
+        bounds = np.concatenate([[0], np.cumsum(lengths)])
+        # Token ids of all candidates, one after the other. Every field ends
+        # with FIELD_GAP, so a phrase never spans two documents.
+        gather = np.repeat(starts - bounds[:-1], lengths) + np.arange(bounds[-1])
+        tokens = self.forward_tokens[gather]
+
+        n = len(tokens) - len(phrase_ids) + 1
+        if n <= 0:
+            return candidates[:0]
+        match = tokens[:n] == phrase_ids[0]
+        for offset, term_id in enumerate(phrase_ids[1:], start=1):
+            match &= tokens[offset:offset + n] == term_id
+        owners = np.searchsorted(bounds, np.flatnonzero(match), side="right") - 1
+        return candidates[np.unique(owners)]
+
+    @staticmethod
+    def parse(query):
+        """
+        Splits a query into (terms, prefixes, phrases):
+        plain words, words ending with '*' and "quoted phrases".
+        """
+        terms, prefixes, phrases = [], [], []
+        for phrase, word in QUERY_RE.findall(query):
+            if phrase:
+                tokens = tokenize(phrase)
+                if len(tokens) > 1:
+                    phrases.append(tokens)
+                terms.extend(tokens)
+            elif word.endswith("*") and tokenize(word):
+                prefixes.append(tokenize(word)[0])
+            else:
+                terms.extend(tokenize(word))
+        return terms, prefixes, phrases
+
+    def search(self, query, filters=None, offset=0, limit=20):
+        """
+        Documents containing every term (and one expansion of every prefix),
+        with every phrase, ranked by BM25. Returns one page of results.
+
+        - filters: {field: label} for FILTER_FIELDS, e.g. {"answer_type": "number"}
+        """
+        terms, prefixes, phrases = self.parse(query)
+        empty = SearchResults(np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.float32), 0)
+
+        # Each group is a list of term ids; a document must match one id of every group
+        groups = []
+        for term in dict.fromkeys(terms):
+            term_id = self._term_ids.get(term)
+            if term_id is None:
+                return empty
+            groups.append([term_id])
+        for prefix in prefixes:
+            ids = self._prefix_ids(prefix)
+            if not len(ids):
+                return empty
+            groups.append(list(ids))
+        if not groups:
+            return empty
+
+        # Intersect the rarest group first
+        group_docs = [np.unique(np.concatenate([self._postings(i)[0] for i in g])) for g in groups]
+        order = np.argsort([len(d) for d in group_docs])
+        candidates = group_docs[order[0]]
+        for i in order[1:]:
+            candidates = np.intersect1d(candidates, group_docs[i], assume_unique=True)
+
+        for field, label in (filters or {}).items():
+            codes, labels = self.filters[field]
+            code = labels.index(label) if label in labels else -2
+            candidates = candidates[codes[candidates] == code]
+
+        for phrase in phrases:
+            if len(candidates):
+                candidates = self._with_phrase(candidates, np.array([self._term_ids[t] for t in phrase], dtype=np.int32))
+
+        # BM25 over the candidates only
+        scores = np.zeros(len(candidates), dtype=np.float32)
+        norm = K1 * (1 - B + B * self.doc_len[candidates] / max(self.avg_len, 1e-9))
+        for group in groups:
+            for term_id in group:
+                docs, tf = self._postings(term_id)
+                found = np.searchsorted(docs, candidates)
+                found = np.minimum(found, len(docs) - 1)
+                hit = docs[found] == candidates if len(docs) else np.zeros(len(candidates), dtype=bool)
+                freq = np.where(hit, tf[found], 0).astype(np.float32)
+                scores += self.idf[term_id] * freq * (K1 + 1) / (freq + norm)
+
+        ranking = np.argsort(-scores, kind="stable")[offset:offset + limit]
+        return SearchResults(candidates[ranking], scores[ranking], len(candidates))
+
+
+def load_search_index(path, cache_dir=None):
+    """Loads the search index of the current dataset version, building it on first use."""
+    fingerprint, cache_dir, parquet = ensure_cache(path, cache_dir)
+    target = cache_path(fingerprint, cache_dir, INDEX_SUFFIX)
+    if os.path.exists(target):
+        return SearchIndex.load(target)
+
+    available = set(pq.read_schema(parquet).names)
+    columns = [c for c in TEXT_FIELDS + FILTER_FIELDS if c in available]
+    if PARAGRAPHS_COLUMN in available:
+        columns.append(PARAGRAPHS_COLUMN)
+        paragraphs = load_paragraphs(parquet)
+    parquet_file = pq.ParquetFile(parquet)
+
+    def records():
+        for batch in parquet_file.iter_batches(columns=columns):
+            for record in batch.to_pylist():
+                for field in ("question_decomposition", "context"):
+                    if isinstance(record.get(field), str):
+                        record[field] = json.loads(record[field])
+                if PARAGRAPHS_COLUMN in record:
+                    record["context"] = LazyContext(paragraphs, record.pop(PARAGRAPHS_COLUMN) or [])
+                yield record
+
+    filter_values = {field: pq.read_table(parquet, columns=[field]).column(field).to_pylist()
+                     for field in FILTER_FIELDS if field in available}
+    index = SearchIndex.build(records(), filter_values)
+    index.save(target)
+    return index
@@ -0,0 +1,230 @@
+import json
+import os
+import shutil
+import threading
+import weakref
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from compact_frame import CATEGORY_COLUMNS, CompactDataset, LazyColumns, TitleCodes, read_title_codes
+from dataset_cache import ensure_cache, cache_path, pack_strings, _read_manifest, temp_path
+from dataset_stream import DASHBOARD_FIELDS
+
+try:
+    import fcntl
+except ImportError:  # Windows: no reader locks, old stores are left in place
+    fcntl = None
+
+# ============================================================
+# MEMORY-MAPPED DATASET SHARED BY SESSIONS AND PROCESSES
+# ============================================================
+#
+# The compact dataset (compact_frame.py) is written once per dataset
+# version as a directory of .npy files next to the Parquet cache:
+#
+#   <hash>-store/meta.json              columns, kinds, categories
+#   <hash>-store/<column>.npy           ints / category codes
+#   <hash>-store/<column>.blob|offsets.npy   strings (UTF-8 + offsets)
+#   <hash>-store/titles.*.npy           TitleCodes (codes, offsets, vocabulary)
+#
+# Every session and process opens the files with mmap_mode="r" and wraps
+# them in pandas objects without copying, so the operating system keeps a
+# single read-only copy in the page cache, whatever the number of users.
+#
+# Stores are reference counted: in a process, acquire() / release() count
+# the users of each store and close it at zero; across processes, every
+# open store holds a shared flock on its lock file, and a store of an old
+# version is deleted only when an exclusive lock can be taken. A new JSON
+# file gives a new hash, hence a new directory, built aside and renamed
+# into place: readers switch on their next acquire(), never mid-run.
+
+STORE_SUFFIX = "store"
+META_FILE = "meta.json"
+LOCK_FILE = "readers.lock"
+
+STORE_COLUMNS = (*DASHBOARD_FIELDS, *CATEGORY_COLUMNS)
+
+
+# ============================================================
+# BUILD
+# ============================================================
+
+def _code_dtype(n_categories):
+    # Same width pandas uses for Categorical codes, so they are not converted
+    for dtype in (np.int8, np.int16, np.int32):
+        if n_categories < np.iinfo(dtype).max:
+            return dtype
+    return np.int64
+
+
+def _save_strings(directory, name, strings):
+    blob, offsets = pack_strings(strings)
+    np.save(os.path.join(directory, f"{name}.blob.npy"), blob)
+    np.save(os.path.join(directory, f"{name}.offsets.npy"), offsets)
+
+
+def build_store(parquet, target, columns=STORE_COLUMNS):
+    """Writes the store of a Parquet cache into `target` (built aside, then renamed)."""
+    tmp = temp_path(target)
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+
+    available = set(pq.read_schema(parquet).names)
+    columns = [c for c in dict.fromkeys(columns) if c in available]
+    table = pq.read_table(parquet, columns=columns)
+    meta = {"parquet": parquet, "rows": table.num_rows, "columns": {}}
+
+    for column in columns:
+        values = table.column(column).combine_chunks()
+        if column in CATEGORY_COLUMNS:
+            codes, categories = pd.factorize(values.to_numpy(zero_copy_only=False), sort=True)
+            np.save(os.path.join(tmp, f"{column}.npy"), codes.astype(_code_dtype(len(categories))))
+            meta["columns"][column] = {"kind": "category", "categories": [str(c) for c in categories]}
+        elif pa.types.is_integer(values.type):
+            np.save(os.path.join(tmp, f"{column}.npy"), values.fill_null(0).to_numpy().astype(np.int64))
+            if values.null_count:
+                np.save(os.path.join(tmp, f"{column}.valid.npy"), values.is_valid().to_numpy(zero_copy_only=False))
+            meta["columns"][column] = {"kind": "int", "nullable": bool(values.null_count)}
+        else:
+            _save_strings(tmp, column, [v or "" for v in values.to_pylist()])
+            meta["columns"][column] = {"kind": "text"}
+
+    titles = read_title_codes(parquet)
+    np.save(os.path.join(tmp, "titles.codes.npy"), titles.codes)
+    np.save(os.path.join(tmp, "titles.row_offsets.npy"), titles.offsets)
+    _save_strings(tmp, "titles.vocabulary", titles.vocabulary.tolist())
+
+    with open(os.path.join(tmp, META_FILE), "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+    open(os.path.join(tmp, LOCK_FILE), "w").close()
+
+    try:
+        os.replace(tmp, target)
+    except OSError:
+        # Another process published the same version first
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+# ============================================================
+# READ
+# ============================================================
+
+class SharedStore:
+    """Read-only, memory-mapped view of one store directory."""
+
+    def __init__(self, directory, parquet=None):
+        self.directory = directory
+        self.version = os.path.basename(directory).split("-", 1)[0]
+        self.refs = 0
+        with open(os.path.join(directory, META_FILE), "r", encoding="utf-8") as f:
+            self.meta = json.load(f)
+        # The Parquet file of the current cache format (the store may predate it)
+        self.parquet = parquet or self.meta["parquet"]
+
+        self._lock_file = open(os.path.join(directory, LOCK_FILE), "r")
+        if fcntl is not None:
+            fcntl.flock(self._lock_file, fcntl.LOCK_SH)
+        self._dataset = None
+
+    def _array(self, name):
+        return np.load(os.path.join(self.directory, f"{name}.npy"), mmap_mode="r")
+
+    def _strings(self, name):
+        offsets, blob = self._array(f"{name}.offsets"), self._array(f"{name}.blob")
+        return pa.LargeStringArray.from_buffers(len(offsets) - 1, pa.py_buffer(offsets), pa.py_buffer(blob))
+
+    def _column(self, column, spec):
+        if spec["kind"] == "category":
+            return pd.Categorical.from_codes(self._array(column), spec["categories"], validate=False)
+        if spec["kind"] == "int":
+            values = self._array(column)
+            if spec["nullable"]:
+                return pd.arrays.IntegerArray(values, ~self._array(f"{column}.valid"))
+            return values
+        return pd.arrays.ArrowStringArray(self._strings(column))
+
+    def dataset(self):
+        """CompactDataset over the mapped files (built once per process)."""
+        if self._dataset is None:
+            frame = pd.DataFrame(
+                {column: self._column(column, spec) for column, spec in self.meta["columns"].items()},
+                copy=False,
+            )
+            vocabulary = np.asarray(self._strings("titles.vocabulary").to_pylist(), dtype=object)
+            titles = TitleCodes(self._array("titles.codes"), self._array("titles.row_offsets"), vocabulary)
+            self._dataset = CompactDataset(frame, titles, LazyColumns(self.parquet))
+        return self._dataset
+
+    def close(self):
+        self._dataset = None
+        if not self._lock_file.closed:
+            self._lock_file.close()  # releases the flock
+
+
+# ============================================================
+# REFERENCE COUNTING
+# ============================================================
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def _remove_unused(cache_dir):
+    """Deletes stores of older dataset versions that no process has open."""
+    if fcntl is None:
+        return
+    known = {entry["hash"] for entry in _read_manifest(cache_dir).values()}
+    for name in os.listdir(cache_dir):
+        directory = os.path.join(cache_dir, name)
+        if not name.endswith(f"-{STORE_SUFFIX}") or name.split("-", 1)[0] in known or directory in _stores:
+            continue
+        try:
+            with open(os.path.join(directory, LOCK_FILE), "r") as lock:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                shutil.rmtree(directory)
+        except OSError:
+            pass  # still open somewhere
+
+
+def acquire(path, cache_dir=None):
+    """Store of the current version of `path` (built on first use); pair with release()."""
+    fingerprint, cache_dir, parquet = ensure_cache(path, cache_dir)
+    directory = cache_path(fingerprint, cache_dir, STORE_SUFFIX)
+    with _stores_lock:
+        store = _stores.get(directory)
+        if store is None:
+            if not os.path.isdir(directory):
+                build_store(parquet, directory)
+            store = _stores[directory] = SharedStore(directory, parquet)
+        store.refs += 1
+        _remove_unused(cache_dir)
+    return store
+
+
+def release(store):
+    with _stores_lock:
+        store.refs -= 1
+        if store.refs <= 0:
+            _stores.pop(store.directory, None)
+            store.close()
+
+
+class StoreLease:
+    """
+    One reference to a store, released by release() or when the lease is
+    garbage collected (e.g. with the session state of a closed session).
+    """
+
+    def __init__(self, path, cache_dir=None):
+        self.store = acquire(path, cache_dir)
+        self._finalizer = weakref.finalize(self, release, self.store)
+
+    @property
+    def version(self):
+        return self.store.version
+
+    def release(self):
+        self._finalizer()
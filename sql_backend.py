@@ -0,0 +1,255 @@
+import os
+import sqlite3
+import threading
+
+import pandas as pd
+import pyarrow.parquet as pq
+
+import numpy as np
+
+from dataset_cache import ensure_cache, cache_path, load_paragraphs, temp_path
+from dataset_stream import TITLES_COLUMN, PARAGRAPHS_COLUMN
+from ranked_counts import OTHER_LABEL
+
+# ============================================================
+# EMBEDDED SQL BACKEND (SQLITE)
+# ============================================================
+#
+# Optional alternative to the pandas DataFrame: the dataset is loaded
+# once, batch by batch, into an SQLite file next to the Parquet cache,
+# with indexes on the filtered / grouped columns. The charts are then
+# answered by GROUP BY queries, so nothing is materialized in Python
+# and datasets larger than RAM can be served.
+#
+#   questions(pos, _id, no_of_hops, answer_type, reasoning_type)
+#   titles(title_id, title)
+#   context_titles(pos, title_id)          one row per context paragraph
+#   title_counts(title_id, count)          unfiltered paragraph counts
+
+DB_SUFFIX = "dashboard.sqlite"
+BATCH_ROWS = 50_000
+
+QUESTION_COLUMNS = ("_id", "no_of_hops", "answer_type", "reasoning_type")
+FILTER_COLUMNS = ("answer_type", "reasoning_type", "no_of_hops")
+
+# Filter key whose values name sets of positions to leave out (see exclude())
+EXCLUDE_FILTER = "exclude"
+
+SCHEMA = """
+CREATE TABLE questions (
+    pos INTEGER PRIMARY KEY,
+    _id TEXT,
+    no_of_hops INTEGER,
+    answer_type TEXT,
+    reasoning_type TEXT
+);
+CREATE TABLE titles (title_id INTEGER PRIMARY KEY, title TEXT NOT NULL);
+CREATE TABLE context_titles (pos INTEGER NOT NULL, title_id INTEGER NOT NULL);
+"""
+
+INDEXES = """
+CREATE INDEX questions_answer_type ON questions (answer_type);
+CREATE INDEX questions_reasoning_type ON questions (reasoning_type);
+CREATE INDEX questions_no_of_hops ON questions (no_of_hops);
+CREATE UNIQUE INDEX titles_title ON titles (title);
+CREATE INDEX context_titles_title ON context_titles (title_id, pos);
+CREATE INDEX context_titles_pos ON context_titles (pos);
+CREATE TABLE title_counts AS
+    SELECT title_id, COUNT(*) AS count FROM context_titles GROUP BY title_id;
+CREATE INDEX title_counts_count ON title_counts (count DESC, title_id);
+"""
+
+
+def build_database(parquet, target, batch_rows=BATCH_ROWS):
+    """Loads the Parquet cache into a new SQLite file (written atomically)."""
+    tmp = temp_path(target)
+    if os.path.exists(tmp):
+        os.remove(tmp)
+
+    available = set(pq.read_schema(parquet).names)
+    # With the paragraph table, title ids come from the paragraph ids (no string lookups)
+    paragraphs = load_paragraphs(parquet) if PARAGRAPHS_COLUMN in available else None
+    titles_column = PARAGRAPHS_COLUMN if paragraphs is not None else TITLES_COLUMN
+    columns = [c for c in QUESTION_COLUMNS if c in available] + [titles_column]
+    connection = sqlite3.connect(tmp)
+    try:
+        connection.executescript(SCHEMA)
+        if paragraphs is not None:
+            connection.executemany("INSERT INTO titles VALUES (?, ?)", enumerate(paragraphs.titles.tolist()))
+        title_ids = {}
+        pos = 0
+        for batch in pq.ParquetFile(parquet).iter_batches(batch_size=batch_rows, columns=columns):
+            n = batch.num_rows
+            if paragraphs is not None:
+                ids = batch.column(titles_column)
+                lengths = np.diff(ids.offsets.to_numpy())
+                rows = np.repeat(np.arange(pos, pos + n), lengths)
+                pairs = zip(rows.tolist(), paragraphs.title_of[ids.flatten().to_numpy()].tolist())
+                batch = batch.drop_columns([titles_column])
+            batch = batch.to_pydict()
+            connection.executemany(
+                "INSERT INTO questions VALUES (?, ?, ?, ?, ?)",
+                zip(range(pos, pos + n), *(batch.get(c, [None] * n) for c in QUESTION_COLUMNS)),
+            )
+            if paragraphs is None:
+                pairs = []
+                new_titles = []
+                for offset, titles in enumerate(batch[TITLES_COLUMN]):
+                    for title in titles or []:
+                        title_id = title_ids.get(title)
+                        if title_id is None:
+                            title_id = title_ids[title] = len(title_ids)
+                            new_titles.append((title_id, title))
+                        pairs.append((pos + offset, title_id))
+                connection.executemany("INSERT INTO titles VALUES (?, ?)", new_titles)
+            connection.executemany("INSERT INTO context_titles VALUES (?, ?)", pairs)
+            pos += n
+        connection.executescript(INDEXES)
+        connection.commit()
+    finally:
+        connection.close()
+    os.replace(tmp, target)
+
+
+class SqlBackend:
+    """Chart aggregations as SQL queries over the SQLite file."""
+
+    def __init__(self, db_path):
+        # One connection shared by the Streamlit sessions, used under a lock
+        self.connection = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True, check_same_thread=False)
+        self.lock = threading.Lock()
+        self.columns = {row[1] for row in self.connection.execute("PRAGMA table_info(questions)")}
+        self.excluded = set()
+
+    def query(self, sql, params=()):
+        with self.lock:
+            return pd.read_sql_query(sql, self.connection, params=params)
+
+    def filter_values(self, column):
+        return self.query(f"SELECT DISTINCT {column} AS value FROM questions WHERE {column} IS NOT NULL ORDER BY 1")["value"].tolist()
+
+    def exclude(self, name, positions):
+        """
+        Registers a set of positions as a TEMP table (the file stays
+        read-only); filters {"exclude": [name]} then leave them out.
+        """
+        if not name.isidentifier():
+            raise ValueError(f"invalid name: {name!r}")
+        with self.lock:
+            if name in self.excluded:
+                return
+            self.connection.execute(f"CREATE TEMP TABLE exclude_{name} (pos INTEGER PRIMARY KEY)")
+            self.connection.executemany(f"INSERT INTO exclude_{name} VALUES (?)", ((int(p),) for p in positions))
+            self.excluded.add(name)
+
+    @staticmethod
+    def where(filters, alias="questions", not_null=()):
+        """
+        WHERE clause for {column: [accepted values]} (empty lists are
+        ignored) and {"exclude": [names of sets registered by exclude()]};
+        rows with NULL in one of the `not_null` columns are left out (as
+        pandas leaves out missing group keys).
+        """
+        clauses, params = [f"{alias}.{column} IS NOT NULL" for column in not_null], []
+        for name in (filters or {}).get(EXCLUDE_FILTER, ()):
+            if not name.isidentifier():
+                raise ValueError(f"invalid name: {name!r}")
+            clauses.append(f"{alias}.pos NOT IN (SELECT pos FROM temp.exclude_{name})")
+        for column, values in (filters or {}).items():
+            if column not in FILTER_COLUMNS or not values:
+                continue
+            clauses.append(f"{alias}.{column} IN ({', '.join('?' * len(values))})")
+            params.extend(values)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def count(self, filters=None):
+        where, params = self.where(filters)
+        return int(self.query(f"SELECT COUNT(*) AS n FROM questions{where}", params)["n"][0])
+
+    def hops_counts(self, filters=None, column="no_of_hops"):
+        where, params = self.where(filters, not_null=(column, "answer_type"))
+        return self.query(
+            f"SELECT {column}, answer_type, COUNT(*) AS count FROM questions{where} "
+            f"GROUP BY {column}, answer_type ORDER BY {column}, answer_type",
+            params,
+        )
+
+    def heatmap_counts(self, filters=None):
+        where, params = self.where(filters, not_null=("reasoning_type", "answer_type"))
+        return self.query(
+            f"SELECT reasoning_type, answer_type, COUNT(*) AS count FROM questions{where} "
+            "GROUP BY reasoning_type, answer_type",
+            params,
+        )
+
+    def _title_counts(self, filters):
+        """SQL of a (title_id, count) relation, filtered by the questions' columns."""
+        where, params = self.where(filters, alias="q")
+        if not where:
+            return "title_counts", []
+        return (
+            "(SELECT ct.title_id, COUNT(*) AS count FROM context_titles ct "
+            f"JOIN questions q ON q.pos = ct.pos{where} GROUP BY ct.title_id)",
+            params,
+        )
+
+    def support_count_range(self, filters=None):
+        counts, params = self._title_counts(filters)
+        row = self.query(f"SELECT MIN(count) AS lo, MAX(count) AS hi FROM {counts}", params).iloc[0]
+        return (int(row["lo"]), int(row["hi"])) if pd.notna(row["lo"]) else (0, 0)
+
+    def support_rank_of_threshold(self, threshold, filters=None):
+        """Number of paragraphs with count >= threshold (a prefix of the ranking)."""
+        counts, params = self._title_counts(filters)
+        return int(self.query(f"SELECT COUNT(*) AS n FROM {counts} WHERE count >= ?", params + [threshold])["n"][0])
+
+    def support_window(self, threshold, start, stop, end, filters=None):
+        """
+        Paragraphs ranked [start, stop) (rank/paragraphs/count), plus an
+        OTHER_LABEL row summing ranks [stop, end); `end` is the value of
+        support_rank_of_threshold(threshold), as in RankedCounts.window_with_other.
+        """
+        counts, params = self._title_counts(filters)
+        ranking = (
+            f"SELECT title_id, count FROM {counts} WHERE count >= ? "
+            "ORDER BY count DESC, title_id LIMIT ? OFFSET ?"
+        )
+        page = self.query(
+            f"SELECT t.title AS paragraphs, r.count AS count FROM ({ranking}) r "
+            "JOIN titles t ON t.title_id = r.title_id ORDER BY r.count DESC, r.title_id",
+            params + [threshold, max(stop - start, 0), start],
+        )
+        page.insert(0, "rank", range(start + 1, start + len(page) + 1))
+        if end > stop:
+            rest = self.query(
+                f"SELECT COALESCE(SUM(count), 0) AS total FROM ({ranking})",
+                params + [threshold, end - stop, stop],
+            )["total"][0]
+            other = pd.DataFrame({
+                "rank": [stop + 1],
+                "paragraphs": [f"{OTHER_LABEL} ({end - stop})"],
+                "count": [int(rest)],
+            })
+            page = pd.concat([page, other], ignore_index=True)
+        return page
+
+    def question_fields(self, positions, columns):
+        """`columns` of the questions at `positions`, in that order."""
+        positions = [int(p) for p in positions]
+        if not positions:
+            return pd.DataFrame(columns=list(columns))
+        rows = self.query(
+            f"SELECT pos, {', '.join(columns)} FROM questions "
+            f"WHERE pos IN ({', '.join('?' * len(positions))})",
+            positions,
+        )
+        return rows.set_index("pos").reindex(positions).reset_index(drop=True)
+
+
+def load_sql_backend(path, cache_dir=None):
+    """SQLite backend of the current dataset version, built on first use."""
+    fingerprint, cache_dir, parquet = ensure_cache(path, cache_dir)
+    target = cache_path(fingerprint, cache_dir, DB_SUFFIX)
+    if not os.path.exists(target):
+        build_database(parquet, target)
+    return SqlBackend(target)
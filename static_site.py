@@ -0,0 +1,268 @@
+"""
+Static build of the dashboard: one folder served as plain files (or
+opened from disk), with no Python process per viewer.
+
+    python static_site.py with_human_verification.json --out-dir site
+
+Every aggregation runs once, at build time:
+
+  index.html              Graph 1-3 as Vega-Lite specs whose data is
+                          already aggregated (and capped by
+                          enforce_budget), drawn in the browser by
+                          vega-embed
+  paragrafos_grafo*.html  the two paragraph graphs (cooccurrence.py),
+                          shown in frames of index.html
+  build.json              dataset hash and file sizes of the build
+
+Graph 3 keeps its frequency slider without a server: the page holds the
+top SUPPORT_RANKS paragraphs, and one "Other" row per range of slider
+values [lo, hi] over which the left-out paragraphs stay the same (one
+per distinct count of the tail, at most MAX_OTHER_ROWS), so the slider
+only filters rows.
+
+The build is skipped when build.json already matches the dataset hash.
+"""
+import argparse
+import html
+import json
+import os
+from datetime import datetime, timezone
+
+import altair as alt
+import numpy as np
+import pandas as pd
+
+from chart_data import enforce_budget, heatmap_counts, hops_counts
+from compact_frame import load_compact
+from cooccurrence import CROSS_FILE, WITHIN_FILE, cooccurrence_edges, load_incidence, write_graphs
+from dataset_cache import dataset_fingerprint, temp_path
+from dataset_stream import DASHBOARD_FIELDS
+from ranked_counts import OTHER_LABEL, RankedCounts
+from reasoning_labels import ReasoningLabels
+
+PAGE_FILE = "index.html"
+BUILD_FILE = "build.json"
+
+# Paragraphs of Graph 3 shown one by one; the rest is the "Other" row
+SUPPORT_RANKS = 100
+
+# At most this many "Other" rows in Graph 3 (one per slider range)
+MAX_OTHER_ROWS = 200
+
+PAGE_TEMPLATE = """<!DOCTYPE html>
+<html>
+    <head>
+        <meta charset="utf-8">
+        <title>MoreHopQA - Visualizations</title>
+        <script src="https://cdn.jsdelivr.net/npm/vega@6"></script>
+        <script src="https://cdn.jsdelivr.net/npm/vega-lite@6"></script>
+        <script src="https://cdn.jsdelivr.net/npm/vega-embed@7"></script>
+        <style type="text/css">
+            body { font-family: sans-serif; margin: 0 2rem 2rem; }
+            nav a { margin-right: 1rem; }
+            .chart { width: 100%; }
+            .meta { color: gray; }
+            iframe { width: 100%; height: 640px; border: 1px solid lightgray; }
+        </style>
+    </head>
+    <body>
+        <h1>MoreHopQA Dataset Visualizations</h1>
+        <p class="meta">__META__</p>
+        <nav>__NAV__</nav>
+__SECTIONS__
+        <script type="text/javascript">
+            var specs = __SPECS__;
+            for (var id in specs) {
+                vegaEmbed("#" + id, specs[id], {actions: false});
+            }
+        </script>
+    </body>
+</html>
+"""
+
+
+def _json(value):
+    """JSON safe to inline in a <script> tag."""
+    return json.dumps(value).replace("</", "<\\/")
+
+
+# ============================================================
+# CHARTS (same encodings as app_final_en.py)
+# ============================================================
+
+def hops_chart(counts):
+    return alt.Chart(counts).mark_bar(cornerRadiusTopLeft=5, cornerRadiusTopRight=5).encode(
+        x=alt.X('no_of_hops:O', title="Number of hops"),
+        y=alt.Y('sum(count):Q', title="Number of answers"),
+        color=alt.Color('answer_type:N', legend=alt.Legend(title="Answer Types")),
+        tooltip=['no_of_hops', 'answer_type', 'count']
+    ).properties(title='Distribution of number of hops', height=500, width="container").interactive()
+
+
+def heatmap_chart(counts, y_field="reasoning_type", y_title="Reasoning Type"):
+    return alt.Chart(counts).mark_rect().encode(
+        x=alt.X('answer_type:N', title='Answer Type'),
+        y=alt.Y(f'{y_field}:N', title=y_title),
+        color=alt.Color('count:Q', scale=alt.Scale(scheme='greens'), title='Number of Questions'),
+        tooltip=[y_field, 'answer_type', 'count']
+    ).properties(title='Heatmap: Answer Type x Reasoning Type', height=500, width="container")
+
+
+def label_pairs_chart(pairs):
+    return alt.Chart(pairs).mark_rect().encode(
+        x=alt.X('label_a:N', title='Reasoning Label'),
+        y=alt.Y('label_b:N', title='Reasoning Label'),
+        color=alt.Color('count:Q', scale=alt.Scale(scheme='blues'), title='Number of Questions'),
+        tooltip=['label_a', 'label_b', 'count']
+    ).properties(title='Reasoning labels appearing together', height=400, width="container")
+
+
+def support_data(ranked, ranks=SUPPORT_RANKS, max_other=MAX_OTHER_ROWS):
+    """
+    Top `ranks` paragraphs and the "Other" rows (other=True), one per
+    range [lo, hi] of thresholds that leaves the same paragraphs out.
+
+    With more than `max_other` distinct counts in the tail, neighbouring
+    ranges are merged; the row of a merged range is exact at its `hi`.
+    """
+    top = ranked.window(0, ranks)
+    top["other"], top["lo"], top["hi"] = False, 0, 0
+    if len(ranked) <= ranks:
+        return top
+    # Distinct counts of the tail, highest first; for lo <= threshold <= hi
+    # the ranks [ranks, end) are above the threshold
+    levels, sizes = np.unique(ranked.counts[ranks:], return_counts=True)
+    tail, ends = levels[::-1], ranks + np.cumsum(sizes[::-1])
+    keep = np.unique(np.linspace(0, len(tail) - 1, min(len(tail), max_other)).round().astype(np.int64))
+    ends = ends[keep]
+    other = pd.DataFrame({
+        "rank": ranks + 1,
+        "paragraphs": [f"{OTHER_LABEL} ({end - ranks})" for end in ends.tolist()],
+        "count": ranked.cumulative[ends] - ranked.cumulative[ranks],
+        "other": True,
+        "lo": np.append(tail[keep[1:]] + 1, ranked.counts[-1]),
+        "hi": tail[keep],
+    })
+    return pd.concat([top, other], ignore_index=True)
+
+
+def support_chart(ranked, ranks=SUPPORT_RANKS):
+    lo, hi = (int(ranked.counts[-1]), int(ranked.counts[0])) if len(ranked) else (0, 0)
+    threshold = alt.param(
+        name="threshold", value=lo, bind=alt.binding_range(min=lo, max=max(hi, lo + 1), step=1, name="Minimum frequency ")
+    )
+    return (
+        alt.Chart(support_data(ranked, ranks))
+        .mark_circle()
+        .encode(
+            x=alt.X('paragraphs:N', sort=None, title='Supporting Paragraph', axis=alt.Axis(labelAngle=-45, labelLimit=300)),
+            y=alt.Y('count:Q', title='Frequency'),
+            size='count:Q',
+            tooltip=['rank', 'paragraphs', 'count']
+        )
+        .add_params(threshold)
+        .transform_filter("datum.other ? datum.lo <= threshold && threshold <= datum.hi : datum.count >= threshold")
+        .properties(title=f'Most used supporting paragraphs (top {ranks})', height=500, width="container")
+    )
+
+
+# ============================================================
+# BUILD
+# ============================================================
+
+def dashboard_specs(path, cache_dir=None):
+    """{element id: (section, Vega-Lite spec)} of Graph 1-3."""
+    dataset = load_compact(path, DASHBOARD_FIELDS, cache_dir)
+    frame = dataset.frame
+    if "no_of_hops" not in frame.columns and "num_hops" in frame.columns:
+        frame = frame.assign(no_of_hops=frame["num_hops"])
+
+    charts = {
+        "hops": ("Graph 1", hops_chart(enforce_budget(hops_counts(frame), collapse="no_of_hops"))),
+        "heatmap": ("Graph 2", heatmap_chart(enforce_budget(heatmap_counts(frame), collapse="reasoning_type"))),
+    }
+    column = frame["reasoning_type"]
+    labels = ReasoningLabels.from_codes(column.cat.codes, column.cat.categories)
+    charts["labels"] = ("Graph 2", heatmap_chart(labels.by(frame["answer_type"], "answer_type"), "reasoning_label", "Reasoning Label"))
+    charts["label_pairs"] = ("Graph 2", label_pairs_chart(labels.cooccurrence()))
+    charts["support"] = ("Graph 3", support_chart(RankedCounts.from_codes(dataset.titles.codes, dataset.titles.vocabulary)))
+    return {name: (section, chart.to_dict()) for name, (section, chart) in charts.items()}
+
+
+def page_html(specs, graphs, meta):
+    sections = {}
+    for name, (section, _) in specs.items():
+        sections.setdefault(section, []).append(f'<div id="{html.escape(name)}" class="chart"></div>')
+    if graphs:
+        sections["Paragraph graphs"] = [
+            f'<h3><a href="{target}">{target}</a></h3>\n<iframe src="{target}" loading="lazy"></iframe>'
+            for target in map(html.escape, graphs)
+        ]
+    anchors = {section: html.escape(section.replace(" ", "-")) for section in sections}
+    nav = "".join(f'<a href="#{anchors[section]}">{html.escape(section)}</a>' for section in sections)
+    body = "\n".join(
+        f'        <section id="{anchors[section]}">\n            <h2>{html.escape(section)}</h2>\n            '
+        + "\n            ".join(items) + "\n        </section>"
+        for section, items in sections.items()
+    )
+    return (
+        PAGE_TEMPLATE
+        .replace("__META__", html.escape(meta))
+        .replace("__NAV__", nav)
+        .replace("__SECTIONS__", body)
+        .replace("__SPECS__", _json({name: spec for name, (_, spec) in specs.items()}))
+    )
+
+
+def build_site(path, out_dir="site", graphs=True, force=False, cache_dir=None):
+    """Writes the static site; returns its build.json entry (unchanged when already up to date)."""
+    fingerprint = dataset_fingerprint(path, cache_dir)
+    os.makedirs(out_dir, exist_ok=True)
+    build_file = os.path.join(out_dir, BUILD_FILE)
+    if not force and os.path.exists(build_file):
+        with open(build_file, "r", encoding="utf-8") as f:
+            build = json.load(f)
+        if build.get("dataset") == fingerprint["hash"] and build.get("graphs") == graphs:
+            return build
+
+    specs = dashboard_specs(path, cache_dir)
+    graph_files = []
+    if graphs:
+        incidence, labels = load_incidence(path, cache_dir)
+        graph_files = [os.path.basename(t) for t in write_graphs(out_dir, labels, *cooccurrence_edges(incidence))]
+
+    built = datetime.now(timezone.utc).isoformat(timespec="seconds")
+    meta = f"{os.path.basename(path)} ({fingerprint['hash'][:12]}), built {built}"
+    target = os.path.join(out_dir, PAGE_FILE)
+    tmp = temp_path(target)
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(page_html(specs, graph_files, meta))
+    os.replace(tmp, target)
+
+    build = {
+        "dataset": fingerprint["hash"],
+        "built": built,
+        "graphs": graphs,
+        "files": {name: os.path.getsize(os.path.join(out_dir, name)) for name in [PAGE_FILE, *graph_files]},
+    }
+    with open(build_file, "w", encoding="utf-8") as f:
+        json.dump(build, f, indent=2)
+    return build
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("dataset", nargs="?", default="with_human_verification.json")
+    parser.add_argument("--out-dir", default="site")
+    parser.add_argument("--no-graphs", action="store_true", help=f"leave out {WITHIN_FILE} and {CROSS_FILE}")
+    parser.add_argument("--force", action="store_true", help="rebuild even if the dataset did not change")
+    args = parser.parse_args()
+
+    build = build_site(args.dataset, args.out_dir, graphs=not args.no_graphs, force=args.force)
+    for name, size in build["files"].items():
+        print(f"{os.path.join(args.out_dir, name)}: {size / 1024:,.0f} KB")
+    print(f"built {build['built']} from {build['dataset'][:12]}")
+
+
+if __name__ == "__main__":
+    main()
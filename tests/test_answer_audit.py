@@ -0,0 +1,51 @@
+import json
+
+from answer_audit import audit_chunk, audit_record, issues_frame, run_audit
+from synthetic import Generator
+
+
+def hop(sub_id, question, answer, title="", details=None):
+    record = {"sub_id": sub_id, "question": question, "answer": answer, "paragraph_support_title": title}
+    if details:
+        record["details"] = details
+    return record
+
+
+def test_each_check():
+    decomposition = [
+        hop("1", "Who founded A?", "Ann Smith.", "A"),
+        hop("2", "When was ann  smith born?", "1950", "B"),
+        hop("3", "Which year is 10 years after it?", "1960", details=[
+            hop("3_1", "What is 1950 plus 10?", "1960", "Missing"),
+            hop("3_2", "Round 1961", "1960"),
+        ]),
+    ]
+    issues = audit_record("1970", decomposition, ["A", "B"])
+    assert [(issue["check"], issue["hop"]) for issue in issues] == [
+        ("hop_answer_unused", "3_1"),
+        ("last_hop_answer", "3"),
+        ("support_not_in_context", "3_1"),
+    ]
+    assert audit_record("1960.", decomposition[:1] + [hop("2", "ann smith?", "1960", "B")], ["A", "B"]) == []
+
+
+def test_chunk_reports_invalid_decompositions():
+    results = audit_chunk([("1", "not json", []), ("1", json.dumps([hop("1", "q", "1")]), [])])
+    assert json.loads(results[0])[0]["check"] == "invalid_decomposition"
+    assert results[1] == "[]"
+
+
+def test_second_audit_only_checks_the_changed_records(tmp_path):
+    records = list(Generator(50).records(50))
+    path, cache_dir = tmp_path / "data.json", tmp_path / "cache"
+    path.write_text(json.dumps(records), encoding="utf-8")
+    audit, audited = run_audit(str(path), str(cache_dir), workers=1)
+    assert audited == 50 and issues_frame(audit).empty
+
+    records[7]["answer"] = "something else"
+    path.write_text(json.dumps(records), encoding="utf-8")
+    audit, audited = run_audit(str(path), str(cache_dir), workers=1)
+    assert audited == 1
+    issues = issues_frame(audit)
+    assert issues["position"].tolist() == [7] and issues["check"].tolist() == ["last_hop_answer"]
+    assert run_audit(str(path), str(cache_dir), workers=1)[1] == 0
@@ -0,0 +1,46 @@
+import pandas as pd
+import pytest
+
+from chart_data import OTHER_LABEL, enforce_budget, heatmap_counts, hops_counts
+from synthetic import Generator
+
+
+def pair_counts(rows, columns, seed=0):
+    """Every (reasoning_type, answer_type) pair with a distinct count."""
+    frame = pd.DataFrame(
+        [(f"r{i}", f"a{j}") for i in range(rows) for j in range(columns)],
+        columns=["reasoning_type", "answer_type"],
+    )
+    frame["count"] = frame.index.to_series().sample(frac=1, random_state=seed).to_numpy() + 1
+    return frame
+
+
+def test_frames_within_budget_are_unchanged():
+    frame = pair_counts(3, 4)
+    assert enforce_budget(frame, "reasoning_type", max_rows=12) is frame
+
+
+def test_least_frequent_values_are_merged():
+    frame = pd.DataFrame({"paragraphs": [f"p{i}" for i in range(10)], "count": range(10, 0, -1)})
+    budgeted = enforce_budget(frame, "paragraphs", max_rows=4)
+    assert budgeted["paragraphs"].tolist() == ["p0", "p1", "p2", f"{OTHER_LABEL} (7)"]
+    assert budgeted["count"].tolist() == [10, 9, 8, 28]
+
+
+@pytest.mark.parametrize("rows, columns", [(20, 3), (5, 10), (4, 40), (40, 40)])
+@pytest.mark.parametrize("max_rows", [1, 2, 7, 30])
+def test_budget_holds_with_many_other_rows(rows, columns, max_rows):
+    frame = pair_counts(rows, columns)
+    budgeted = enforce_budget(frame, "reasoning_type", max_rows=max_rows)
+    assert len(budgeted) <= max_rows
+    assert budgeted["count"].sum() == frame["count"].sum()
+    assert not budgeted.duplicated(["reasoning_type", "answer_type"]).any()
+
+
+def test_budget_on_generated_records():
+    df = pd.DataFrame(Generator(2000, seed=1).records(2000))
+    for frame, collapse in [(hops_counts(df), "no_of_hops"), (heatmap_counts(df), "reasoning_type")]:
+        for max_rows in (1, 3, len(frame) - 1):
+            budgeted = enforce_budget(frame, collapse, max_rows=max_rows)
+            assert len(budgeted) <= max_rows
+            assert budgeted["count"].sum() == frame["count"].sum()
@@ -0,0 +1,51 @@
+import json
+
+from compact_frame import CATEGORY_COLUMNS, load_compact, read_title_codes
+from dataset_cache import ensure_cache, load_dataset
+from dataset_stream import DASHBOARD_FIELDS, TITLES_COLUMN
+from synthetic import Generator
+
+
+def write(tmp_path, n=200):
+    records = list(Generator(n, seed=9).records(n))
+    records[3]["context"] = []
+    path = str(tmp_path / "data.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(records, f)
+    return path, records
+
+
+def test_compact_frame_matches_the_full_load(tmp_path):
+    path, records = write(tmp_path)
+    cache_dir = str(tmp_path / "cache")
+    dataset = load_compact(path, [*DASHBOARD_FIELDS, "pattern", TITLES_COLUMN, "context"], cache_dir)
+    full = load_dataset(path, cache_dir=cache_dir)
+
+    assert TITLES_COLUMN not in dataset.frame.columns and "context" not in dataset.frame.columns
+    for column in dataset.frame.columns:
+        if column in CATEGORY_COLUMNS:
+            assert dataset.frame[column].dtype == "category"
+        assert dataset.frame[column].astype(object).tolist() == full[column].astype(object).tolist()
+    assert [dataset.titles.row(i) for i in range(len(dataset.titles))] == full[TITLES_COLUMN].apply(list).tolist()
+
+
+def test_text_columns_are_read_on_first_use(tmp_path):
+    path, records = write(tmp_path, 50)
+    dataset = load_compact(path, ["_id"], str(tmp_path / "cache"))
+    text = dataset.text
+    assert "question" in text and "no_such_column" not in text
+    assert not text._loaded
+    rows = text.rows([4, 1], ["question", "answer"])
+    assert rows.to_dict("records") == [{key: records[i][key] for key in ("question", "answer")} for i in (4, 1)]
+    assert [list(paragraph) for paragraph in text["context"][1]] == records[1]["context"]
+    text.unload()
+    assert not text._loaded
+
+
+def test_title_codes_share_one_vocabulary(tmp_path):
+    path, records = write(tmp_path, 80)
+    _, _, parquet = ensure_cache(path, str(tmp_path / "cache"))
+    titles = read_title_codes(parquet)
+    distinct = {title for record in records for title, _ in record["context"]}
+    assert sorted(titles.vocabulary) == sorted(distinct)
+    assert len(titles) == len(records) and titles.row(3) == []
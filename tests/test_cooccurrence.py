@@ -0,0 +1,34 @@
+from collections import Counter
+from itertools import combinations
+
+import numpy as np
+
+from cooccurrence import cooccurrence_edges, graph_elements, incidence_matrix
+
+
+def title_codes(contexts):
+    codes = [code for context in contexts for code in context]
+    offsets = np.cumsum([0, *map(len, contexts)])
+    return np.array(codes), offsets
+
+
+def test_edges_count_the_shared_questions():
+    contexts = [[0, 1, 2], [1, 2], [2, 3, 3], [4], [1, 0]]
+    incidence = incidence_matrix(*title_codes(contexts), 5)
+    sources, targets, weights = cooccurrence_edges(incidence)
+    expected = Counter(pair for context in contexts for pair in combinations(sorted(set(context)), 2))
+    assert {(min(s, t), max(s, t)): w for s, t, w in zip(sources, targets, weights)} == expected
+
+
+def test_incidence_matrix_leaves_its_inputs_alone():
+    codes, offsets = title_codes([[2, 0, 1], [1, 0]])
+    incidence_matrix(codes, offsets, 3)
+    assert codes.tolist() == [2, 0, 1, 1, 0]
+
+
+def test_isolated_titles_stay_in_the_graph():
+    labels = np.array(["a", "b", "c", "alone"], dtype=object)
+    positions = np.zeros((4, 2))
+    nodes, edges = graph_elements(labels, positions, np.array([0, 1]), np.array([1, 2]), np.array([1, 1]), 10, False)
+    assert sorted(node["label"] for node in nodes) == sorted(labels)
+    assert len(edges) == 2
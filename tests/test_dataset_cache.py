@@ -0,0 +1,59 @@
+import json
+import os
+import threading
+
+import pandas as pd
+
+from dataset_cache import dataset_fingerprint, ensure_cache, load_dataset, temp_path
+from synthetic import write_dataset
+
+
+def test_temp_path_is_unique_per_thread():
+    names, barrier = set(), threading.Barrier(4)
+
+    def name():
+        names.add(temp_path("target"))
+        barrier.wait()  # the threads are alive together: their idents differ
+
+    threads = [threading.Thread(target=name) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(names) == 4
+
+
+def test_concurrent_builds_publish_one_complete_cache(tmp_path):
+    path = str(tmp_path / "data.json")
+    write_dataset(path, 300)
+    results, errors = [], []
+
+    def build():
+        try:
+            results.append(ensure_cache(path)[2])
+        except Exception as e:  # reported below
+            errors.append(e)
+
+    threads = [threading.Thread(target=build) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not errors and len(set(results)) == 1
+    cache_dir = os.path.dirname(results[0])
+    assert not [name for name in os.listdir(cache_dir) if name.endswith(".tmp")]
+
+    with open(path, "r", encoding="utf-8") as f:
+        records = json.load(f)
+    frame = load_dataset(path, columns=["_id", "answer"])
+    pd.testing.assert_frame_equal(frame, pd.DataFrame(records)[["_id", "answer"]], check_dtype=False)
+
+
+def test_fingerprint_follows_edits(tmp_path):
+    path = str(tmp_path / "data.json")
+    write_dataset(path, 20)
+    before = dataset_fingerprint(path)
+    assert dataset_fingerprint(path) == before
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(" ")
+    assert dataset_fingerprint(path)["hash"] != before["hash"]
@@ -0,0 +1,60 @@
+import json
+
+import pyarrow.parquet as pq
+import pytest
+
+from dataset_cache import build_cache
+from dataset_stream import TITLES_COLUMN, iter_batches, iter_records, read_projected
+from synthetic import Generator
+
+
+def write(tmp_path, value, text=None):
+    path = tmp_path / "data.json"
+    path.write_text(json.dumps(value, indent=1) if text is None else text, encoding="utf-8")
+    return str(path)
+
+
+def test_records_split_across_chunks(tmp_path):
+    records = list(Generator(50).records(50))
+    path = write(tmp_path, records)
+    # Chunks far smaller than one record: every record is cut at least once
+    for chunk_size in (7, 100, 1 << 20):
+        assert list(iter_records(path, chunk_size)) == records
+    projected = read_projected(path, ("_id", "no_of_hops"), chunk_size=13).to_frame()
+    assert projected["_id"].tolist() == [record["_id"] for record in records]
+    assert projected[TITLES_COLUMN].tolist() == [[title for title, _ in record["context"]] for record in records]
+
+
+@pytest.mark.parametrize("text", ['{"_id": "a"}', '"text"', "", "[", '[{"_id": "a"}'])
+def test_not_a_list_of_records(tmp_path, text):
+    with pytest.raises(ValueError):
+        list(iter_records(write(tmp_path, None, text)))
+
+
+@pytest.mark.parametrize("item", [1, "text", None, ["a"]])
+def test_items_that_are_not_records(tmp_path, item):
+    with pytest.raises(ValueError):
+        list(iter_records(write(tmp_path, [{"_id": "a"}, item])))
+
+
+def test_fields_first_seen_in_a_later_batch(tmp_path):
+    records = [{"_id": str(i), "answer_type": "date"} for i in range(10)]
+    records[7]["late"] = "value"
+    records[8]["no_of_hops"] = 3
+    path = write(tmp_path, records)
+
+    batches = list(iter_batches(path, 4))
+    assert [batch.fields for batch in batches] == [
+        ["_id", "answer_type"],
+        ["_id", "answer_type", "late"],
+        ["_id", "answer_type", "late", "no_of_hops"],
+    ]
+
+    # The Parquet cache keeps them, with nulls in the row groups written before
+    parquet = str(tmp_path / "cache.parquet")
+    build_cache(path, parquet, batch_size=4)
+    assert pq.ParquetFile(parquet).num_row_groups == 3
+    table = pq.read_table(parquet).to_pydict()
+    assert table["_id"] == [record["_id"] for record in records]
+    assert table["late"] == [record.get("late") for record in records]
+    assert table["no_of_hops"] == [record.get("no_of_hops") for record in records]
@@ -0,0 +1,69 @@
+from collections import Counter
+from itertools import combinations
+
+import numpy as np
+
+from graph_layout import WORLD_SIZE, assign_tiles, communities, layout, super_graph, tile_grid
+
+
+def cliques(sizes, bridge=False):
+    """Disjoint cliques of the given sizes (optionally one edge between the first two); nodes after them stay isolated."""
+    sources, targets, start = [], [], 0
+    for size in sizes:
+        for a, b in combinations(range(start, start + size), 2):
+            sources.append(a)
+            targets.append(b)
+        start += size
+    if bridge:
+        sources.append(0)
+        targets.append(sizes[0])
+    return np.array(sources), np.array(targets), np.ones(len(sources))
+
+
+def test_communities_follow_the_cliques():
+    sources, targets, weights = cliques([12, 5, 3], bridge=True)
+    labels = communities(23, sources, targets, weights)
+    assert len(set(labels[:12])) == len(set(labels[12:17])) == len(set(labels[17:20])) == 1
+    # Numbered by decreasing size; isolated nodes are communities of their own
+    assert labels[0] == 0 and labels[12] == 1 and labels[17] == 2
+    assert sorted(labels[20:]) == [3, 4, 5]
+
+
+def test_layout_positions():
+    sources, targets, weights = cliques([400, 30, 6, 1])
+    n = 440
+    positions, labels = layout(n, sources, targets, weights)
+    assert positions.shape == (n, 2) and np.isfinite(positions).all()
+    assert positions.min() >= 0 and positions.max() <= WORLD_SIZE + 1e-6
+    # Communities are packed apart: their bounding boxes do not overlap
+    boxes = [(positions[labels == c].min(axis=0), positions[labels == c].max(axis=0)) for c in range(labels.max() + 1)]
+    for (lo_a, hi_a), (lo_b, hi_b) in combinations(boxes, 2):
+        assert (hi_a < lo_b).any() or (hi_b < lo_a).any()
+    assert len(np.unique(positions[labels == 0], axis=0)) == 400
+
+def test_super_graph_sums_the_edges_between_communities():
+    rng = np.random.default_rng(0)
+    n = 60
+    labels = rng.integers(0, 5, n)
+    sources, targets = rng.integers(0, n, 200), rng.integers(0, n, 200)
+    weights = rng.integers(1, 4, 200).astype(np.float64)
+    positions = rng.uniform(0, WORLD_SIZE, (n, 2))
+    degree = rng.random(n)
+    centroids, sizes, representative, (a, b, edge_weights) = super_graph(positions, labels, sources, targets, weights, degree)
+
+    expected = Counter()
+    for s, t, w in zip(labels[sources], labels[targets], weights):
+        if s != t:
+            expected[min(s, t), max(s, t)] += w
+    assert dict(zip(zip(a.tolist(), b.tolist()), edge_weights.tolist())) == expected
+    assert sizes.tolist() == np.bincount(labels).tolist()
+    for community in range(5):
+        members = np.flatnonzero(labels == community)
+        assert np.allclose(centroids[community], positions[members].mean(axis=0))
+        assert representative[community] == members[degree[members].argmax()]
+
+
+def test_tiles_cover_the_plane():
+    assert tile_grid(1) == 1 and tile_grid(400 * 9) == 3
+    positions = np.array([[0.0, 0.0], [WORLD_SIZE, WORLD_SIZE], [WORLD_SIZE / 2, 10.0]])
+    assert assign_tiles(positions, 3).tolist() == [[0, 0], [2, 2], [1, 0]]
@@ -0,0 +1,36 @@
+import numpy as np
+
+from graph_stats import bridge_scores, union_find
+
+
+def components(n, a, b):
+    """Component of every element, by a plain union-find loop."""
+    parent = list(range(n))
+
+    def find(x):
+        while parent[x] != x:
+            x = parent[x]
+        return x
+
+    for x, y in zip(a, b):
+        parent[find(x)] = find(y)
+    return [find(x) for x in range(n)]
+
+
+def same_partition(left, right):
+    return len(set(zip(left, right))) == len(set(left)) == len(set(right))
+
+
+def test_union_find_matches_a_loop():
+    rng = np.random.default_rng(0)
+    for n, n_pairs in [(1, 0), (10, 3), (200, 150), (1000, 2000)]:
+        a, b = rng.integers(0, n, n_pairs), rng.integers(0, n, n_pairs)
+        roots = union_find(n, a, b)
+        assert same_partition(roots.tolist(), components(n, a.tolist(), b.tolist()))
+        assert np.array_equal(roots[roots], roots)
+
+
+def test_bridge_scores_count_the_other_communities():
+    labels = np.array([0, 0, 1, 2, 2])
+    sources, targets = np.array([0, 0, 0, 1, 3]), np.array([1, 2, 3, 3, 4])
+    assert bridge_scores(labels, sources, targets).tolist() == [2, 1, 1, 1, 0]
@@ -0,0 +1,88 @@
+import json
+from collections import Counter
+from itertools import combinations
+
+import pytest
+
+from live_ingest import LiveDataset
+from synthetic import Generator
+
+
+def assert_counts(live, records):
+    """The live counts against a recount of the records."""
+    assert live.order == [record["_id"] for record in records]
+    hops = Counter((record["no_of_hops"], record["answer_type"]) for record in records)
+    frame = live.hops_counts()
+    assert Counter(dict(zip(zip(frame["no_of_hops"], frame["answer_type"]), frame["count"]))) == hops
+
+    titles = [[title for title, _ in record["context"]] for record in records]
+    ranked = live.ranked()
+    assert dict(zip(ranked.labels, ranked.counts.tolist())) == Counter(t for context in titles for t in context)
+
+    pairs = Counter(pair for context in titles for pair in combinations(sorted(set(context)), 2))
+    sources, targets, weights, labels = live.cooccurrence_edges()
+    edges = {tuple(sorted((labels[s], labels[t]))): w for s, t, w in zip(sources, targets, weights.tolist())}
+    assert edges == pairs
+
+
+@pytest.fixture
+def dataset(tmp_path):
+    records = list(Generator(200, seed=6).records(200))
+    path = tmp_path / "data.json"
+    path.write_text(json.dumps(records), encoding="utf-8")
+    live = LiveDataset(str(path), str(tmp_path / "cache"))
+    yield live, path, records
+    live.close()
+
+
+def test_appended_records_are_read_alone(dataset):
+    live, path, records = dataset
+    assert_counts(live, records)
+    new = [dict(record, _id=f"new{i}", context=record["context"] + [["New title", ["x"]]]) for i, record in enumerate(records[:5])]
+    records = records + new
+    path.write_text(json.dumps(records), encoding="utf-8")
+    delta = live.refresh()
+    assert (delta.added, delta.changed, delta.removed, delta.full_pass) == (5, 0, 0, False)
+    assert_counts(live, records)
+    assert live.refresh() is None
+
+
+def test_edits_and_deletions(dataset):
+    live, path, records = dataset
+    records[10] = dict(records[10], answer_type="edited")
+    records[11] = dict(records[11], context=records[11]["context"][:1])
+    del records[3]
+    path.write_text(json.dumps(records, indent=1), encoding="utf-8")
+    delta = live.refresh()
+    assert (delta.added, delta.changed, delta.removed) == (0, 2, 1)
+    assert_counts(live, records)
+
+
+def test_half_written_file_keeps_the_counts(dataset):
+    live, path, records = dataset
+    revision = live.revision
+    path.write_text(json.dumps(records)[:-500], encoding="utf-8")
+    assert live.refresh() is None
+    assert live.error is not None and live.revision == revision
+    assert_counts(live, records)
+
+
+def test_same_length_edits_are_not_taken_for_appends(dataset):
+    live, path, records = dataset
+    text = json.dumps(records)
+    # Record 0 edited in place: the file keeps its length
+    records[0] = dict(records[0], no_of_hops=records[0]["no_of_hops"] % 4 + 1)
+    edited = json.dumps(records)
+    assert len(edited) == len(text)
+    path.write_text(edited, encoding="utf-8")
+    delta = live.refresh()
+    assert (delta.changed, delta.full_pass) == (1, True)
+    assert_counts(live, records)
+
+    # The same kind of edit together with an append
+    records[0] = dict(records[0], no_of_hops=records[0]["no_of_hops"] % 4 + 1)
+    records.append(dict(records[1], _id="appended"))
+    path.write_text(json.dumps(records), encoding="utf-8")
+    delta = live.refresh()
+    assert (delta.added, delta.changed, delta.full_pass) == (1, 1, True)
+    assert_counts(live, records)
@@ -0,0 +1,43 @@
+import numpy as np
+from scipy import sparse
+from scipy.sparse.csgraph import connected_components
+
+from near_duplicates import PRIME, THRESHOLD, NearDuplicates, Shingler, _permutations, find_near_duplicates, minhash
+
+
+def records():
+    base = [
+        {"question": " ".join(f"word{i}x{k}" for k in range(8)), "pattern": f"p{i}"}
+        for i in range(40)
+    ]
+    copies = [dict(record) for record in base[:10]]
+    variants = [dict(record, subquestion_patterns=["extra"]) for record in base[10:20]]
+    return base + copies + variants + [{"question": ""}, {"question": "Short"}]
+
+
+def test_copies_are_grouped_with_their_first_record():
+    groups = find_near_duplicates(records())
+    for i in range(10):
+        assert groups.group[40 + i] == i
+        # One extra pattern: 7 of 8 shingles shared
+        assert groups.group[50 + i] == 10 + i
+    assert groups.group[60] == 60
+    assert set(groups.representatives.tolist()) == set(range(40)) | {60, 61}
+    assert groups.size_counts() == {2: 20}
+
+
+def test_groups_never_join_dissimilar_records():
+    rows = records()
+    signatures = minhash(*Shingler().batch(rows), _permutations())
+    groups = NearDuplicates.from_signatures(signatures)
+
+    # Brute force: the components of every pair of records above THRESHOLD
+    # (LSH may miss some of these pairs, never add one)
+    agreement = (signatures[:, :, None] == signatures[:, None, :]).mean(axis=0)
+    filled = signatures[0] != PRIME
+    similar = (agreement >= THRESHOLD) & np.outer(filled, filled)
+    _, reference = connected_components(sparse.csr_matrix(similar), directed=False)
+    for first in np.unique(groups.group):
+        assert len(set(reference[groups.members(first)])) == 1
+    assert groups.sizes.sum() == len(rows)
+    assert groups.n_groups == len(groups.largest()[0])
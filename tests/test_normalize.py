@@ -0,0 +1,49 @@
+import json
+
+import numpy as np
+
+from normalize import flatten_shard, load_table, normalize, normalized_version
+from synthetic import Generator
+
+
+def plain(frame):
+    """Rows as Python values, missing values as None."""
+    return frame.astype(object).where(frame.notna(), None).values.tolist()
+
+
+def test_odd_context_items_and_hop_counts():
+    record = {
+        "_id": "a",
+        "no_of_hops": "2",
+        "context": [["Title", ["s1", "s2"]], ["Only a title"], [], ["No sentences", None]],
+        "question_decomposition": [{"sub_id": "1", "details": [{"sub_id": "1_1", "details": [{"sub_id": "1_1_1"}]}]}],
+    }
+    frames = flatten_shard(5, [record])
+    question = frames["questions"].iloc[0]
+    assert question["question_id"] == 5 and question["no_of_hops"] == 2
+    assert question["num_paragraphs"] == 3 and question["decomp_len"] == 1
+    assert frames["paragraphs"]["title"].tolist() == ["Title", "Only a title", "No sentences"]
+    assert frames["paragraphs"]["n_sentences"].tolist() == [2, 0, 0]
+    assert frames["sentences"]["text"].tolist() == ["s1", "s2"]
+    sub_hops = frames["sub_hops"]
+    assert sub_hops["depth"].tolist() == [1, 2] and sub_hops["parent_sub_hop_id"].tolist() == [-1, 0]
+
+
+def test_shards_number_their_rows_as_one_pass(tmp_path):
+    records = list(Generator(120, seed=7).records(120))
+    path = tmp_path / "data.json"
+    path.write_text(json.dumps(records), encoding="utf-8")
+    out_dir = str(tmp_path / "normalized")
+    counts = normalize(str(path), out_dir, workers=2, shard_size=25)
+
+    reference = flatten_shard(0, records)
+    assert counts == {table: len(frame) for table, frame in reference.items()}
+    for table, frame in reference.items():
+        written = load_table(out_dir, table)
+        id_column = written.columns[0]
+        written = written.sort_values(id_column).reset_index(drop=True)
+        assert np.array_equal(written[id_column], np.arange(len(written)))
+        assert plain(written) == plain(frame), table
+    with open(tmp_path / "normalized" / "manifest.json", encoding="utf-8") as f:
+        assert json.load(f)["rows"] == counts
+    assert normalized_version(out_dir) is not None
@@ -0,0 +1,43 @@
+import gc
+import tracemalloc
+
+from profiling import Profiler
+
+
+def test_tracing_runs_while_a_profiled_session_is_alive():
+    profiled = Profiler(memory=True)
+    assert tracemalloc.is_tracing()
+    # Another session's rerun without the debug flag does not stop it
+    other = Profiler()
+    other.start_run()
+    assert tracemalloc.is_tracing()
+    with profiled.stage("allocate") as row:
+        data = [bytearray(1 << 20)]
+    assert row["peak_bytes"] >= 1 << 20
+    del data
+
+    profiled.start_run(memory=False)
+    other.start_run()
+    assert not tracemalloc.is_tracing()
+
+
+def test_closed_session_releases_tracing():
+    profiled = Profiler(memory=True)
+    assert tracemalloc.is_tracing()
+    del profiled
+    gc.collect()
+    Profiler()
+    assert not tracemalloc.is_tracing()
+
+
+def test_start_run_clears_the_rows():
+    profiler = Profiler()
+    with profiler.stage("a"):
+        with profiler.stage("b"):
+            pass
+    assert [row["stage"] for row in profiler.rows] == ["a/b", "a"]
+    run_id = profiler.run_id
+    profiler.finish()
+    assert profiler.finished
+    profiler.start_run(run_id="next")
+    assert profiler.rows == [] and not profiler.finished and profiler.run_id != run_id
@@ -0,0 +1,76 @@
+from collections import Counter
+from itertools import combinations
+
+import numpy as np
+
+from compact_frame import TitleCodes
+from question_graph import AdjacencyIndex, LruCache, question_elements
+
+
+def title_codes(contexts):
+    vocabulary = sorted({title for context in contexts for title in context})
+    codes = [vocabulary.index(title) for context in contexts for title in context]
+    offsets = np.cumsum([0, *map(len, contexts)])
+    return TitleCodes(np.array(codes, dtype=np.int32), offsets, np.array(vocabulary, dtype=object))
+
+
+CONTEXTS = [["a", "b", "c"], ["a", "b"], ["a", "d"], ["b", "c"], ["e"], ["a", "b", "d"]]
+
+
+def test_adjacency_rows_match_the_pairs(tmp_path):
+    index = AdjacencyIndex.build(title_codes(CONTEXTS))
+    pairs = Counter()
+    for context in CONTEXTS:
+        for a, b in combinations(sorted(set(context)), 2):
+            pairs[a, b] += 1
+            pairs[b, a] += 1
+
+    index.save(tmp_path / "adjacency.npz")
+    for built in (index, AdjacencyIndex.load(tmp_path / "adjacency.npz")):
+        for title in "abcde":
+            code = built.code(title)
+            neighbours, weights = built.neighbourhood(code, limit=10)
+            row = [(built.titles[n], w) for n, w in zip(neighbours, weights.tolist())]
+            expected = sorted(((b, w) for (a, b), w in pairs.items() if a == title), key=lambda item: -item[1])
+            assert sorted(row) == sorted(expected) and built.degree(code) == len(expected)
+            # Most shared first
+            assert weights.tolist() == sorted(weights.tolist(), reverse=True)
+        assert len(built.neighbourhood(built.code("a"), limit=1)[0]) == 1
+    assert index.code("missing") is None
+
+
+def test_question_elements():
+    index = AdjacencyIndex.build(title_codes(CONTEXTS))
+    decomposition = [
+        {"sub_id": "1", "question": "q1", "answer": "x", "paragraph_support_title": "a"},
+        {"sub_id": "2", "question": "q2", "answer": "y", "details": [
+            {"sub_id": "2_1", "question": "q21", "answer": "z", "paragraph_support_title": "unknown"},
+        ]},
+    ]
+    nodes, edges = question_elements("Question?", decomposition, ["a", "e"], index, max_neighbours=1)
+    ids = {node["id"] for node in nodes}
+    assert {"q", "h:1", "h:2", "h:2_1", "p:a", "p:e", "p:unknown", "p:b"} == ids
+    assert {"from": "h:1", "to": "h:2", "arrows": "to", "dashes": False, "label": "x"} in edges
+    # One neighbour of "a" (its most shared, "b"); "e" has none
+    assert [edge["to"] for edge in edges if edge["from"] == "p:a"] == ["p:b"]
+    assert not [edge for edge in edges if edge["from"] == "p:e"]
+
+
+def test_lru_cache_evicts_the_least_recently_used():
+    cache = LruCache(max_bytes=10)
+    calls = []
+
+    def value(text):
+        calls.append(text)
+        return text
+
+    cache.get("a", lambda: value("aaaa"))
+    cache.get("b", lambda: value("bbbb"))
+    cache.get("a", lambda: value("aaaa"))  # hit: "a" is now the most recent
+    cache.get("c", lambda: value("cccc"))  # over 10 bytes: evicts "b"
+    assert calls == ["aaaa", "bbbb", "cccc"] and len(cache) == 2 and cache.bytes == 8
+    cache.get("b", lambda: value("bbbb"))
+    assert calls[-1] == "bbbb" and (cache.hits, cache.misses) == (1, 4)
+    # A value larger than the bound is still kept, alone
+    cache.get("big", lambda: value("x" * 50))
+    assert len(cache) == 1
@@ -0,0 +1,37 @@
+import numpy as np
+
+from ranked_counts import RankedCounts
+
+
+def ranked_example(n=300, seed=0):
+    counts = np.random.default_rng(seed).zipf(1.7, n).clip(max=1000)
+    labels = [f"p{i}" for i in range(n)]
+    return RankedCounts(labels, counts), dict(zip(labels, counts.tolist()))
+
+
+def test_ranks_follow_the_sorted_counts():
+    ranked, counts = ranked_example()
+    assert sorted(counts.values(), reverse=True) == ranked.counts.tolist()
+    assert all(counts[label] == count for label, count in zip(ranked.labels, ranked.counts))
+    assert ranked.total == sum(counts.values())
+
+
+def test_thresholds_and_windows():
+    ranked, counts = ranked_example()
+    values = sorted(counts.values(), reverse=True)
+    for threshold in range(0, max(values) + 2):
+        assert ranked.rank_of_threshold(threshold) == sum(value >= threshold for value in values)
+    for start, stop in [(0, 10), (5, 50), (290, 400), (20, 10)]:
+        window = ranked.window(start, stop)
+        assert window["count"].tolist() == values[start:stop]
+        assert window["rank"].tolist() == list(range(start + 1, min(max(stop, start), len(values)) + 1))
+        assert ranked.count_between(start, stop) == sum(values[start:stop])
+
+
+def test_window_with_other_sums_the_left_out_ranks():
+    ranked, counts = ranked_example()
+    values = sorted(counts.values(), reverse=True)
+    frame = ranked.window_with_other(0, 10, end=100)
+    assert frame["count"].tolist() == values[:10] + [sum(values[10:100])]
+    assert frame["paragraphs"].iloc[-1] == "Other (90)"
+    assert len(ranked.window_with_other(0, len(values))) == len(values)
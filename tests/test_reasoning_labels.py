@@ -0,0 +1,49 @@
+from collections import Counter
+from itertools import product
+
+import numpy as np
+import pandas as pd
+
+from reasoning_labels import ReasoningLabels, split_labels
+
+COMBINATIONS = ["Commonsense", "Commonsense, Arithmetic", "Arithmetic,Symbolic", " Symbolic , Symbolic", ""]
+
+
+def example(n=500, seed=0):
+    rng = np.random.default_rng(seed)
+    codes = rng.integers(-1, len(COMBINATIONS), n)
+    answers = rng.choice(["date", "number", "person"], n)
+    weights = rng.integers(1, 5, n)
+    labels = [set(split_labels(COMBINATIONS[code])) if code >= 0 else set() for code in codes]
+    return codes, answers, weights, labels
+
+
+def as_counter(frame, keys):
+    return Counter({tuple(row[:-1]): row[-1] for row in frame[[*keys, "count"]].itertuples(index=False)})
+
+
+def test_counts_match_a_loop_over_the_records():
+    codes, answers, weights, labels = example()
+    matrix = ReasoningLabels.from_codes(codes, COMBINATIONS, weights)
+    assert matrix.labels == ["Arithmetic", "Commonsense", "Symbolic"]
+
+    totals, by_answer, pairs = Counter(), Counter(), Counter()
+    for record_labels, answer, weight in zip(labels, answers, weights.tolist()):
+        for label in record_labels:
+            totals[label] += weight
+            by_answer[label, answer] += weight
+        for a, b in product(record_labels, repeat=2):
+            pairs[a, b] += weight
+
+    assert dict(zip(matrix.totals()["reasoning_label"], matrix.totals()["count"])) == {
+        label: totals[label] for label in matrix.labels
+    }
+    assert as_counter(matrix.by(pd.Series(answers), "answer_type"), ["reasoning_label", "answer_type"]) == by_answer
+    assert as_counter(matrix.cooccurrence(), ["label_a", "label_b"]) == pairs
+
+
+def test_bits_hold_one_bit_per_label():
+    codes, _, _, labels = example(100)
+    matrix = ReasoningLabels.from_codes(codes, COMBINATIONS)
+    expected = [sum(1 << matrix.labels.index(label) for label in record_labels) for record_labels in labels]
+    assert matrix.bits.tolist() == expected
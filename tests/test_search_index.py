@@ -0,0 +1,75 @@
+import numpy as np
+
+from search_index import SearchIndex, record_texts, tokenize
+from synthetic import Generator
+
+
+def build(records):
+    values = {field: [record.get(field) for record in records] for field in ("answer_type", "reasoning_type")}
+    return SearchIndex.build(records, values)
+
+
+def matches(records, query_terms, phrases=(), filters=None):
+    """Positions of the records with every term and phrase, by a plain scan."""
+    found = []
+    for position, record in enumerate(records):
+        texts = [tokenize(text) for text in record_texts(record)]
+        words = {token for tokens in texts for token in tokens}
+        if not set(query_terms) <= words:
+            continue
+        if any(not any(contains(tokens, phrase) for tokens in texts) for phrase in phrases):
+            continue
+        if any(record.get(field) != label for field, label in (filters or {}).items()):
+            continue
+        found.append(position)
+    return found
+
+
+def contains(tokens, phrase):
+    return any(tokens[i:i + len(phrase)] == phrase for i in range(len(tokens) - len(phrase) + 1))
+
+
+def search_all(index, query, filters=None):
+    results = index.search(query, filters, limit=index.n_docs)
+    return sorted(results.positions.tolist()), results.total
+
+
+def test_terms_and_filters_match_a_scan():
+    records = list(Generator(400, seed=3).records(400))
+    index = build(records)
+    for query in ["paragraph", "entity linked 7", "sentence filler paragraph 3"]:
+        expected = matches(records, tokenize(query))
+        assert search_all(index, query) == (expected, len(expected))
+    filters = {"answer_type": records[0]["answer_type"]}
+    expected = matches(records, ["entity"], filters=filters)
+    assert search_all(index, "entity", filters) == (expected, len(expected))
+    assert search_all(index, "nosuchword") == ([], 0)
+
+
+def test_phrases_stay_inside_one_field():
+    records = [
+        {"question": "the red car", "context": [["T", ["blue car"]]]},
+        {"question": "the red", "context": [["T", ["car park"]]]},
+        {"question": "car red", "context": []},
+    ]
+    index = build(records)
+    assert search_all(index, '"red car"')[0] == [0]
+    assert search_all(index, "red car")[0] == [0, 1, 2]
+    assert search_all(index, '"car park" red')[0] == [1]
+
+
+def test_phrase_queries_match_a_scan():
+    records = list(Generator(300, seed=4).records(300))
+    index = build(records)
+    for phrase in ["entity linked to", "sentence 2 with", "linked to paragraph 1"]:
+        expected = matches(records, tokenize(phrase), [tokenize(phrase)])
+        assert search_all(index, f'"{phrase}"')[0] == expected
+
+
+def test_results_are_ranked_by_score():
+    records = list(Generator(200, seed=5).records(200))
+    index = build(records)
+    results = index.search("paragraph sentence", limit=50)
+    assert np.all(np.diff(results.scores) <= 0)
+    page = index.search("paragraph sentence", offset=10, limit=10)
+    assert page.positions.tolist() == results.positions[10:20].tolist()
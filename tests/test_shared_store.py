@@ -0,0 +1,76 @@
+import gc
+import json
+import os
+
+import pytest
+
+import shared_store
+from chart_data import heatmap_counts, hops_counts
+from dataset_cache import load_dataset
+from shared_store import LOCK_FILE, StoreLease, acquire, release
+from synthetic import Generator
+
+
+@pytest.fixture
+def dataset(tmp_path):
+    path = str(tmp_path / "data.json")
+    records = list(Generator(150, seed=10).records(150))
+    records[0]["answer_type"] = None
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(records, f)
+    return path, str(tmp_path / "cache"), records
+
+
+def edit(path, records):
+    records[0]["question"] += " (edited)"
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(records, f)
+
+
+def test_mapped_aggregates_match_pandas(dataset):
+    path, cache_dir, _ = dataset
+    store = acquire(path, cache_dir)
+    try:
+        frame = store.dataset().frame
+        full = load_dataset(path, cache_dir=cache_dir)
+        for counts in (hops_counts, heatmap_counts):
+            assert counts(frame).astype(object).values.tolist() == counts(full).astype(object).values.tolist()
+        assert not frame["no_of_hops"].to_numpy().flags.writeable
+    finally:
+        release(store)
+
+
+def test_stores_are_reference_counted(dataset):
+    path, cache_dir, _ = dataset
+    first, second = acquire(path, cache_dir), acquire(path, cache_dir)
+    assert first is second and first.refs == 2
+    release(first)
+    assert not first._lock_file.closed
+    release(second)
+    assert first._lock_file.closed and first.directory not in shared_store._stores
+
+    lease = StoreLease(path, cache_dir)
+    store = lease.store
+    del lease
+    gc.collect()
+    assert store.refs == 0 and store._lock_file.closed
+
+
+@pytest.mark.skipif(shared_store.fcntl is None, reason="no reader locks on this platform")
+def test_old_stores_are_removed_once_no_reader_holds_them(dataset):
+    path, cache_dir, records = dataset
+    old = acquire(path, cache_dir)
+    edit(path, records)
+    new = acquire(path, cache_dir)
+    # Still open in this process
+    assert new.directory != old.directory and os.path.isdir(old.directory)
+    release(old)
+
+    # Open in another process: its shared lock keeps the directory
+    with open(os.path.join(old.directory, LOCK_FILE), "r") as reader:
+        shared_store.fcntl.flock(reader, shared_store.fcntl.LOCK_SH)
+        release(acquire(path, cache_dir))
+        assert os.path.isdir(old.directory)
+    release(acquire(path, cache_dir))
+    assert not os.path.exists(old.directory) and os.path.isdir(new.directory)
+    release(new)
@@ -0,0 +1,72 @@
+import json
+
+import pandas as pd
+import pytest
+
+from chart_data import heatmap_counts, hops_counts
+from dataset_cache import load_dataset
+from dataset_stream import DASHBOARD_FIELDS, TITLES_COLUMN
+from ranked_counts import RankedCounts
+from sql_backend import load_sql_backend
+from synthetic import Generator
+
+
+@pytest.fixture
+def dataset(tmp_path):
+    records = list(Generator(300, seed=8).records(300))
+    records[0]["answer_type"] = None
+    records[1]["reasoning_type"] = None
+    records[2]["context"] = []
+    path = str(tmp_path / "data.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(records, f)
+    cache_dir = str(tmp_path / "cache")
+    frame = load_dataset(path, columns=[*DASHBOARD_FIELDS, TITLES_COLUMN], cache_dir=cache_dir)
+    db = load_sql_backend(path, cache_dir)
+    yield db, frame
+    db.connection.close()
+
+
+def same_counts(left, right):
+    keys = [column for column in left.columns if column != "count"]
+    left = left.astype({key: object for key in keys}).sort_values(keys).reset_index(drop=True)
+    right = right.astype({key: object for key in keys}).sort_values(keys).reset_index(drop=True)
+    pd.testing.assert_frame_equal(left, right[left.columns], check_dtype=False)
+
+
+def test_chart_counts_match_pandas(dataset):
+    db, frame = dataset
+    same_counts(db.hops_counts(), hops_counts(frame))
+    same_counts(db.heatmap_counts(), heatmap_counts(frame))
+    answer_type = frame["answer_type"].dropna().iloc[0]
+    filters = {"answer_type": [answer_type], "no_of_hops": [2, 3]}
+    subset = frame[(frame["answer_type"] == answer_type) & frame["no_of_hops"].isin([2, 3])]
+    same_counts(db.hops_counts(filters), hops_counts(subset))
+    assert db.count(filters) == len(subset) and db.count() == len(frame)
+
+
+def test_support_windows_match_ranked_counts(dataset):
+    db, frame = dataset
+    for filters, subset in [({}, frame), ({"no_of_hops": [3]}, frame[frame["no_of_hops"] == 3])]:
+        ranked = RankedCounts.from_lists(subset[TITLES_COLUMN])
+        assert db.support_count_range(filters) == (int(ranked.counts[-1]), int(ranked.counts[0]))
+        threshold = int(ranked.counts[len(ranked) // 2])
+        end = db.support_rank_of_threshold(threshold, filters)
+        assert end == ranked.rank_of_threshold(threshold)
+        window = db.support_window(threshold, 5, 20, end, filters)
+        expected = ranked.window_with_other(5, 20, end=end)
+        # Ties may be ordered differently: compare the counts, and the labels per count
+        assert window["count"].tolist() == expected["count"].tolist()
+        assert window["rank"].tolist() == expected["rank"].tolist()
+        assert window["paragraphs"].iloc[-1] == expected["paragraphs"].iloc[-1]
+
+
+def test_excluded_positions_and_question_fields(dataset):
+    db, frame = dataset
+    db.exclude("first", range(10))
+    assert db.count({"exclude": ["first"]}) == len(frame) - 10
+    same_counts(db.hops_counts({"exclude": ["first"]}), hops_counts(frame.iloc[10:]))
+    fields = db.question_fields([5, 0, 7], ["_id", "no_of_hops"])
+    assert fields["_id"].tolist() == frame["_id"].iloc[[5, 0, 7]].tolist()
+    with pytest.raises(ValueError):
+        db.exclude("no good", [])
@@ -0,0 +1,44 @@
+import numpy as np
+
+from ranked_counts import RankedCounts
+from static_site import page_html, support_data
+
+
+def other_row(data, threshold):
+    """The "Other" row the page shows at `threshold`."""
+    rows = data[data["other"] & (data["lo"] <= threshold) & (threshold <= data["hi"])]
+    assert len(rows) == 1
+    return rows.iloc[0]
+
+
+def test_other_rows_match_the_brute_force_tail():
+    rng = np.random.default_rng(0)
+    counts = rng.zipf(1.5, 400).clip(max=5000)
+    ranked = RankedCounts([f"p{i}" for i in range(len(counts))], counts)
+    data = support_data(ranked, ranks=20, max_other=10**6)
+    for threshold in range(int(ranked.counts[-1]), int(ranked.counts[20]) + 1):
+        left_out = sorted(ranked.counts[20:], reverse=True)
+        expected = [count for count in left_out if count >= threshold]
+        row = other_row(data, threshold)
+        assert row["count"] == sum(expected)
+        assert row["paragraphs"] == f"Other ({len(expected)})"
+
+
+def test_other_rows_are_capped_and_exact_at_their_upper_end():
+    counts = np.arange(1, 1001)
+    ranked = RankedCounts([f"p{i}" for i in range(len(counts))], counts)
+    data = support_data(ranked, ranks=10, max_other=25)
+    other = data[data["other"]]
+    assert len(other) <= 25
+    for row in other.itertuples():
+        assert row.count == counts[counts >= row.hi][:-10].sum()
+    # Every slider value falls in exactly one range
+    for threshold in range(1, int(ranked.counts[10]) + 1):
+        other_row(data, threshold)
+
+
+def test_page_escapes_the_inserted_text():
+    page = page_html({}, ["<b>.html"], "data <script>.json")
+    assert "<script>.json" not in page
+    assert "data &lt;script&gt;.json" in page
+    assert "<b>.html" not in page
@@ -0,0 +1,27 @@
+import json
+
+from answer_audit import audit_record
+from synthetic import Generator, TOKEN_RE, write_dataset
+
+
+def test_records_pass_the_answer_audit():
+    for record in Generator(3000, seed=1).records(3000):
+        titles = [title for title, _ in record["context"]]
+        assert audit_record(record["answer"], record["question_decomposition"], titles) == [], record["_id"]
+
+
+def test_questions_have_no_placeholders():
+    for record in Generator(500).records(500):
+        hops = record["question_decomposition"]
+        texts = [record["question"], record["ques_on_last_hop"], *(hop["question"] for hop in hops)]
+        texts += [detail["question"] for detail in hops[-1]["details"]]
+        assert not any(TOKEN_RE.search(text) for text in texts), record["_id"]
+        assert record["cutted_question"] in record["question"]
+
+
+def test_write_dataset(tmp_path):
+    path = tmp_path / "synthetic.json"
+    write_dataset(path, 10)
+    with open(path, "r", encoding="utf-8") as f:
+        records = json.load(f)
+    assert [record["_id"] for record in records] == [record["_id"] for record in Generator(10).records(10)]
@@ -0,0 +1,39 @@
+from collections import defaultdict
+
+from synthetic import Generator
+from title_index import TitleIndex, support_titles
+
+
+def test_positions_match_a_scan_of_the_records(tmp_path):
+    records = list(Generator(300, seed=2).records(300))
+    context = [[title for title, _ in record["context"]] for record in records]
+    # A title repeated in one record is listed once
+    context[0] = context[0] + context[0][:1]
+    decompositions = [record["question_decomposition"] for record in records]
+    index = TitleIndex.build([record["_id"] for record in records], context, decompositions)
+
+    expected = {"context": defaultdict(set), "support": defaultdict(set)}
+    for position, (titles, decomposition) in enumerate(zip(context, decompositions)):
+        for title in titles:
+            expected["context"][title].add(position)
+        for title in support_titles(decomposition):
+            expected["support"][title].add(position)
+
+    index.save(tmp_path / "index.npz")
+    loaded = TitleIndex.load(tmp_path / "index.npz")
+    for source, titles in expected.items():
+        for title, positions in titles.items():
+            for built in (index, loaded):
+                assert built.positions(title, source).tolist() == sorted(positions)
+        assert set(index.titles) >= set(titles)
+    title = next(iter(expected["context"]))
+    assert list(loaded.ids_for(title)) == [records[p]["_id"] for p in sorted(expected["context"][title])]
+    assert len(index.positions("no such title")) == 0
+
+
+def test_support_titles_include_the_details():
+    decomposition = [
+        {"paragraph_support_title": "A"},
+        {"paragraph_support_title": "", "details": [{"paragraph_support_title": "B"}, {"paragraph_support_title": None}]},
+    ]
+    assert sorted(support_titles(decomposition)) == ["A", "B"]
@@ -0,0 +1,37 @@
+import json
+import os
+
+import pytest
+
+from dataset_cache import CACHE_DIR_NAME, cache_path, dataset_fingerprint
+from sql_backend import DB_SUFFIX
+from synthetic import write_dataset
+from warm_up import WarmUp
+
+
+def metrics(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+@pytest.mark.parametrize("backend", ["pandas", "sqlite", "live"])
+def test_warm_up_builds_the_cache_of_the_backend(tmp_path, backend):
+    path, metrics_file = str(tmp_path / "data.json"), str(tmp_path / "metrics.jsonl")
+    write_dataset(path, 50)
+    warm = WarmUp(path, backend, metrics_file)
+    assert warm.wait(60) and warm.ready and warm.error is None
+    assert warm.elapsed == warm.seconds
+
+    cache_dir = os.path.join(tmp_path, CACHE_DIR_NAME)
+    fingerprint = dataset_fingerprint(path)
+    assert os.path.exists(cache_path(fingerprint, cache_dir))
+    assert os.path.exists(cache_path(fingerprint, cache_dir, DB_SUFFIX)) == (backend == "sqlite")
+    assert [row["stage"] for row in metrics(metrics_file)] == ["startup/warm_up"]
+
+
+def test_warm_up_keeps_the_error(tmp_path):
+    metrics_file = str(tmp_path / "metrics.jsonl")
+    warm = WarmUp(str(tmp_path / "missing.json"), "pandas", metrics_file)
+    assert warm.wait(60)
+    assert isinstance(warm.error, OSError)
+    assert metrics(metrics_file)[0]["seconds"] == warm.seconds
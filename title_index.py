@@ -0,0 +1,135 @@
+import json
+import os
+
+import numpy as np
+import pyarrow.parquet as pq
+
+from dataset_cache import ensure_cache, cache_path, pack_strings, unpack_strings, temp_path
+from dataset_stream import TITLES_COLUMN
+
+# ============================================================
+# INVERTED INDEX: PARAGRAPH TITLE -> QUESTIONS
+# ============================================================
+#
+# For every paragraph title, the positions of the records that use it,
+# in CSR form (indptr + positions, one pair of arrays per source):
+#   - "context": the title is one of the record's context paragraphs
+#   - "support": the title is a paragraph_support_title of a hop
+#     (including the nested `details` hops)
+# The index is built once per dataset version and saved next to the
+# Parquet cache; a lookup is a dict access plus an array slice.
+
+INDEX_SUFFIX = "title-index.npz"
+SOURCES = ("context", "support")
+
+
+def support_titles(decomposition):
+    """paragraph_support_title of every hop, including nested `details`."""
+    titles = []
+    stack = list(decomposition or [])
+    while stack:
+        hop = stack.pop()
+        title = hop.get("paragraph_support_title")
+        if title:
+            titles.append(title)
+        stack.extend(hop.get("details") or [])
+    return titles
+
+
+def _csr(title_codes, positions, n_titles):
+    """Sorts (title, record) pairs by title and returns indptr + positions."""
+    if len(title_codes):
+        # A title listed twice in the same record counts once
+        n = positions.max() + 1
+        pairs = np.unique(title_codes * n + positions)
+        title_codes, positions = pairs // n, pairs % n
+    indptr = np.zeros(n_titles + 1, dtype=np.int64)
+    np.cumsum(np.bincount(title_codes, minlength=n_titles), out=indptr[1:])
+    return indptr, positions.astype(np.int32)
+
+
+class TitleIndex:
+    """Title -> record positions / `_id`s, per source."""
+
+    def __init__(self, titles, ids, postings):
+        self.titles = list(titles)
+        self.ids = np.asarray(ids, dtype=object)
+        self.postings = postings
+        self._codes = {title: i for i, title in enumerate(self.titles)}
+
+    @classmethod
+    def build(cls, ids, context_titles, decompositions):
+        """
+        - ids: `_id` of every record
+        - context_titles: list of context titles per record
+        - decompositions: question_decomposition per record (lists of hops)
+        """
+        codes = {}
+        pairs = {source: ([], []) for source in SOURCES}
+        per_source = zip(SOURCES, (context_titles, (support_titles(d) for d in decompositions)))
+        for source, lists in per_source:
+            title_codes, positions = pairs[source]
+            for position, titles in enumerate(lists):
+                for title in titles:
+                    title_codes.append(codes.setdefault(title, len(codes)))
+                    positions.append(position)
+
+        postings = {
+            source: _csr(np.asarray(title_codes, dtype=np.int64), np.asarray(positions, dtype=np.int64), len(codes))
+            for source, (title_codes, positions) in pairs.items()
+        }
+        return cls(list(codes), ids, postings)
+
+    def positions(self, title, source="context"):
+        """Record positions (row numbers in the dataset) using `title`."""
+        code = self._codes.get(title)
+        if code is None:
+            return np.zeros(0, dtype=np.int32)
+        indptr, positions = self.postings[source]
+        return positions[indptr[code]:indptr[code + 1]]
+
+    def ids_for(self, title, source="context"):
+        return self.ids[self.positions(title, source)]
+
+    def save(self, target):
+        arrays = {}
+        arrays["titles_blob"], arrays["titles_offsets"] = pack_strings(self.titles)
+        arrays["ids_blob"], arrays["ids_offsets"] = pack_strings([str(i) for i in self.ids])
+        for source, (indptr, positions) in self.postings.items():
+            arrays[f"{source}_indptr"], arrays[f"{source}_positions"] = indptr, positions
+        tmp = temp_path(target)
+        with open(tmp, "wb") as f:
+            np.savez(f, **arrays)
+        os.replace(tmp, target)
+
+    @classmethod
+    def load(cls, target):
+        with np.load(target) as arrays:
+            titles = unpack_strings(arrays["titles_blob"], arrays["titles_offsets"])
+            ids = unpack_strings(arrays["ids_blob"], arrays["ids_offsets"])
+            postings = {
+                source: (arrays[f"{source}_indptr"], arrays[f"{source}_positions"])
+                for source in SOURCES
+            }
+        return cls(titles, ids, postings)
+
+
+def load_title_index(path, cache_dir=None):
+    """Loads the index of the current dataset version, building it on first use."""
+    fingerprint, cache_dir, parquet = ensure_cache(path, cache_dir)
+    target = cache_path(fingerprint, cache_dir, INDEX_SUFFIX)
+    if os.path.exists(target):
+        return TitleIndex.load(target)
+
+    available = set(pq.read_schema(parquet).names)
+    table = pq.read_table(parquet, columns=[c for c in ("_id", TITLES_COLUMN, "question_decomposition") if c in available])
+    n_rows = table.num_rows
+    ids = table.column("_id").to_pylist() if "_id" in available else [str(i) for i in range(n_rows)]
+    decompositions = table.column("question_decomposition").to_pylist() if "question_decomposition" in available else [None] * n_rows
+    index = TitleIndex.build(
+        ids,
+        table.column(TITLES_COLUMN).to_pylist(),
+        (json.loads(d) if d else [] for d in decompositions),
+    )
+    index.save(target)
+    return index
@@ -0,0 +1,73 @@
+import importlib
+import threading
+import time
+
+from profiling import METRICS_FILE, write_metrics
+
+# ============================================================
+# BACKGROUND WARM-UP
+# ============================================================
+#
+# The first run of the dashboard in a process pays for the import of the
+# data stack (pandas, pyarrow, scipy, altair: over a second together) and,
+# for a new dataset version, for the Parquet cache and the store of the
+# backend (seconds, up to minutes for large files). A WarmUp does both in
+# a thread, started by the first session of the process while the page
+# shell and the intro tab are drawn without them; a session waits for it
+# only when it opens a tab that needs the data.
+#
+# Nothing is handed over: the thread builds the files the cached loaders
+# of the app look for (dataset_cache.py, shared_store.py, sql_backend.py),
+# which then only open them. A failure is kept in `error`; the app meets
+# it again in its own loading and reports it there.
+
+# Imported by the thread; the app's own modules are cheap once these are loaded
+MODULES = ("numpy", "pandas", "pyarrow.parquet", "scipy.sparse", "altair")
+
+
+class WarmUp:
+    def __init__(self, path, backend, metrics_file=METRICS_FILE):
+        self.path = path
+        self.backend = backend
+        self.metrics_file = metrics_file
+        self.error = None
+        self.seconds = None
+        self._start = time.perf_counter()
+        self._done = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="morehopqa-warm-up", daemon=True)
+        self._thread.start()
+
+    @property
+    def ready(self):
+        """True once the thread ended, successfully or not."""
+        return self._done.is_set()
+
+    @property
+    def elapsed(self):
+        return self.seconds if self.ready else time.perf_counter() - self._start
+
+    def wait(self, timeout=None):
+        return self._done.wait(timeout)
+
+    def _run(self):
+        try:
+            for name in MODULES:
+                importlib.import_module(name)
+            from dataset_cache import ensure_cache
+
+            ensure_cache(self.path)
+            if self.backend == "sqlite":
+                from sql_backend import load_sql_backend
+
+                load_sql_backend(self.path).connection.close()
+            elif self.backend == "pandas":
+                import shared_store
+
+                shared_store.release(shared_store.acquire(self.path))
+        except Exception as e:
+            self.error = e
+        finally:
+            self.seconds = time.perf_counter() - self._start
+            row = {"stage": "startup/warm_up", "seconds": self.seconds, "peak_bytes": None, "payload_bytes": None}
+            write_metrics([row], self.metrics_file)
+            self._done.set()